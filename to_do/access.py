@@ -0,0 +1,87 @@
+from itertools import islice
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Note, NoteAccess, Sharing
+
+# ---------------- Note Access Index ----------------
+# NoteAccess tem uma linha por (usuário, nota) acessível: a do dono e as dos
+# compartilhamentos, com can_edit. A listagem "minhas notas + compartilhadas
+# comigo" vira um range scan em (user, -created_at) em vez de um OR entre
+# note.user_id e um join com Sharing. As linhas são recalculadas a partir de
+# Note/Sharing a cada mudança, então sync_access pode ser chamada à vontade.
+# granted_at marca quando o acesso foi concedido ou alterado (para o dono, a
+# criação da nota); é por ele que /api/sync/ entrega notas antigas recém
+# compartilhadas.
+
+
+def owner_entry(note):
+    return NoteAccess(user_id=note.user_id, note_id=note.pk, is_owner=True, can_edit=True,
+                      created_at=note.created_at, granted_at=note.created_at)
+
+
+def insert_entries(entries, batch_size=1000):
+    # Em lotes, sem montar a lista inteira em memória
+    entries = iter(entries)
+    while batch := list(islice(entries, batch_size)):
+        NoteAccess.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def grant_owner_access(notes, batch_size=1000):
+    # Para notas criadas com bulk_create, que não disparam post_save
+    insert_entries((owner_entry(note) for note in notes), batch_size)
+
+
+def grant_shared_access(note, user_ids, can_edit, batch_size=1000):
+    # Para compartilhamentos criados com bulk_create
+    granted_at = timezone.now()
+    insert_entries((
+        NoteAccess(user_id=user_id, note_id=note.pk, is_owner=False, can_edit=can_edit,
+                   created_at=note.created_at, granted_at=granted_at)
+        for user_id in user_ids
+    ), batch_size)
+
+
+def sync_access(note_id, user_id):
+    note = Note.objects.filter(pk=note_id).only('user_id', 'created_at').first()
+    if note is None:
+        return
+    if note.user_id == user_id:
+        entry = owner_entry(note)
+    else:
+        sharing = Sharing.objects.filter(note_id=note_id, shared_with_id=user_id).first()
+        if sharing is None:
+            NoteAccess.objects.filter(note_id=note_id, user_id=user_id).delete()
+            return
+        entry = NoteAccess(user_id=user_id, note_id=note_id, is_owner=False,
+                           can_edit=sharing.can_edit, created_at=note.created_at,
+                           granted_at=timezone.now())
+    NoteAccess.objects.bulk_create(
+        [entry], update_conflicts=True, unique_fields=['user', 'note'],
+        update_fields=['is_owner', 'can_edit', 'created_at', 'granted_at']
+    )
+
+
+def accessible_notes(user):
+    # O filtro e as anotações usam o mesmo join com NoteAccess
+    return Note.objects.filter(access_entries__user=user).annotate(
+        access_created_at=F('access_entries__created_at'),
+        is_owner=F('access_entries__is_owner'),
+        can_edit=F('access_entries__can_edit'),
+    )
+
+
+def rebuild_access(batch_size=1000):
+    NoteAccess.objects.all().delete()
+    grant_owner_access(Note.objects.only('user_id', 'created_at').iterator(), batch_size)
+    entries = (
+        NoteAccess(user_id=sharing['shared_with_id'], note_id=sharing['note_id'], is_owner=False,
+                   can_edit=sharing['can_edit'], created_at=sharing['note__created_at'],
+                   granted_at=sharing['shared_at'])
+        for sharing in Sharing.objects.values('shared_with_id', 'note_id', 'can_edit', 'shared_at',
+                                              'note__created_at')
+        .exclude(shared_with_id=F('note__user_id')).iterator()
+    )
+    insert_entries(entries, batch_size)
+    return NoteAccess.objects.count()
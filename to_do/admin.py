@@ -3,7 +3,8 @@ from .models import (
     User, LoginHistory, Address, Contact, Note, Category, Subject, File, 
     Sharing, Notification, NotificationType, Review,
     NoteAnalysis, NoteSuggestion, ChatInteraction, NoteRecommendation, 
-    SearchLog, NoteTag, NoteEntity, UserInteraction, NoteHistory
+    SearchLog, NoteTag, NoteEntity, UserInteraction, NoteHistory, NoteTombstone,
+    NotificationCounter, SearchRollup, RollupWatermark, FileUpload, Blob, NoteAccess
 )
 
 # Personalização de Admin para User
@@ -27,7 +28,10 @@ admin.site.register(Note, NoteAdmin)
 admin.site.register(Category)
 admin.site.register(Subject)
 admin.site.register(File)
+admin.site.register(FileUpload)
+admin.site.register(Blob)
 admin.site.register(Sharing)
+admin.site.register(NoteAccess)
 admin.site.register(Notification)
 admin.site.register(NotificationType)
 admin.site.register(Review)
@@ -40,3 +44,7 @@ admin.site.register(NoteTag)
 admin.site.register(NoteEntity)      
 admin.site.register(UserInteraction)
 admin.site.register(NoteHistory)
+admin.site.register(NoteTombstone)
+admin.site.register(NotificationCounter)
+admin.site.register(SearchRollup)
+admin.site.register(RollupWatermark)
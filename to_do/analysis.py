@@ -0,0 +1,120 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .analyzers import analyze_chunk, content_hash
+from .cache import invalidate_users
+from .models import Note, NoteAnalysis, NoteEntity, NoteTag
+
+# ---------------- Note Analysis Pipeline ----------------
+# Varre as notas sem análise ou editadas depois dela, em lotes por pk. Notas
+# cujo hash de título+conteúdo não mudou só têm analyzed_at atualizado; as
+# demais vão para o pool de processos e voltam gravadas em lote (upsert da
+# análise, entidades da análise substituídas e tags novas acrescentadas).
+DEFAULT_ANALYZER = 'to_do.analyzers.KeywordAnalyzer'
+
+
+class AnalysisPipeline:
+    def __init__(self, analyzer=None, workers=None, batch_size=500, chunk_size=25, force=False):
+        self.analyzer = analyzer or getattr(settings, 'NOTE_ANALYZER', DEFAULT_ANALYZER)
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.force = force
+
+    def pending(self):
+        queryset = Note.objects.all()
+        if not self.force:
+            queryset = queryset.filter(
+                Q(analysis__isnull=True)
+                | Q(analysis__analyzed_at__isnull=True)
+                | Q(updated_at__gt=F('analysis__analyzed_at'))
+            )
+        return queryset
+
+    def batches(self):
+        last_pk = 0
+        while True:
+            rows = list(
+                self.pending().filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', 'user_id', 'title', 'content', 'analysis__content_hash')[:self.batch_size]
+            )
+            if not rows:
+                return
+            last_pk = rows[-1][0]
+            yield rows
+
+    def run(self):
+        stats = {'analyzed': 0, 'skipped': 0}
+        executor = None
+        if self.workers > 1:
+            # spawn: os workers não herdam a conexão com o banco do processo pai
+            executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        try:
+            for rows in self.batches():
+                owners = {user_id for _, user_id, _, _, _ in rows}
+                changed, unchanged = [], []
+                for pk, _, title, content, stored_hash in rows:
+                    digest = content_hash(title, content)
+                    if digest == stored_hash and not self.force:
+                        unchanged.append(pk)
+                    else:
+                        changed.append((pk, digest, title, content))
+
+                chunks = [changed[i:i + self.chunk_size] for i in range(0, len(changed), self.chunk_size)]
+                work = partial(analyze_chunk, self.analyzer)
+                mapped = executor.map(work, chunks) if executor else map(work, chunks)
+                results = [result for chunk in mapped for result in chunk]
+
+                self.save(results, unchanged)
+                invalidate_users(owners)
+                stats['analyzed'] += len(results)
+                stats['skipped'] += len(unchanged)
+        finally:
+            if executor:
+                executor.shutdown()
+        return stats
+
+    def save(self, results, unchanged):
+        now = timezone.now()
+        analyses, tags, entities = [], [], []
+        for note_id, digest, result in results:
+            analyses.append(NoteAnalysis(
+                note_id=note_id,
+                summary=result['summary'],
+                sentiment=result['sentiment'],
+                keywords=result['keywords'],
+                content_hash=digest,
+                analyzed_at=now,
+            ))
+            tags.extend(NoteTag(note_id=note_id, tag=tag[:100]) for tag in result['tags'])
+            entities.extend(
+                NoteEntity(note_id=note_id, entity_type=entity_type[:100], entity_value=value[:255],
+                           source='analysis')
+                for entity_type, value in result['entities']
+            )
+
+        with transaction.atomic():
+            NoteAnalysis.objects.filter(note_id__in=unchanged).update(analyzed_at=now)
+            if not results:
+                return
+            NoteAnalysis.objects.bulk_create(
+                analyses,
+                update_conflicts=True,
+                unique_fields=['note'],
+                update_fields=['summary', 'sentiment', 'keywords', 'content_hash', 'analyzed_at'],
+            )
+            # As entidades da análise são extraídas de novo do conteúdo atual;
+            # as criadas pelo usuário ficam. Tags não têm origem, então só
+            # acrescentamos
+            NoteEntity.objects.filter(
+                note_id__in=[note_id for note_id, _, _ in results], source='analysis'
+            ).delete()
+            NoteEntity.objects.bulk_create(entities, batch_size=1_000)
+            NoteTag.objects.bulk_create(tags, ignore_conflicts=True, batch_size=1_000)
@@ -0,0 +1,96 @@
+import hashlib
+import re
+from collections import Counter
+from functools import lru_cache
+
+from django.utils.module_loading import import_string
+
+# ---------------- Note Analyzers ----------------
+# Este módulo roda dentro dos processos do pool de analyze_notes, então não
+# importa models nem toca o banco. Um analisador é qualquer classe com
+# analyze(title, content) devolvendo summary, sentiment, keywords, tags e
+# entities (lista de pares tipo/valor).
+WORD_RE = re.compile(r'[^\W\d_]{3,}', re.UNICODE)
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+
+STOPWORDS = frozenset('''
+    que para com uma por não mais como mas foi ele ela das dos nas nos seu sua
+    são ser tem ter está isso este esta esse essa aos pelo pela entre até sem
+    sobre também quando muito já depois ainda porque cada onde qual quem nem
+    vai vou fazer feito você eles elas ou era the and for with this that from
+'''.split())
+
+POSITIVE = frozenset('''
+    bom boa ótimo ótima excelente feliz sucesso gostei adorei concluído
+    concluída resolvido resolvida melhor perfeito perfeita legal incrível
+'''.split())
+
+NEGATIVE = frozenset('''
+    ruim péssimo péssima problema erro falha triste atrasado atrasada difícil
+    pior urgente bloqueado bloqueada cancelado cancelada perdido perdida
+'''.split())
+
+ENTITY_PATTERNS = [
+    ('email', re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+')),
+    ('url', re.compile(r'https?://[^\s<>"]+')),
+    ('data', re.compile(r'\b\d{1,2}/\d{1,2}/\d{2,4}\b')),
+    ('hashtag', re.compile(r'(?<!\w)#\w+')),
+]
+
+
+def content_hash(title, content):
+    return hashlib.sha256(f'{title}\0{content}'.encode()).hexdigest()
+
+
+class KeywordAnalyzer:
+    """Analisador local e determinístico (sem modelo externo)."""
+
+    summary_length = 280
+    keyword_count = 8
+    tag_count = 3
+
+    def analyze(self, title, content):
+        text = f'{title}. {content}'
+        words = [word.lower() for word in WORD_RE.findall(text)]
+        counts = Counter(word for word in words if word not in STOPWORDS)
+        # Desempate alfabético para o resultado não depender da ordem do texto
+        keywords = [word for word, _ in sorted(counts.items(), key=lambda item: (-item[1], item[0]))]
+        keywords = keywords[:self.keyword_count]
+
+        score = sum(word in POSITIVE for word in words) - sum(word in NEGATIVE for word in words)
+        sentiment = 'positive' if score > 0 else 'negative' if score < 0 else 'neutral'
+
+        entities = []
+        for entity_type, pattern in ENTITY_PATTERNS:
+            for value in dict.fromkeys(pattern.findall(content)):
+                entities.append((entity_type, value))
+
+        return {
+            'summary': self.summarize(content),
+            'sentiment': sentiment,
+            'keywords': keywords,
+            'tags': keywords[:self.tag_count],
+            'entities': entities,
+        }
+
+    def summarize(self, content):
+        summary = ''
+        for sentence in SENTENCE_RE.split(content.strip()):
+            if summary and len(summary) + len(sentence) + 1 > self.summary_length:
+                break
+            summary = f'{summary} {sentence}'.strip()
+        return summary[:self.summary_length]
+
+
+@lru_cache
+def get_analyzer(path):
+    return import_string(path)()
+
+
+def analyze_chunk(path, items):
+    # Executado no pool: items são (note_id, hash, título, conteúdo)
+    analyzer = get_analyzer(path)
+    return [
+        (note_id, digest, analyzer.analyze(title, content))
+        for note_id, digest, title, content in items
+    ]
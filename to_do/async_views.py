@@ -0,0 +1,197 @@
+import asyncio
+import base64
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import replace_query_param
+
+from .authentication import StatelessJWTAuthentication
+from .models import Note, Notification, NoteRecommendation
+from .pubsub import get_broker
+from .query_planner import optimize_queryset
+from .serializers import NoteSerializer, NotificationSerializer, NoteRecommendationSerializer
+
+# ---------------- Async Read Path ----------------
+# Versões assíncronas (ORM async do Django) dos endpoints de leitura mais
+# acessados. Rodando sob ASGI, cada conexão lenta ou long-poll não prende
+# uma thread do worker. A paginação é por cursor (posição + id), só para
+# frente, no mesmo formato de resposta das rotas síncronas.
+jwt_authentication = StatelessJWTAuthentication()
+
+
+async def authenticate(request):
+    header = jwt_authentication.get_header(request)
+    if header is not None:
+        raw_token = jwt_authentication.get_raw_token(header)
+        if raw_token is not None:
+            token = jwt_authentication.get_validated_token(raw_token)
+            # Mesmo caminho sem estado das rotas síncronas; só consulta o
+            # banco para tokens sem claims ou com o estado fora do cache
+            return await sync_to_async(jwt_authentication.get_user)(token)
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        raise AuthenticationFailed('As credenciais de autenticação não foram fornecidas.')
+    return user
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+class AsyncReadView(View):
+    model = None
+    serializer_class = None
+    ordering_field = None
+    page_size = 50
+    max_page_size = 200
+    http_method_names = ['get', 'head', 'options']
+
+    def get_queryset(self, user):
+        return self.model.objects.filter(user=user)
+
+    def encode_cursor(self, instance):
+        position = self.model._meta.get_field(self.ordering_field).value_to_string(instance)
+        raw = json.dumps([position, instance.pk]).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            position, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return self.model._meta.get_field(self.ordering_field).to_python(position), int(pk)
+        except (ValueError, TypeError, ValidationError):
+            return None
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.GET.get('page_size', self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    async def get(self, request, pk=None):
+        try:
+            user = await authenticate(request)
+        except AuthenticationFailed as e:
+            detail = e.detail if isinstance(e.detail, dict) else {'detail': e.detail}
+            return json_response(detail, status=401)
+
+        queryset = optimize_queryset(self.get_queryset(user), self.serializer_class)
+        context = {'request': request}
+
+        if pk is not None:
+            instance = await queryset.filter(pk=pk).afirst()
+            if instance is None:
+                return json_response({'detail': 'Não encontrado.'}, status=404)
+            return json_response(self.serializer_class(instance, context=context).data)
+
+        field = self.ordering_field
+        queryset = queryset.order_by(f'-{field}', '-pk')
+        cursor = request.GET.get('cursor')
+        if cursor:
+            decoded = self.decode_cursor(cursor)
+            if decoded is None:
+                return json_response({'detail': 'Cursor inválido.'}, status=404)
+            position, last_pk = decoded
+            queryset = queryset.filter(
+                Q(**{f'{field}__lt': position}) | Q(**{field: position, 'pk__lt': last_pk})
+            )
+
+        page_size = self.get_page_size(request)
+        # Busca uma linha a mais para saber se existe próxima página
+        rows = [row async for row in queryset[:page_size + 1]]
+        next_link = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_link = replace_query_param(
+                request.build_absolute_uri(), 'cursor', self.encode_cursor(rows[-1])
+            )
+
+        return json_response({
+            'next': next_link,
+            'previous': None,
+            'results': self.serializer_class(rows, many=True, context=context).data,
+        })
+
+
+class AsyncNoteView(AsyncReadView):
+    model = Note
+    serializer_class = NoteSerializer
+    ordering_field = 'created_at'
+
+
+class AsyncNotificationView(AsyncReadView):
+    model = Notification
+    serializer_class = NotificationSerializer
+    ordering_field = 'sent_at'
+
+
+class AsyncNoteRecommendationView(AsyncReadView):
+    model = NoteRecommendation
+    serializer_class = NoteRecommendationSerializer
+    ordering_field = 'score'
+
+
+# ---------------- Notification Stream (SSE) ----------------
+class NotificationStreamView(View):
+    # text/event-stream com as notificações novas do usuário. Reconectando
+    # com o cabeçalho Last-Event-ID (ou ?last_id=) o cliente recebe o que
+    # perdeu; sem ele, o stream começa a partir da notificação mais recente.
+    heartbeat = 15
+    batch_size = 100
+    http_method_names = ['get']
+
+    def get_last_id(self, request):
+        last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_id')
+        try:
+            return int(last_id) if last_id is not None else None
+        except ValueError:
+            return None
+
+    async def get(self, request):
+        try:
+            user = await authenticate(request)
+        except AuthenticationFailed as e:
+            detail = e.detail if isinstance(e.detail, dict) else {'detail': e.detail}
+            return json_response(detail, status=401)
+
+        response = StreamingHttpResponse(
+            self.events(request, user, self.get_last_id(request)),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def events(self, request, user, last_id):
+        broker = get_broker()
+        # Inscreve antes da primeira consulta para não perder avisos no meio
+        subscription = broker.subscribe(user.pk)
+        queryset = optimize_queryset(Notification.objects.filter(user=user), NotificationSerializer)
+        context = {'request': request}
+        try:
+            if last_id is None:
+                latest = await queryset.order_by('-pk').values_list('pk', flat=True).afirst()
+                last_id = latest or 0
+            yield 'retry: 5000\n\n'
+
+            while True:
+                rows = [row async for row in queryset.filter(pk__gt=last_id).order_by('pk')[:self.batch_size]]
+                for row in rows:
+                    data = json.dumps(NotificationSerializer(row, context=context).data, cls=JSONEncoder)
+                    yield f'id: {row.pk}\nevent: notification\ndata: {data}\n\n'
+                    last_id = row.pk
+                if len(rows) == self.batch_size:
+                    continue
+                try:
+                    await asyncio.wait_for(subscription.queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+        finally:
+            broker.unsubscribe(subscription)
@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .logins import record_login
+from .models import User
+
+# ---------------- Stateless JWT ----------------
+# O token carrega id e username. A autenticação monta o User com
+# User.from_db, sem SELECT; is_active, is_staff e is_superuser vêm de um
+# estado mínimo do usuário (junto com o hash da senha, para a revogação) que
+# fica em cache por JWT_REVOCATION_CACHE_SECONDS e é apagado pelo post_save
+# do User. Permissões não vão no token: o refresh copia as claims do token
+# de refresh para cada novo token de acesso, e um administrador rebaixado
+# continuaria com elas até o refresh expirar. Os demais campos ficam
+# adiados e, se alguma view os ler, o Django busca só eles.
+TOKEN_CLAIMS = ('username',)
+STATE_FIELDS = ('is_active', 'is_staff', 'is_superuser')
+REVOCATION_CACHE_SECONDS = getattr(settings, 'JWT_REVOCATION_CACHE_SECONDS', 30)
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim in TOKEN_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        request = self.context.get('request')
+        if request is not None:
+            record_login(request, self.user)
+        return data
+
+
+def _state_key(user_id):
+    return f'to_do:auth-state:{user_id}'
+
+
+def auth_state(user_id):
+    # {is_active, is_staff, is_superuser, password_hash} do usuário, ou None
+    # se ele não existe
+    key = _state_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        row = User.objects.filter(pk=user_id).values(*STATE_FIELDS, 'password').first()
+        if row:
+            row['password_hash'] = get_md5_hash_password(row.pop('password'))
+        state = row or {}
+        cache.set(key, state, REVOCATION_CACHE_SECONDS)
+    return state or None
+
+
+def forget_auth_state(user_id):
+    cache.delete(_state_key(user_id))
+
+
+def token_user(user_id, validated_token, state):
+    values = {
+        'id': user_id,
+        **{claim: validated_token[claim] for claim in TOKEN_CLAIMS},
+        **{name: state[name] for name in STATE_FIELDS},
+    }
+    field_names = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+    return User.from_db(DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names])
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if any(claim not in validated_token for claim in TOKEN_CLAIMS):
+            # Token emitido sem as claims (RefreshToken.for_user, versões antigas)
+            return super().get_user(validated_token)
+
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        state = auth_state(user_id)
+        if state is None:
+            raise AuthenticationFailed('Usuário não encontrado.', code='user_not_found')
+        if api_settings.CHECK_USER_IS_ACTIVE and not state['is_active']:
+            raise AuthenticationFailed('Usuário inativo.', code='user_inactive')
+        if (api_settings.CHECK_REVOKE_TOKEN
+                and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != state['password_hash']):
+            raise AuthenticationFailed('A senha do usuário foi alterada.', code='password_changed')
+        return token_user(user_id, validated_token, state)
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Upper
+
+from .models import Note, NoteTag, Category, Subject
+
+# ---------------- Autocomplete ----------------
+# Sugestões por prefixo ou por similaridade de trigramas (pg_trgm). Os
+# campos consultados têm índices GIN gin_trgm_ops sobre UPPER(campo)
+# (migração 0004), então prefixo e similaridade comparam sempre UPPER.
+
+
+class PrefixCache:
+    """LRU em memória das últimas buscas de cada usuário.
+
+    Evita ir ao banco a cada tecla digitada; o TTL curto faz com que notas
+    e tags novas apareçam nas sugestões em poucos segundos.
+    """
+
+    def __init__(self, max_entries=4096, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+prefix_cache = PrefixCache()
+
+
+def _suggest(queryset, field, text, kind, limit):
+    text = text.upper()
+    prefix = Q(search_key__startswith=text)
+    matches = (
+        queryset
+        .annotate(search_key=Upper(field))
+        .filter(prefix | Q(search_key__trigram_similar=text))
+        .annotate(
+            value=F(field),
+            is_prefix=Case(When(prefix, then=Value(1)), default=Value(0), output_field=IntegerField()),
+            similarity=TrigramSimilarity('search_key', text),
+        )
+        .order_by('-is_prefix', '-similarity', 'value')
+        .values('value', 'is_prefix', 'similarity')
+        .distinct()[:limit]
+    )
+    return [
+        {'type': kind, 'value': row['value'], 'score': round(row['is_prefix'] + row['similarity'], 4)}
+        for row in matches
+    ]
+
+
+def autocomplete(user, text, limit=10):
+    text = ' '.join(text.split())
+    key = (user.pk, text.upper(), limit)
+    cached = prefix_cache.get(key)
+    if cached is not None:
+        return cached
+
+    suggestions = (
+        _suggest(Note.objects.filter(user=user), 'title', text, 'note', limit)
+        + _suggest(NoteTag.objects.filter(note__user=user), 'tag', text, 'tag', limit)
+        + _suggest(Category.objects.all(), 'name', text, 'category', limit)
+        + _suggest(Subject.objects.all(), 'name', text, 'subject', limit)
+    )
+    suggestions.sort(key=lambda item: item['score'], reverse=True)
+    suggestions = suggestions[:limit]
+
+    prefix_cache.set(key, suggestions)
+    return suggestions
@@ -0,0 +1,106 @@
+import hashlib
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Blob, File
+
+# ---------------- Content-Addressed Storage ----------------
+# Cada conteúdo distinto vai uma vez para o storage, em blobs/aa/bb/<sha256>.
+# Os File apontam para o Blob e os sinais mantêm ref_count: +1 quando um File
+# passa a usar o blob, -1 quando deixa de usar ou é excluído (inclusive em
+# cascata com a nota). O blob sem referências sai do banco e, após o commit,
+# do storage.
+#
+# store_blob roda na mesma transação que grava o File: o blob existente fica
+# travado (select_for_update) até o commit, junto com o +1 do post_save, e um
+# release_blob concorrente ou espera e vê a referência nova, ou termina antes
+# e o blob é criado de novo. Um blob criado ali volta atrás com a transação
+# se o File não for gravado.
+READ_SIZE = 64 * 1024
+
+
+def blob_name(digest):
+    return f'blobs/{digest[:2]}/{digest[2:4]}/{digest}'
+
+
+def hash_content(content):
+    # content: arquivo do Django (UploadedFile, File); lido em blocos
+    digest = hashlib.sha256()
+    content.seek(0)
+    for block in content.chunks(READ_SIZE):
+        digest.update(block)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def owned_blob(user_id, digest):
+    # Só quem já tem o conteúdo anexado pode reaproveitá-lo sem enviar os
+    # bytes; saber o SHA-256 de um arquivo alheio não basta para obtê-lo
+    return Blob.objects.filter(digest=digest, files__note__user_id=user_id).first()
+
+
+def lock_blob(blob):
+    # Relê o blob travado; None se um release_blob o removeu nesse meio tempo
+    if blob is None:
+        return None
+    return Blob.objects.select_for_update().filter(pk=blob.pk).first()
+
+
+def store_blob(content, digest=None):
+    # Devolve o Blob do conteúdo, gravando no storage só se ainda não existir.
+    # Precisa de uma transação aberta, que deve gravar também o File.
+    if not transaction.get_connection().in_atomic_block:
+        raise transaction.TransactionManagementError('store_blob precisa rodar dentro de uma transação.')
+    digest = digest or hash_content(content)
+    blob = Blob.objects.select_for_update().filter(digest=digest).first()
+    if blob is not None:
+        return blob
+
+    # Sem reaproveitar um arquivo que já esteja no nome: pode ser de um blob
+    # removido, com a exclusão no storage ainda pendente do commit
+    storage = Blob._meta.get_field('file').storage
+    name = storage.save(blob_name(digest), content)
+    try:
+        with transaction.atomic():
+            return Blob.objects.create(digest=digest, file=name, size=content.size)
+    except IntegrityError:
+        # Outro processo gravou o mesmo conteúdo ao mesmo tempo
+        storage.delete(name)
+        return Blob.objects.select_for_update().get(digest=digest)
+
+
+def acquire_blob(blob_id):
+    Blob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') + 1)
+
+
+def release_blob(blob_id):
+    with transaction.atomic():
+        Blob.objects.filter(pk=blob_id, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+        # A trava segura um store/acquire concorrente até o blob sair
+        orphan = Blob.objects.select_for_update().filter(pk=blob_id, ref_count=0).first()
+        if orphan is None:
+            return
+        storage, name = orphan.file.storage, orphan.file.name
+        orphan.delete()
+        transaction.on_commit(lambda: storage.delete(name))
+
+
+def attach_blob(instance, blob, filename):
+    # Prepara um File (novo ou existente) para apontar para o blob
+    instance.blob = blob
+    instance.file.name = blob.file.name
+    instance.filename = filename
+    return instance
+
+
+def dedup_legacy_file(instance):
+    # Move um anexo antigo (arquivo próprio) para o blob do seu conteúdo
+    storage, old_name = instance.file.storage, instance.file.name
+    with transaction.atomic(), instance.file.open('rb') as content:
+        blob = store_blob(content)
+        attach_blob(instance, blob, instance.filename or old_name.rsplit('/', 1)[-1])
+        instance.save(update_fields=['blob', 'file', 'filename'])
+    if not File.objects.filter(file=old_name).exists():
+        transaction.on_commit(lambda: storage.delete(old_name))
+    return blob
@@ -0,0 +1,77 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# ---------------- Response Cache ----------------
+# Cada usuário tem um contador de versão (e há um global, para tabelas
+# compartilhadas como categorias). O ETag de uma resposta é derivado dessas
+# versões e da URL, então validar um If-None-Match não toca o banco; as
+# escritas só precisam incrementar o contador para invalidar tudo.
+RESPONSE_CACHE_TIMEOUT = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+GLOBAL_SCOPE = 'global'
+
+
+def _version_key(scope):
+    return f'to_do:version:{scope}'
+
+
+def get_version(scope):
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        # Começa de um valor único para que um contador despejado do cache
+        # nunca volte a gerar um ETag antigo
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(scope):
+    key = _version_key(scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def invalidate_users(user_ids):
+    for user_id in set(user_ids):
+        if user_id is not None:
+            bump_version(f'user:{user_id}')
+
+
+def invalidate_global():
+    bump_version(GLOBAL_SCOPE)
+
+
+def response_etag(request):
+    user_id = request.user.pk
+    parts = [
+        str(user_id),
+        str(get_version(GLOBAL_SCOPE)),
+        str(get_version(f'user:{user_id}')),
+        request.build_absolute_uri(),
+        request.accepted_media_type or '',
+    ]
+    digest = hashlib.sha1(':'.join(parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(',')]
+    return '*' in candidates or any(
+        value.removeprefix('W/') == etag for value in candidates
+    )
+
+
+def cached_data(etag):
+    return cache.get(f'to_do:response:{etag}')
+
+
+def store_data(etag, data):
+    cache.set(f'to_do:response:{etag}', data, RESPONSE_CACHE_TIMEOUT)
@@ -0,0 +1,58 @@
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from .models import Notification, NotificationCounter
+
+# ---------------- Unread Counters ----------------
+# NotificationCounter.unread acompanha as notificações não lidas de cada
+# usuário. As alterações usam UPDATE com F() na mesma transação da escrita
+# da notificação; um contador inexistente é criado a partir da contagem real.
+
+
+def _recount(user_id):
+    return Notification.objects.filter(user_id=user_id, read=False).count()
+
+
+def adjust_unread(user_id, delta, create=True):
+    if not delta:
+        return
+    with transaction.atomic():
+        updated = NotificationCounter.objects.filter(user_id=user_id).update(
+            unread=Greatest(F('unread') + delta, Value(0))
+        )
+        if not updated and create:
+            # A contagem já inclui a escrita atual, que está na mesma transação
+            counter, created = NotificationCounter.objects.get_or_create(
+                user_id=user_id, defaults={'unread': _recount(user_id)}
+            )
+            if not created:
+                NotificationCounter.objects.filter(user_id=user_id).update(
+                    unread=Greatest(F('unread') + delta, Value(0))
+                )
+
+
+def unread_count(user_id):
+    unread = NotificationCounter.objects.filter(user_id=user_id).values_list('unread', flat=True).first()
+    if unread is None:
+        counter, _ = NotificationCounter.objects.get_or_create(
+            user_id=user_id, defaults={'unread': _recount(user_id)}
+        )
+        unread = counter.unread
+    return unread
+
+
+def mark_all_read(user_id):
+    with transaction.atomic():
+        updated = Notification.objects.filter(user_id=user_id, read=False).update(read=True)
+        adjust_unread(user_id, -updated)
+    return updated
+
+
+def adjust_unread_many(user_ids, delta):
+    # Para notificações criadas em lote; só ajusta contadores existentes, os
+    # que faltam nascem da contagem real em unread_count
+    if delta and user_ids:
+        NotificationCounter.objects.filter(user_id__in=user_ids).update(
+            unread=Greatest(F('unread') + delta, Value(0))
+        )
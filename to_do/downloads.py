@@ -0,0 +1,128 @@
+import hashlib
+import mimetypes
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.http import content_disposition_header
+from rest_framework.renderers import BaseRenderer
+
+# ---------------- File Downloads ----------------
+# GET /api/files/<id>/download/ para o dono da nota e para quem a recebeu
+# compartilhada (NotePermission). Com FILE_DOWNLOAD_BACKEND o Django só
+# autoriza e devolve um cabeçalho para o servidor web entregar o arquivo
+# ('x-accel-redirect' no nginx, 'x-sendfile' no Apache/lighttpd). Sem ele, a
+# resposta é um FileResponse: o servidor WSGI usa wsgi.file_wrapper (sendfile
+# no gunicorn) a partir da posição do arquivo, e Content-Length limita o
+# trecho enviado.
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class PassthroughRenderer(BaseRenderer):
+    # O corpo já vem pronto; aceita qualquer Accept do cliente
+    media_type = '*/*'
+    format = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
+class FileRange:
+    # Janela [start, start + length) de um arquivo aberto. read() para no fim
+    # da janela; fileno() deixa o servidor usar sendfile a partir de start.
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(instance, size):
+    # Blobs são endereçados pelo conteúdo; anexos antigos nunca são
+    # regravados no mesmo caminho
+    if instance.blob_id is not None:
+        return f'"{instance.blob.digest}"'
+    return f'"{hashlib.sha256(instance.file.name.encode()).hexdigest()[:32]}-{size}"'
+
+
+def parse_range(header, size):
+    # Um único intervalo; (None, None) se ausente, malformado ou com vários
+    # intervalos (a resposta é o arquivo inteiro) e False se fora do arquivo
+    match = RANGE_RE.match(header or '')
+    if not match or match[1] == match[2] == '':
+        return None, None
+    if match[1] == '':
+        length = min(int(match[2]), size)
+        if length == 0:
+            return False, False
+        return size - length, size - 1
+    start = int(match[1])
+    end = min(int(match[2]), size - 1) if match[2] else size - 1
+    if start >= size or end < start:
+        return False, False
+    return start, end
+
+
+def accel_response(instance, content_type, headers):
+    backend = getattr(settings, 'FILE_DOWNLOAD_BACKEND', None)
+    response = HttpResponse(content_type=content_type, headers=headers)
+    if backend == 'x-accel-redirect':
+        prefix = getattr(settings, 'FILE_DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix + quote(instance.file.name)
+    else:
+        response['X-Sendfile'] = instance.file.path
+    return response
+
+
+def serve_file(request, instance):
+    filename = instance.filename or instance.file.name.rsplit('/', 1)[-1]
+    size = instance.blob.size if instance.blob_id is not None else instance.file.size
+    etag = file_etag(instance, size)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    headers = {
+        'ETag': etag,
+        'Accept-Ranges': 'bytes',
+        'Content-Disposition': content_disposition_header(True, filename),
+    }
+
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        return HttpResponse(status=304, headers={'ETag': etag})
+
+    if getattr(settings, 'FILE_DOWNLOAD_BACKEND', None):
+        # Range e If-Range ficam com o servidor web
+        return accel_response(instance, content_type, headers)
+
+    start = end = None
+    if_range = request.headers.get('If-Range')
+    if if_range is None or if_range == etag:
+        start, end = parse_range(request.headers.get('Range'), size)
+    if start is False:
+        return HttpResponse(status=416, content_type=content_type,
+                            headers={**headers, 'Content-Range': f'bytes */{size}'})
+
+    source = instance.file.storage.open(instance.file.name, 'rb')
+    if start is None:
+        return FileResponse(source, as_attachment=True, filename=filename, content_type=content_type,
+                            headers={**headers, 'Content-Length': size})
+
+    # O nome no storage é o digest; filename mantém o nome original
+    length = end - start + 1
+    return FileResponse(
+        FileRange(source, start, length), status=206, as_attachment=True, filename=filename,
+        content_type=content_type,
+        headers={**headers, 'Content-Length': length, 'Content-Range': f'bytes {start}-{end}/{size}'}
+    )
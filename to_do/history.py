@@ -0,0 +1,201 @@
+import difflib
+import json
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Note, NoteHistory
+
+# ---------------- Note History Storage ----------------
+# Cada NoteHistory é uma versão da nota. O conteúdo da versão (updated) é
+# guardado inteiro (snapshot) a cada SNAPSHOT_INTERVAL versões, ou quando o
+# delta sairia grande demais; nas demais, só o delta por linhas em relação à
+# versão anterior. Reconstruir qualquer versão aplica no máximo
+# SNAPSHOT_INTERVAL - 1 deltas. O conteúdo anterior (previous) é um delta
+# reverso a partir do próprio updated, então também custa um passo a mais.
+#
+# Formato do delta: lista de operações sobre as linhas da origem; inteiro
+# positivo copia n linhas, negativo pula n linhas e texto é inserido.
+SNAPSHOT_INTERVAL = 20
+COALESCE_SECONDS = getattr(settings, 'NOTE_HISTORY_COALESCE_SECONDS', 120)
+
+
+def diff(source, target):
+    source_lines = source.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    delta = []
+    matcher = difflib.SequenceMatcher(None, source_lines, target_lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            delta.append(i2 - i1)
+            continue
+        if i2 > i1:
+            delta.append(i1 - i2)
+        if j2 > j1:
+            delta.append(''.join(target_lines[j1:j2]))
+    return delta
+
+
+def patch(source, delta):
+    lines = source.splitlines(keepends=True)
+    position, output = 0, []
+    for operation in delta:
+        if isinstance(operation, str):
+            output.append(operation)
+        elif operation > 0:
+            output.extend(lines[position:position + operation])
+            position += operation
+        else:
+            position -= operation
+    return ''.join(output)
+
+
+def encode_version(content, previous, base, chain_length):
+    # base: conteúdo da versão anterior (None se não houver);
+    # chain_length: versões desde o último snapshot, incluindo ele
+    fields = {'previous_delta': diff(content, previous), 'snapshot': None, 'content_delta': None}
+    if base is None or chain_length >= SNAPSHOT_INTERVAL:
+        fields['snapshot'] = content
+        return fields
+    delta = diff(base, content)
+    if len(json.dumps(delta)) > len(content) // 2:
+        fields['snapshot'] = content
+    else:
+        fields['content_delta'] = delta
+    return fields
+
+
+def chain(note_id, version):
+    # Linhas do último snapshot até a versão pedida, em ordem
+    entries = NoteHistory.objects.filter(note_id=note_id)
+    start = entries.filter(version__lte=version, snapshot__isnull=False) \
+        .order_by('-version').values_list('version', flat=True).first()
+    if start is None:
+        return []
+    return list(entries.filter(version__gte=start, version__lte=version).order_by('version'))
+
+
+def replay(entries):
+    # Aplica a cadeia e devolve o conteúdo (updated) de cada versão
+    contents, content = {}, None
+    for entry in entries:
+        if entry.snapshot is not None:
+            content = entry.snapshot
+        elif content is not None and entry.content_delta is not None:
+            content = patch(content, entry.content_delta)
+        contents[entry.version] = content
+    return contents
+
+
+def version_content(note_id, version):
+    # Versão 0 é o conteúdo anterior à primeira versão registrada
+    if version == 0:
+        first = NoteHistory.objects.filter(note_id=note_id).order_by('version').first()
+        return first.previous_content if first else None
+    entries = chain(note_id, version)
+    if not entries or entries[-1].version != version:
+        return None
+    return replay(entries)[version]
+
+
+def materialize(entries):
+    # Preenche updated/previous de várias versões com uma query por nota
+    entries = sorted(entries, key=lambda entry: (entry.note_id, entry.version))
+    for note_id, group in groupby(entries, key=lambda entry: entry.note_id):
+        group = list(group)
+        versions = NoteHistory.objects.filter(note_id=note_id)
+        start = versions.filter(version__lte=group[0].version, snapshot__isnull=False) \
+            .order_by('-version').values_list('version', flat=True).first()
+        rows = versions.filter(version__gte=start or 1, version__lte=group[-1].version).order_by('version')
+        contents = replay(rows)
+        for entry in group:
+            entry.set_contents(contents.get(entry.version))
+
+
+def record_version(note, updated_content, previous_content=None, edited_by=None, change_reason=''):
+    with transaction.atomic():
+        # Trava a nota para que duas edições simultâneas não disputem o número da versão
+        Note.objects.select_for_update().filter(pk=note.pk).exists()
+        latest = NoteHistory.objects.filter(note=note).order_by('-version').first()
+        if latest is None:
+            base, chain_length, version = None, 0, 1
+        else:
+            entries = chain(note.pk, latest.version)
+            base = replay(entries).get(latest.version)
+            chain_length, version = len(entries), latest.version + 1
+        if previous_content is None:
+            previous_content = base if base is not None else ''
+
+        entry = NoteHistory(
+            note=note,
+            edited_by=edited_by,
+            version=version,
+            change_reason=change_reason,
+            **encode_version(updated_content, previous_content, base, chain_length)
+        )
+        entry.save()
+        entry.set_contents(updated_content)
+        return entry
+
+
+def capture_edit(note, previous_content, updated_content, edited_by=None, window=None):
+    # Chamado a cada edição de conteúdo. Edições seguidas do mesmo usuário
+    # dentro da janela (contada a partir da primeira) reescrevem a última
+    # versão em vez de criar outra: um cliente com autosave gera no máximo
+    # uma versão por janela.
+    if previous_content == updated_content:
+        return None
+    window = timedelta(seconds=COALESCE_SECONDS) if window is None else window
+    edited_by_id = edited_by.pk if edited_by is not None else None
+    with transaction.atomic():
+        Note.objects.select_for_update().filter(pk=note.pk).exists()
+        latest = NoteHistory.objects.filter(note=note).order_by('-version').first()
+        if (
+            latest is None
+            or latest.edited_by_id != edited_by_id
+            or timezone.now() - latest.edited_at > window
+        ):
+            return record_version(note, updated_content, previous_content, edited_by)
+
+        entries = chain(note.pk, latest.version)
+        contents = replay(entries)
+        # O "anterior" da versão continua sendo o de antes da rajada de edições
+        burst_start = patch(contents[latest.version], latest.previous_delta)
+        if burst_start == updated_content:
+            # A rajada terminou onde começou: não sobra alteração a registrar
+            latest.delete()
+            return None
+        before = entries[:-1]
+        base = contents[before[-1].version] if before else None
+        fields = encode_version(updated_content, burst_start, base, len(before))
+        NoteHistory.objects.filter(pk=latest.pk).update(**fields)
+        for name, value in fields.items():
+            setattr(latest, name, value)
+        latest.set_contents(updated_content)
+        return latest
+
+
+def detach_version(entry):
+    # Antes de excluir uma versão, a seguinte deixa de depender dela
+    following = NoteHistory.objects.filter(
+        note_id=entry.note_id, version__gt=entry.version
+    ).order_by('version').first()
+    if following is None or following.snapshot is not None:
+        return
+    following.snapshot = version_content(entry.note_id, following.version)
+    following.content_delta = None
+    following.save(update_fields=['snapshot', 'content_delta'])
+
+
+def version_diff(note_id, source_version, target_version):
+    source = version_content(note_id, source_version)
+    target = version_content(note_id, target_version)
+    if source is None or target is None:
+        return None
+    return ''.join(difflib.unified_diff(
+        source.splitlines(keepends=True), target.splitlines(keepends=True),
+        fromfile=f'v{source_version}', tofile=f'v{target_version}'
+    ))
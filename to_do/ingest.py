@@ -0,0 +1,246 @@
+import atexit
+import fcntl
+import itertools
+import json
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .cache import invalidate_users
+from .models import User, Note, UserInteraction
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Interaction Ingestion ----------------
+# Os eventos aceitos na requisição vão para uma lista em memória e, antes de
+# qualquer coisa, para um arquivo de spool (uma linha JSON por evento). A
+# gravação no banco é feita em lote, por tamanho ou por tempo: o segmento do
+# spool é trocado, o lote é gravado com bulk_create e só então o arquivo
+# antigo é apagado. Se o processo morrer no meio, o segmento fica no disco e
+# é regravado por recover() (manage.py flush_interactions): entrega pelo
+# menos uma vez, nunca zero. SpoolBuffer é a parte genérica; o registro de
+# logins (logins.py) usa o mesmo mecanismo.
+#
+# Os segmentos levam um token aleatório por processo, não o PID (que se
+# repete depois de um restart, em containers sempre), e são criados com 'x'.
+# O dono de um token segura um flock no arquivo <prefixo>-<token>.lock
+# enquanto vive; recover() só regrava os segmentos cujo lock está livre. Um
+# lote que falha continua no disco e é relido do segmento na próxima
+# tentativa, sem acumular eventos em memória enquanto o banco está fora.
+
+
+class SpoolBuffer:
+    # Prefixo dos segmentos no spool e nome da thread de flush
+    prefix = None
+
+    def __init__(self, spool_dir, flush_size=500, flush_interval=2.0):
+        self.spool_dir = Path(spool_dir)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._events = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._sequence = itertools.count()
+        self._segment = None
+        self._file = None
+        self._timer = None
+        self._wake = threading.Event()
+        self._owner_pid = None
+        self._token = None
+        self._lock_file = None
+        # Segmentos de lotes que falharam ao gravar, na ordem
+        self._pending = []
+
+    # ---- Spool ----
+    def _claim(self):
+        # Token e lock do processo atual; refeitos depois de um fork
+        if self._owner_pid == os.getpid():
+            return
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        token = uuid.uuid4().hex
+        # O lock é tomado antes de o arquivo ganhar o nome final, para que
+        # recover() nunca o encontre livre com o dono vivo
+        pending = self.spool_dir / f'.{self.prefix}-{token}.lock'
+        lock_file = open(pending, 'x')
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        pending.rename(self.spool_dir / f'{self.prefix}-{token}.lock')
+        self._token, self._lock_file, self._owner_pid = token, lock_file, os.getpid()
+
+    def _open_segment(self):
+        self._claim()
+        self._segment = self.spool_dir / f'{self.prefix}-{self._token}-{next(self._sequence)}.jsonl'
+        self._file = open(self._segment, 'x', encoding='utf-8')
+
+    def _rotate(self):
+        # Chamado com _lock: devolve os eventos e o segmento que os contém
+        events, segment = self._events, self._segment
+        if self._file is not None:
+            self._file.close()
+        self._events, self._segment, self._file = [], None, None
+        return events, segment
+
+    # ---- Entrada ----
+    def push(self, event):
+        with self._lock:
+            if self._file is None:
+                self._open_segment()
+            self._file.write(json.dumps(event) + '\n')
+            self._file.flush()
+            self._events.append(event)
+            full = len(self._events) >= self.flush_size
+        self._start_timer()
+        if full:
+            if self.flush_interval:
+                # A gravação fica com a thread de flush, fora da requisição
+                self._wake.set()
+            else:
+                self.flush()
+
+    def _start_timer(self):
+        if not self.flush_interval or (self._timer is not None and self._timer.is_alive()):
+            return
+        with self._lock:
+            if self._timer is None or not self._timer.is_alive():
+                self._timer = threading.Thread(target=self._run_timer, name=f'{self.prefix}-flush', daemon=True)
+                self._timer.start()
+
+    def _run_timer(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Falha ao gravar o lote de %s; o spool será regravado', self.prefix)
+            finally:
+                connection.close()
+
+    # ---- Saída ----
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                events, segment = self._rotate()
+            if segment is not None:
+                self._pending.append((segment, events))
+            written = 0
+            while self._pending:
+                segment, events = self._pending[0]
+                try:
+                    written += self.write(events if events is not None else read_segment(segment))
+                except Exception:
+                    # Daqui em diante os lotes pendentes são relidos do disco
+                    self._pending = [(pending, None) for pending, _ in self._pending]
+                    raise
+                segment.unlink(missing_ok=True)
+                self._pending.pop(0)
+            return written
+
+    def recover(self):
+        # Regrava segmentos de processos encerrados: o lock do token está livre
+        segments = {
+            lock_path.stem[len(self.prefix) + 1:]: []
+            for lock_path in self.spool_dir.glob(f'{self.prefix}-*.lock')
+        }
+        for segment in self.spool_dir.glob(f'{self.prefix}-*.jsonl'):
+            token, sequence = segment.stem[len(self.prefix) + 1:].rsplit('-', 1)
+            segments.setdefault(token, []).append((int(sequence), segment))
+
+        written = 0
+        for token, owned in sorted(segments.items()):
+            if token == self._token and self._owner_pid == os.getpid():
+                continue
+            lock_path = self.spool_dir / f'{self.prefix}-{token}.lock'
+            with open(lock_path, 'a') as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                for _, segment in sorted(owned):
+                    try:
+                        events = read_segment(segment)
+                    except FileNotFoundError:
+                        # Regravado por outro recover() ao mesmo tempo
+                        continue
+                    written += self.write(events)
+                    segment.unlink(missing_ok=True)
+                lock_path.unlink(missing_ok=True)
+        return written
+
+    def write(self, events):
+        raise NotImplementedError
+
+
+class InteractionBuffer(SpoolBuffer):
+    prefix = 'interactions'
+
+    def append(self, user_id, note_id, interaction_type, metadata=None, timestamp=None):
+        self.push({
+            'user_id': user_id,
+            'note_id': note_id,
+            'interaction_type': interaction_type,
+            'metadata': metadata,
+            'timestamp': (timestamp or timezone.now()).isoformat(),
+        })
+
+    def write(self, events):
+        return write_events(events)
+
+
+def read_segment(segment):
+    # Uma última linha cortada pela queda do processo é descartada
+    events = []
+    with open(segment, encoding='utf-8') as spool:
+        for line in spool:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                logger.warning('Linha inválida ignorada em %s', segment)
+    return events
+
+
+def write_events(events, batch_size=1_000):
+    # Notas ou usuários removidos depois do evento não derrubam o lote
+    note_ids = set(Note.objects.filter(
+        pk__in={event['note_id'] for event in events}
+    ).values_list('pk', flat=True))
+    user_ids = set(User.objects.filter(
+        pk__in={event['user_id'] for event in events}
+    ).values_list('pk', flat=True))
+
+    interactions = [
+        UserInteraction(
+            user_id=event['user_id'],
+            note_id=event['note_id'],
+            interaction_type=event['interaction_type'],
+            metadata=event['metadata'],
+            timestamp=parse_datetime(event['timestamp']),
+        )
+        for event in events
+        if event['note_id'] in note_ids and event['user_id'] in user_ids
+    ]
+    with transaction.atomic():
+        UserInteraction.objects.bulk_create(interactions, batch_size=batch_size)
+    invalidate_users({interaction.user_id for interaction in interactions})
+    return len(interactions)
+
+
+_buffer = None
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        _buffer = InteractionBuffer(
+            settings.INTERACTION_SPOOL_DIR,
+            flush_size=getattr(settings, 'INTERACTION_FLUSH_SIZE', 500),
+            flush_interval=getattr(settings, 'INTERACTION_FLUSH_INTERVAL', 2.0),
+        )
+        atexit.register(_buffer.flush)
+    return _buffer
@@ -0,0 +1,96 @@
+import atexit
+import ipaddress
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .cache import invalidate_users
+from .ingest import SpoolBuffer
+from .models import User, LoginHistory
+
+# ---------------- Login History ----------------
+# Cada emissão de token (POST /api/auth/token/) vira um registro de login com
+# IP e user agent. A requisição só acrescenta o registro ao spool (ingest.py);
+# a gravação em LoginHistory é feita em lote pela thread de flush, então o
+# login não espera o banco. O login mais recente pode levar até
+# LOGIN_FLUSH_INTERVAL segundos para aparecer em /api/login-histories/recent/.
+USER_AGENT_MAX_LENGTH = LoginHistory._meta.get_field('user_agent').max_length
+RECENT_LOGINS_DEFAULT = 10
+RECENT_LOGINS_MAX = 50
+
+
+def client_ip(request):
+    # REMOTE_ADDR; atrás de proxy, o servidor web é quem deve preenchê-lo com
+    # o endereço real (X-Forwarded-For pode ser forjado pelo cliente)
+    address = request.META.get('REMOTE_ADDR', '')
+    try:
+        return str(ipaddress.ip_address(address))
+    except ValueError:
+        return '0.0.0.0'
+
+
+class LoginBuffer(SpoolBuffer):
+    prefix = 'logins'
+
+    def append(self, user_id, ip_address, user_agent, timestamp=None):
+        self.push({
+            'user_id': user_id,
+            'ip_address': ip_address,
+            'user_agent': user_agent[:USER_AGENT_MAX_LENGTH],
+            'timestamp': (timestamp or timezone.now()).isoformat(),
+        })
+
+    def write(self, events):
+        return write_logins(events)
+
+
+def write_logins(events, batch_size=1_000):
+    # Usuários removidos depois do login não derrubam o lote
+    user_ids = set(User.objects.filter(
+        pk__in={event['user_id'] for event in events}
+    ).values_list('pk', flat=True))
+
+    logins = [
+        LoginHistory(
+            user_id=event['user_id'],
+            ip_address=event['ip_address'],
+            user_agent=event['user_agent'],
+            timestamp=parse_datetime(event['timestamp']),
+        )
+        for event in events
+        if event['user_id'] in user_ids
+    ]
+    with transaction.atomic():
+        LoginHistory.objects.bulk_create(logins, batch_size=batch_size)
+    invalidate_users({login.user_id for login in logins})
+    return len(logins)
+
+
+_buffer = None
+
+
+def get_login_buffer():
+    global _buffer
+    if _buffer is None:
+        _buffer = LoginBuffer(
+            settings.LOGIN_SPOOL_DIR,
+            flush_size=getattr(settings, 'LOGIN_FLUSH_SIZE', 500),
+            flush_interval=getattr(settings, 'LOGIN_FLUSH_INTERVAL', 2.0),
+        )
+        atexit.register(_buffer.flush)
+    return _buffer
+
+
+def record_login(request, user):
+    get_login_buffer().append(user.pk, client_ip(request), request.headers.get('User-Agent', ''))
+
+
+def recent_logins(user_id, limit=RECENT_LOGINS_DEFAULT):
+    # Percorre o índice (user, -timestamp) e para no limite
+    limit = max(1, min(limit, RECENT_LOGINS_MAX))
+    return list(
+        LoginHistory.objects.filter(user_id=user_id).order_by('-timestamp')
+        .values('timestamp', 'ip_address', 'user_agent')[:limit]
+    )
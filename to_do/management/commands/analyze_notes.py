@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from to_do.analysis import AnalysisPipeline
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera NoteAnalysis, NoteEntity e NoteTag para as notas novas ou editadas '
+        'desde a última análise, usando um pool de processos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Processos do pool (padrão: número de CPUs; 1 roda no próprio processo).')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--chunk-size', type=int, default=25,
+                            help='Notas enviadas a um worker por tarefa.')
+        parser.add_argument('--analyzer', help='Caminho do analisador (padrão: settings.NOTE_ANALYZER).')
+        parser.add_argument('--force', action='store_true',
+                            help='Reanalisa todas as notas, mesmo sem mudança de conteúdo.')
+
+    def handle(self, *args, **options):
+        pipeline = AnalysisPipeline(
+            analyzer=options['analyzer'],
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            chunk_size=options['chunk_size'],
+            force=options['force'],
+        )
+        started = time.perf_counter()
+        stats = pipeline.run()
+        self.stdout.write(
+            f'{stats["analyzed"]} notas analisadas, {stats["skipped"]} sem mudança '
+            f'em {time.perf_counter() - started:.1f}s'
+        )
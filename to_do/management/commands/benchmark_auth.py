@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from to_do.authentication import ClaimsTokenObtainPairSerializer
+from to_do.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o custo da autenticação por requisição: a cadeia antiga (Token, '
+        'Session, JWT com busca do usuário) contra a atual (JWT sem estado).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5_000)
+
+    def measure(self, authenticators, token, total):
+        # Uma requisição nova por vez: o Request do DRF grava o usuário na
+        # requisição do Django, e a SessionAuthentication o reaproveitaria
+        factory = APIRequestFactory()
+        django_requests = [
+            factory.get('/api/notes/', HTTP_AUTHORIZATION=f'Bearer {token}') for _ in range(total)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for django_request in django_requests:
+                request = Request(django_request, authenticators=[cls() for cls in authenticators])
+                assert request.user.is_authenticated
+            elapsed = time.perf_counter() - started
+        return elapsed / total * 1_000_000, len(queries) / total
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(
+            username=f'bench_{int(time.time())}',
+            email=f'bench_{int(time.time())}@example.com'
+        )
+        total = options['requests']
+        try:
+            plain = str(RefreshToken.for_user(user).access_token)
+            with_claims = str(ClaimsTokenObtainPairSerializer.get_token(user).access_token)
+            before = [TokenAuthentication, SessionAuthentication, JWTAuthentication]
+            after = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+
+            self.stdout.write(f'{"cadeia":<34} {"µs/req":>10} {"queries/req":>12}')
+            for name, authenticators, token in (
+                ('antes: Token, Session, JWT', before, plain),
+                ('atual: token sem claims', after, plain),
+                ('atual: JWT sem estado', after, with_claims),
+            ):
+                micros, queries = self.measure(authenticators, token, total)
+                self.stdout.write(f'{name:<34} {micros:>10.1f} {queries:>12.2f}')
+        finally:
+            user.delete()
@@ -0,0 +1,77 @@
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from to_do import ingest
+from to_do.models import User, Note, UserInteraction
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara a gravação de interações uma a uma (POST /api/user-interactions/) '
+        'com a ingestão em lote (POST /api/user-interactions/events/).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=5_000)
+        parser.add_argument('--notes', type=int, default=50)
+        parser.add_argument('--flush-size', type=int, default=500)
+        parser.add_argument('--client-batch', type=int, default=100,
+                            help='Eventos por requisição no modo em lote do cliente.')
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(
+            username=f'bench_{int(time.time())}',
+            email=f'bench_{int(time.time())}@example.com'
+        )
+        notes = Note.objects.bulk_create([
+            Note(user=user, title=f'bench {i}', content='x') for i in range(options['notes'])
+        ])
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(user=user)
+        total = options['events']
+
+        def event(i):
+            return {'note': notes[i % len(notes)].pk, 'interaction_type': 'view'}
+
+        previous = ingest._buffer
+        try:
+            with tempfile.TemporaryDirectory() as spool_dir:
+                # Flush síncrono por tamanho, para o tempo medido incluir a gravação
+                ingest._buffer = ingest.InteractionBuffer(
+                    spool_dir, flush_size=options['flush_size'], flush_interval=0
+                )
+
+                def per_request():
+                    for i in range(total):
+                        client.post('/api/user-interactions/', {**event(i), 'user': user.pk}, format='json')
+
+                def buffered():
+                    for i in range(total):
+                        client.post('/api/user-interactions/events/', event(i), format='json')
+                    ingest._buffer.flush()
+
+                def buffered_batches():
+                    size = options['client_batch']
+                    for start in range(0, total, size):
+                        batch = [event(i) for i in range(start, min(start + size, total))]
+                        client.post('/api/user-interactions/events/', batch, format='json')
+                    ingest._buffer.flush()
+
+                self.stdout.write(f'{"modo":<28} {"eventos/s":>12} {"gravados":>10}')
+                for name, run in (
+                    ('insert por requisição', per_request),
+                    ('buffer, 1 evento/req', buffered),
+                    (f'buffer, {options["client_batch"]} eventos/req', buffered_batches),
+                ):
+                    UserInteraction.objects.filter(user=user).delete()
+                    started = time.perf_counter()
+                    run()
+                    elapsed = time.perf_counter() - started
+                    written = UserInteraction.objects.filter(user=user).count()
+                    self.stdout.write(f'{name:<28} {total / elapsed:>12.0f} {written:>10}')
+        finally:
+            ingest._buffer = previous
+            user.delete()
@@ -0,0 +1,94 @@
+import time
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.pagination import Cursor, LimitOffsetPagination
+from rest_framework.request import Request
+
+from to_do.models import User, Note
+from to_do.pagination import NoteKeysetPagination
+
+
+class Command(BaseCommand):
+    help = 'Compara paginação por offset e por cursor (keyset) sobre as notas de um usuário.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--keep', action='store_true', help='Mantém os dados gerados ao final.')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        page_size = options['page_size']
+
+        user = self.seed(rows, options['batch_size'])
+        queryset = Note.objects.filter(user=user)
+        factory = RequestFactory()
+
+        try:
+            self.stdout.write(f'{"posição":>10} {"offset (ms)":>14} {"cursor (ms)":>14}')
+            for depth in (0, rows // 100, rows // 2, max(rows - page_size, 0)):
+                offset_ms = self.time_offset(factory, queryset, depth, page_size, options['repeat'])
+                cursor_ms = self.time_cursor(factory, queryset, depth, page_size, options['repeat'])
+                self.stdout.write(f'{depth:>10} {offset_ms:>14.2f} {cursor_ms:>14.2f}')
+        finally:
+            if not options['keep']:
+                user.delete()
+
+    def seed(self, rows, batch_size):
+        user = User.objects.create_user(
+            username=f'bench_{int(time.time())}',
+            email=f'bench_{int(time.time())}@example.com'
+        )
+        base = timezone.now()
+        for start in range(0, rows, batch_size):
+            notes = Note.objects.bulk_create([
+                Note(user=user, title=f'bench {i}', content='x')
+                for i in range(start, min(start + batch_size, rows))
+            ])
+            # created_at é auto_now_add; espalha os valores para um cursor realista
+            for i, note in enumerate(notes):
+                note.created_at = base - timedelta(seconds=start + i)
+            Note.objects.bulk_update(notes, ['created_at'])
+            self.stdout.write(f'{start + len(notes)}/{rows} notas criadas', ending='\r')
+        self.stdout.write('')
+        return user
+
+    def best_of(self, repeat, fn):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        return min(timings)
+
+    def time_offset(self, factory, queryset, depth, page_size, repeat):
+        paginator = LimitOffsetPagination()
+        request = Request(factory.get('/', {'limit': page_size, 'offset': depth}, HTTP_HOST='localhost'))
+        ordered = queryset.order_by('-created_at')
+
+        def run():
+            list(paginator.paginate_queryset(ordered, request))
+        return self.best_of(repeat, run)
+
+    def time_cursor(self, factory, queryset, depth, page_size, repeat):
+        paginator = NoteKeysetPagination()
+        paginator.page_size = page_size
+        anchor = next(iter(
+            queryset.order_by('-created_at').values_list('created_at', flat=True)[depth:depth + 1]
+        ), None)
+        params = {}
+        if anchor is not None and depth:
+            paginator.base_url = 'http://localhost/'
+            url = paginator.encode_cursor(Cursor(offset=0, reverse=False, position=str(anchor)))
+            params = parse_qs(urlparse(url).query)
+        request = Request(factory.get('/', params, HTTP_HOST='localhost'))
+
+        def run():
+            list(paginator.paginate_queryset(queryset, request))
+        return self.best_of(repeat, run)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from to_do.blobs import dedup_legacy_file
+from to_do.models import File
+
+
+class Command(BaseCommand):
+    help = (
+        'Move os anexos anteriores ao armazenamento por conteúdo para os blobs '
+        'correspondentes, removendo do storage as cópias repetidas.'
+    )
+
+    def handle(self, *args, **options):
+        moved, digests = 0, set()
+        for instance in File.objects.filter(blob__isnull=True).iterator():
+            digests.add(dedup_legacy_file(instance).digest)
+            moved += 1
+        self.stdout.write(f'{moved} anexos movidos para {len(digests)} blobs.')
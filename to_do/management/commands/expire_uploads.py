@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from to_do.uploads import expire_uploads
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove os envios de arquivo em partes que não recebem dados há mais '
+        'do que o tempo informado, junto com os arquivos parciais.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24,
+                            help='Envios parados há mais destas horas são removidos.')
+
+    def handle(self, *args, **options):
+        removed = expire_uploads(max_age=timedelta(hours=options['hours']))
+        self.stdout.write(f'{removed} envios expirados removidos.')
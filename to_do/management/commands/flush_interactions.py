@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from to_do.ingest import get_buffer
+
+
+class Command(BaseCommand):
+    help = (
+        'Grava no banco os eventos de interação que ficaram no spool de '
+        'processos encerrados (por exemplo, após uma queda do servidor).'
+    )
+
+    def handle(self, *args, **options):
+        written = get_buffer().recover()
+        self.stdout.write(f'{written} interações regravadas do spool.')
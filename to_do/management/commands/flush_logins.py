@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from to_do.logins import get_login_buffer
+
+
+class Command(BaseCommand):
+    help = (
+        'Grava no banco os registros de login que ficaram no spool de '
+        'processos encerrados (por exemplo, após uma queda do servidor).'
+    )
+
+    def handle(self, *args, **options):
+        written = get_login_buffer().recover()
+        self.stdout.write(f'{written} logins regravados do spool.')
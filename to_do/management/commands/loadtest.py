@@ -0,0 +1,101 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Dispara requisições GET concorrentes contra um ou mais servidores e '
+        'mostra vazão e latências (p50/p95/p99). Ex.: suba o mesmo projeto com '
+        'gunicorn to_do_list.wsgi (porta 8000) e uvicorn to_do_list.asgi:application '
+        '(porta 8001) e rode: manage.py loadtest --target wsgi=http://127.0.0.1:8000 '
+        '--target asgi=http://127.0.0.1:8001 --path /api/notes/ --path /api/async/notes/ '
+        '--token <access token>'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True,
+                            help='nome=url base; pode ser repetido.')
+        parser.add_argument('--path', action='append', required=True,
+                            help='Caminho a testar; pode ser repetido.')
+        parser.add_argument('--token', help='Access token JWT enviado como Bearer.')
+        parser.add_argument('--concurrency', type=int, default=200)
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--timeout', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep:
+                raise CommandError(f'Use nome=url em --target (recebido: {target}).')
+            targets.append((name, urlsplit(url)))
+
+        self.stdout.write(
+            f'{"alvo":<10} {"caminho":<32} {"req/s":>9} {"p50 ms":>9} '
+            f'{"p95 ms":>9} {"p99 ms":>9} {"erros":>7}'
+        )
+        for name, url in targets:
+            for path in options['path']:
+                stats = asyncio.run(self.run(url, path, options))
+                self.stdout.write(
+                    f'{name:<10} {path:<32} {stats["rps"]:>9.1f} {stats["p50"]:>9.1f} '
+                    f'{stats["p95"]:>9.1f} {stats["p99"]:>9.1f} {stats["errors"]:>7}'
+                )
+
+    async def run(self, url, path, options):
+        host, port = url.hostname, url.port or (443 if url.scheme == 'https' else 80)
+        headers = [f'Host: {url.netloc}', 'Connection: close', 'Accept: application/json']
+        if options['token']:
+            headers.append(f'Authorization: Bearer {options["token"]}')
+        request = (f'GET {path} HTTP/1.1\r\n' + '\r\n'.join(headers) + '\r\n\r\n').encode()
+        ssl = url.scheme == 'https'
+
+        remaining = options['requests']
+        latencies, errors = [], 0
+
+        async def fetch():
+            reader, writer = await asyncio.open_connection(host, port, ssl=ssl)
+            try:
+                writer.write(request)
+                await writer.drain()
+                status_line = await reader.readline()
+                await reader.read()
+                return int(status_line.split()[1])
+            finally:
+                writer.close()
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                try:
+                    status = await asyncio.wait_for(fetch(), options['timeout'])
+                except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+                    status = None
+                if status != 200:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(options['concurrency'])))
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+        return {
+            'rps': len(latencies) / elapsed if elapsed else 0.0,
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+            'errors': errors,
+        }
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from to_do.partitions import (
+    PARTITIONED_TABLES, ensure_partitions, expire_partitions, list_partitions, retention_months
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Cria as partições mensais dos próximos meses e remove (ou arquiva) as '
+        'que passaram da retenção em settings.PARTITION_RETENTION_MONTHS. '
+        'Rode diariamente (cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=3,
+                            help='Meses futuros com partição já criada.')
+        parser.add_argument('--archive', action='store_true',
+                            help='Move as partições expiradas para o schema to_do_archive em vez de apagar.')
+        parser.add_argument('--list', action='store_true', help='Só lista as partições existentes.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Particionamento disponível apenas no PostgreSQL.')
+
+        for table in PARTITIONED_TABLES:
+            if options['list']:
+                for month, name in list_partitions(table):
+                    self.stdout.write(f'{table:<24} {month:%Y-%m} {name}')
+                continue
+
+            for name in ensure_partitions(table, months_ahead=options['ahead']):
+                self.stdout.write(f'criada {name}')
+            keep = retention_months(table)
+            if keep is None:
+                continue
+            action = 'arquivada' if options['archive'] else 'removida'
+            for name in expire_partitions(table, keep, archive=options['archive']):
+                self.stdout.write(f'{action} {name}')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from to_do.access import rebuild_access
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula o índice de acesso às notas (NoteAccess) a partir das notas '
+        'e dos compartilhamentos, por exemplo após uma carga feita direto no banco.'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_access()
+        self.stdout.write(f'{count} acessos indexados.')
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from to_do.rollups import reset_search_rollups, rollup_search_logs
+
+
+class Command(BaseCommand):
+    help = (
+        'Agrega SearchLog nas tabelas de resumo por hora e por dia a partir da '
+        'última marca d\'água. Rode periodicamente (cron, a cada poucos minutos).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lag-minutes', type=int, default=5,
+                            help='Horas só são agregadas depois deste atraso.')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Apaga os agregados e recalcula a partir dos logs ainda existentes.')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            reset_search_rollups()
+        stats = rollup_search_logs(lag=timedelta(minutes=options['lag_minutes']))
+        self.stdout.write(f'{stats["hours"]} horas agregadas; marca d\'água em {stats["watermark"]:%Y-%m-%d %H:%M}')
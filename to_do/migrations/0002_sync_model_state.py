@@ -0,0 +1,620 @@
+# Generated by Django 5.1.6 on 2026-10-18 01:34
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('to_do', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteEntity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(max_length=100, verbose_name='Tipo de Entidade')),
+                ('entity_value', models.CharField(max_length=255, verbose_name='Valor da Entidade')),
+            ],
+            options={
+                'verbose_name': 'Entidade de Nota',
+                'verbose_name_plural': 'Entidades de Notas',
+            },
+        ),
+        migrations.CreateModel(
+            name='NoteSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('suggestion', models.TextField(verbose_name='Sugestão')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('applied', models.BooleanField(default=False, verbose_name='Aplicada?')),
+            ],
+            options={
+                'verbose_name': 'Sugestão de Nota',
+                'verbose_name_plural': 'Sugestões de Notas',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='NoteTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.CharField(db_index=True, max_length=100, verbose_name='Tag')),
+            ],
+            options={
+                'verbose_name': 'Tag de Nota',
+                'verbose_name_plural': 'Tags de Notas',
+            },
+        ),
+        migrations.RemoveField(
+            model_name='noteentities',
+            name='note',
+        ),
+        migrations.RemoveField(
+            model_name='notesuggestions',
+            name='note',
+        ),
+        migrations.RemoveField(
+            model_name='notetags',
+            name='note',
+        ),
+        migrations.AlterModelOptions(
+            name='address',
+            options={'verbose_name': 'Endereço', 'verbose_name_plural': 'Endereços'},
+        ),
+        migrations.AlterModelOptions(
+            name='category',
+            options={'ordering': ['name'], 'verbose_name': 'Categoria', 'verbose_name_plural': 'Categorias'},
+        ),
+        migrations.AlterModelOptions(
+            name='chatinteraction',
+            options={'ordering': ['-timestamp'], 'verbose_name': 'Interação de Chat', 'verbose_name_plural': 'Interações de Chat'},
+        ),
+        migrations.AlterModelOptions(
+            name='contact',
+            options={'verbose_name': 'Contato', 'verbose_name_plural': 'Contatos'},
+        ),
+        migrations.AlterModelOptions(
+            name='file',
+            options={'ordering': ['-uploaded_at'], 'verbose_name': 'Arquivo', 'verbose_name_plural': 'Arquivos'},
+        ),
+        migrations.AlterModelOptions(
+            name='loginhistory',
+            options={'ordering': ['-timestamp'], 'verbose_name': 'Histórico de Login', 'verbose_name_plural': 'Históricos de Login'},
+        ),
+        migrations.AlterModelOptions(
+            name='note',
+            options={'ordering': ['-created_at'], 'verbose_name': 'Nota', 'verbose_name_plural': 'Notas'},
+        ),
+        migrations.AlterModelOptions(
+            name='noteanalysis',
+            options={'ordering': ['-created_at'], 'verbose_name': 'Análise de Nota', 'verbose_name_plural': 'Análises de Notas'},
+        ),
+        migrations.AlterModelOptions(
+            name='notehistory',
+            options={'ordering': ['-edited_at'], 'verbose_name': 'Histórico de Nota', 'verbose_name_plural': 'Históricos de Notas'},
+        ),
+        migrations.AlterModelOptions(
+            name='noterecommendation',
+            options={'ordering': ['-score', '-created_at'], 'verbose_name': 'Recomendação de Nota', 'verbose_name_plural': 'Recomendações de Notas'},
+        ),
+        migrations.AlterModelOptions(
+            name='notification',
+            options={'ordering': ['-sent_at'], 'verbose_name': 'Notificação', 'verbose_name_plural': 'Notificações'},
+        ),
+        migrations.AlterModelOptions(
+            name='notificationtype',
+            options={'verbose_name': 'Tipo de Notificação', 'verbose_name_plural': 'Tipos de Notificação'},
+        ),
+        migrations.AlterModelOptions(
+            name='review',
+            options={'ordering': ['-created_at'], 'verbose_name': 'Avaliação', 'verbose_name_plural': 'Avaliações'},
+        ),
+        migrations.AlterModelOptions(
+            name='searchlog',
+            options={'ordering': ['-created_at'], 'verbose_name': 'Log de Busca', 'verbose_name_plural': 'Logs de Busca'},
+        ),
+        migrations.AlterModelOptions(
+            name='sharing',
+            options={'ordering': ['-shared_at'], 'verbose_name': 'Compartilhamento', 'verbose_name_plural': 'Compartilhamentos'},
+        ),
+        migrations.AlterModelOptions(
+            name='subject',
+            options={'ordering': ['name'], 'verbose_name': 'Assunto', 'verbose_name_plural': 'Assuntos'},
+        ),
+        migrations.AlterModelOptions(
+            name='user',
+            options={'ordering': ['-created_at'], 'verbose_name': 'Usuário', 'verbose_name_plural': 'Usuários'},
+        ),
+        migrations.AlterModelOptions(
+            name='userinteraction',
+            options={'ordering': ['-timestamp'], 'verbose_name': 'Interação do Usuário', 'verbose_name_plural': 'Interações dos Usuários'},
+        ),
+        migrations.RemoveField(
+            model_name='notehistory',
+            name='change_reason',
+        ),
+        migrations.RemoveField(
+            model_name='notehistory',
+            name='updated_content',
+        ),
+        migrations.RemoveField(
+            model_name='searchlog',
+            name='search_results',
+        ),
+        migrations.AddField(
+            model_name='chatinteraction',
+            name='note_context',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='to_do.note'),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='uploaded_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Enviado em'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='noteanalysis',
+            name='keywords',
+            field=models.JSONField(default=list, verbose_name='Palavras-chave'),
+        ),
+        migrations.AddField(
+            model_name='noterecommendation',
+            name='algorithm_version',
+            field=models.CharField(default='', max_length=50, verbose_name='Versão do Algoritmo'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='message',
+            field=models.TextField(default='', verbose_name='Mensagem'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='read',
+            field=models.BooleanField(default=False, verbose_name='Lida?'),
+        ),
+        migrations.AddField(
+            model_name='notificationtype',
+            name='template',
+            field=models.TextField(default='', verbose_name='Modelo de Mensagem'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Criado em'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='reviewer',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviews', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='searchlog',
+            name='results_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Resultados Encontrados'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='sharing',
+            name='can_edit',
+            field=models.BooleanField(default=False, verbose_name='Pode editar?'),
+        ),
+        migrations.AddField(
+            model_name='sharing',
+            name='shared_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Compartilhado em'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='userinteraction',
+            name='metadata',
+            field=models.JSONField(blank=True, null=True, verbose_name='Metadados'),
+        ),
+        migrations.AlterField(
+            model_name='address',
+            name='city',
+            field=models.CharField(max_length=100, verbose_name='Cidade'),
+        ),
+        migrations.AlterField(
+            model_name='address',
+            name='complement',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Complemento'),
+        ),
+        migrations.AlterField(
+            model_name='address',
+            name='neighborhood',
+            field=models.CharField(max_length=100, verbose_name='Bairro'),
+        ),
+        migrations.AlterField(
+            model_name='address',
+            name='number',
+            field=models.CharField(max_length=20, verbose_name='Número'),
+        ),
+        migrations.AlterField(
+            model_name='address',
+            name='postal_code',
+            field=models.CharField(max_length=9, validators=[django.core.validators.RegexValidator(message='CEP inválido. Formato: 00000-000', regex='^\\d{5}-?\\d{3}$')], verbose_name='CEP'),
+        ),
+        migrations.AlterField(
+            model_name='address',
+            name='state',
+            field=models.CharField(choices=[('AC', 'Acre'), ('AL', 'Alagoas'), ('AP', 'Amapá'), ('AM', 'Amazonas'), ('BA', 'Bahia'), ('CE', 'Ceará'), ('DF', 'Distrito Federal'), ('ES', 'Espírito Santo'), ('GO', 'Goiás'), ('MA', 'Maranhão'), ('MT', 'Mato Grosso'), ('MS', 'Mato Grosso do Sul'), ('MG', 'Minas Gerais'), ('PA', 'Pará'), ('PB', 'Paraíba'), ('PR', 'Paraná'), ('PE', 'Pernambuco'), ('PI', 'Piauí'), ('RJ', 'Rio de Janeiro'), ('RN', 'Rio Grande do Norte'), ('RS', 'Rio Grande do Sul'), ('RO', 'Rondônia'), ('RR', 'Roraima'), ('SC', 'Santa Catarina'), ('SP', 'São Paulo'), ('SE', 'Sergipe'), ('TO', 'Tocantins')], max_length=2, verbose_name='Estado'),
+        ),
+        migrations.AlterField(
+            model_name='address',
+            name='street',
+            field=models.CharField(max_length=100, verbose_name='Rua'),
+        ),
+        migrations.AlterField(
+            model_name='address',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='addresses', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='description',
+            field=models.TextField(blank=True, verbose_name='Descrição'),
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='name',
+            field=models.CharField(max_length=100, unique=True, verbose_name='Nome'),
+        ),
+        migrations.AlterField(
+            model_name='chatinteraction',
+            name='message',
+            field=models.TextField(verbose_name='Mensagem'),
+        ),
+        migrations.AlterField(
+            model_name='chatinteraction',
+            name='response',
+            field=models.TextField(verbose_name='Resposta'),
+        ),
+        migrations.AlterField(
+            model_name='chatinteraction',
+            name='timestamp',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Data/Hora'),
+        ),
+        migrations.AlterField(
+            model_name='chatinteraction',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_interactions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='contact',
+            name='landline',
+            field=models.CharField(blank=True, max_length=20, validators=[django.core.validators.RegexValidator(message="Formato: '+999999999'. Máx 15 dígitos.", regex='^\\+?1?\\d{9,15}$')], verbose_name='Telefone Fixo'),
+        ),
+        migrations.AlterField(
+            model_name='contact',
+            name='mobile_phone',
+            field=models.CharField(max_length=20, validators=[django.core.validators.RegexValidator(message="Formato: '+999999999'. Máx 15 dígitos.", regex='^\\+?1?\\d{9,15}$')], verbose_name='Celular'),
+        ),
+        migrations.AlterField(
+            model_name='contact',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contacts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='file',
+            name='file',
+            field=models.FileField(upload_to='notes/files/%Y/%m/%d/', verbose_name='Arquivo'),
+        ),
+        migrations.AlterField(
+            model_name='file',
+            name='note',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='files', to='to_do.note'),
+        ),
+        migrations.AlterField(
+            model_name='loginhistory',
+            name='ip_address',
+            field=models.GenericIPAddressField(verbose_name='Endereço IP'),
+        ),
+        migrations.AlterField(
+            model_name='loginhistory',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='login_histories', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='loginhistory',
+            name='user_agent',
+            field=models.CharField(max_length=255, verbose_name='User Agent'),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='categories',
+            field=models.ManyToManyField(blank=True, related_name='notes', to='to_do.category', verbose_name='Categorias'),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='completed',
+            field=models.BooleanField(default=False, verbose_name='Completo?'),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='content',
+            field=models.TextField(verbose_name='Conteúdo'),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Criado em'),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='subjects',
+            field=models.ManyToManyField(blank=True, related_name='notes', to='to_do.subject', verbose_name='Assuntos'),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='title',
+            field=models.CharField(db_index=True, max_length=200, verbose_name='Título'),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Atualizado em'),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notes', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='noteanalysis',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Criado em'),
+        ),
+        migrations.AlterField(
+            model_name='noteanalysis',
+            name='note',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='analysis', to='to_do.note'),
+        ),
+        migrations.AlterField(
+            model_name='noteanalysis',
+            name='sentiment',
+            field=models.CharField(choices=[('positive', 'Positivo'), ('negative', 'Negativo'), ('neutral', 'Neutro')], max_length=20, verbose_name='Sentimento'),
+        ),
+        migrations.AlterField(
+            model_name='noteanalysis',
+            name='summary',
+            field=models.TextField(verbose_name='Resumo'),
+        ),
+        migrations.AlterField(
+            model_name='notehistory',
+            name='edited_at',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Editado em'),
+        ),
+        migrations.AlterField(
+            model_name='notehistory',
+            name='edited_by',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='note_edits', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='notehistory',
+            name='note',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history', to='to_do.note'),
+        ),
+        migrations.AlterField(
+            model_name='notehistory',
+            name='previous_content',
+            field=models.TextField(verbose_name='Conteúdo Anterior'),
+        ),
+        migrations.AlterField(
+            model_name='noterecommendation',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Criado em'),
+        ),
+        migrations.AlterField(
+            model_name='noterecommendation',
+            name='recommended_note',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_to', to='to_do.note'),
+        ),
+        migrations.AlterField(
+            model_name='noterecommendation',
+            name='score',
+            field=models.DecimalField(decimal_places=2, max_digits=5, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(1)], verbose_name='Score'),
+        ),
+        migrations.AlterField(
+            model_name='noterecommendation',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='note',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='to_do.note'),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='sent_at',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Enviada em'),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='notifications', to='to_do.notificationtype'),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='notificationtype',
+            name='description',
+            field=models.TextField(blank=True, verbose_name='Descrição'),
+        ),
+        migrations.AlterField(
+            model_name='notificationtype',
+            name='name',
+            field=models.CharField(max_length=50, unique=True, verbose_name='Tipo de Notificação'),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='comment',
+            field=models.TextField(blank=True, verbose_name='Comentário'),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='note',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='to_do.note'),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='rating',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Péssimo'), (2, 'Ruim'), (3, 'Regular'), (4, 'Bom'), (5, 'Excelente')], validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)]),
+        ),
+        migrations.AlterField(
+            model_name='searchlog',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Criado em'),
+        ),
+        migrations.AlterField(
+            model_name='searchlog',
+            name='query',
+            field=models.CharField(max_length=255, verbose_name='Consulta'),
+        ),
+        migrations.AlterField(
+            model_name='searchlog',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='sharing',
+            name='note',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shares', to='to_do.note'),
+        ),
+        migrations.AlterField(
+            model_name='subject',
+            name='description',
+            field=models.TextField(blank=True, verbose_name='Descrição'),
+        ),
+        migrations.AlterField(
+            model_name='subject',
+            name='name',
+            field=models.CharField(max_length=100, unique=True, verbose_name='Nome'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='date_of_birth',
+            field=models.DateField(blank=True, null=True, verbose_name='Data de Nascimento'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='groups',
+            field=models.ManyToManyField(blank=True, help_text='Grupos aos quais este usuário pertence.', related_name='custom_users', to='auth.group', verbose_name='groups'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='user_permissions',
+            field=models.ManyToManyField(blank=True, help_text='Permissões específicas para este usuário.', related_name='custom_users', to='auth.permission', verbose_name='user permissions'),
+        ),
+        migrations.AlterField(
+            model_name='userinteraction',
+            name='interaction_type',
+            field=models.CharField(choices=[('view', 'Visualização'), ('edit', 'Edição'), ('share', 'Compartilhamento'), ('rate', 'Avaliação')], max_length=20, verbose_name='Tipo de Interação'),
+        ),
+        migrations.AlterField(
+            model_name='userinteraction',
+            name='note',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='interactions', to='to_do.note'),
+        ),
+        migrations.AlterField(
+            model_name='userinteraction',
+            name='timestamp',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Data/Hora'),
+        ),
+        migrations.AlterField(
+            model_name='userinteraction',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='interactions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='loginhistory',
+            index=models.Index(fields=['user', '-timestamp'], name='to_do_login_user_id_ed05bb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['title'], name='to_do_note_title_11b7b3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['created_at'], name='to_do_note_created_7edd64_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['updated_at'], name='to_do_note_updated_00cad6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='noterecommendation',
+            index=models.Index(fields=['user', '-score'], name='to_do_noter_user_id_a70fe2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['sent_at'], name='to_do_notif_sent_at_a62d9e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['email'], name='email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userinteraction',
+            index=models.Index(fields=['interaction_type'], name='to_do_useri_interac_59414c_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='address',
+            constraint=models.UniqueConstraint(fields=('user', 'postal_code'), name='unique_user_address'),
+        ),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(fields=('note', 'reviewer'), name='unique_note_reviewer'),
+        ),
+        migrations.AddField(
+            model_name='noteentity',
+            name='note',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entities', to='to_do.note'),
+        ),
+        migrations.AddField(
+            model_name='notesuggestion',
+            name='note',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='suggestions', to='to_do.note'),
+        ),
+        migrations.AddField(
+            model_name='notetag',
+            name='note',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tags', to='to_do.note'),
+        ),
+        migrations.DeleteModel(
+            name='NoteEntities',
+        ),
+        migrations.DeleteModel(
+            name='NoteSuggestions',
+        ),
+        migrations.DeleteModel(
+            name='NoteTags',
+        ),
+        migrations.AddIndex(
+            model_name='noteentity',
+            index=models.Index(fields=['entity_type'], name='to_do_notee_entity__ebc378_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='notetag',
+            constraint=models.UniqueConstraint(fields=('note', 'tag'), name='unique_note_tag'),
+        ),
+    ]
@@ -0,0 +1,111 @@
+# Generated by Django 5.1.6 on 2026-10-18 01:35
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# O documento de busca junta título (peso A), conteúdo (B), tags e valores
+# de entidades (C). Os triggers de tags/entidades são por statement, usando
+# transition tables, para que inserções em lote atualizem cada nota uma vez.
+SEARCH_TRIGGERS_SQL = '''
+CREATE FUNCTION to_do_note_search_document(p_id bigint, p_title text, p_content text)
+RETURNS tsvector LANGUAGE sql STABLE AS $$
+    SELECT
+        setweight(to_tsvector('portuguese', coalesce(p_title, '')), 'A') ||
+        setweight(to_tsvector('portuguese', coalesce(p_content, '')), 'B') ||
+        setweight(to_tsvector('portuguese', coalesce(
+            (SELECT string_agg(tag, ' ') FROM to_do_notetag WHERE note_id = p_id), ''
+        )), 'C') ||
+        setweight(to_tsvector('portuguese', coalesce(
+            (SELECT string_agg(entity_value, ' ') FROM to_do_noteentity WHERE note_id = p_id), ''
+        )), 'C')
+$$;
+
+CREATE FUNCTION to_do_note_search_vector_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_vector := to_do_note_search_document(NEW.id, NEW.title, NEW.content);
+    RETURN NEW;
+END
+$$;
+
+CREATE TRIGGER note_search_vector_update
+    BEFORE INSERT OR UPDATE OF title, content ON to_do_note
+    FOR EACH ROW EXECUTE FUNCTION to_do_note_search_vector_trigger();
+
+CREATE FUNCTION to_do_note_children_search_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        UPDATE to_do_note n
+           SET search_vector = to_do_note_search_document(n.id, n.title, n.content)
+         WHERE n.id IN (SELECT DISTINCT note_id FROM old_rows);
+    ELSE
+        UPDATE to_do_note n
+           SET search_vector = to_do_note_search_document(n.id, n.title, n.content)
+         WHERE n.id IN (SELECT DISTINCT note_id FROM new_rows);
+    END IF;
+    IF TG_OP = 'UPDATE' THEN
+        UPDATE to_do_note n
+           SET search_vector = to_do_note_search_document(n.id, n.title, n.content)
+         WHERE n.id IN (SELECT DISTINCT note_id FROM old_rows
+                         WHERE note_id NOT IN (SELECT note_id FROM new_rows));
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER notetag_search_insert AFTER INSERT ON to_do_notetag
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION to_do_note_children_search_trigger();
+CREATE TRIGGER notetag_search_update AFTER UPDATE ON to_do_notetag
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION to_do_note_children_search_trigger();
+CREATE TRIGGER notetag_search_delete AFTER DELETE ON to_do_notetag
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION to_do_note_children_search_trigger();
+
+CREATE TRIGGER noteentity_search_insert AFTER INSERT ON to_do_noteentity
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION to_do_note_children_search_trigger();
+CREATE TRIGGER noteentity_search_update AFTER UPDATE ON to_do_noteentity
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION to_do_note_children_search_trigger();
+CREATE TRIGGER noteentity_search_delete AFTER DELETE ON to_do_noteentity
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION to_do_note_children_search_trigger();
+
+UPDATE to_do_note
+   SET search_vector = to_do_note_search_document(id, title, content);
+'''
+
+DROP_SEARCH_TRIGGERS_SQL = '''
+DROP TRIGGER IF EXISTS noteentity_search_delete ON to_do_noteentity;
+DROP TRIGGER IF EXISTS noteentity_search_update ON to_do_noteentity;
+DROP TRIGGER IF EXISTS noteentity_search_insert ON to_do_noteentity;
+DROP TRIGGER IF EXISTS notetag_search_delete ON to_do_notetag;
+DROP TRIGGER IF EXISTS notetag_search_update ON to_do_notetag;
+DROP TRIGGER IF EXISTS notetag_search_insert ON to_do_notetag;
+DROP TRIGGER IF EXISTS note_search_vector_update ON to_do_note;
+DROP FUNCTION IF EXISTS to_do_note_children_search_trigger();
+DROP FUNCTION IF EXISTS to_do_note_search_vector_trigger();
+DROP FUNCTION IF EXISTS to_do_note_search_document(bigint, text, text);
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('to_do', '0002_sync_model_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='note_search_vector_idx'),
+        ),
+        migrations.RunSQL(SEARCH_TRIGGERS_SQL, DROP_SEARCH_TRIGGERS_SQL),
+    ]
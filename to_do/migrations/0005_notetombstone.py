@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-18 01:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('to_do', '0004_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('note_id', models.BigIntegerField(verbose_name='Nota')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Excluída em')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Nota Excluída',
+                'verbose_name_plural': 'Notas Excluídas',
+                'ordering': ['-deleted_at'],
+                'indexes': [models.Index(fields=['user', 'deleted_at'], name='to_do_notet_user_id_8cebbc_idx')],
+            },
+        ),
+    ]
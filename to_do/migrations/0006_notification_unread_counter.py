@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-18 01:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('to_do', '0005_notetombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread', models.PositiveIntegerField(default=0, verbose_name='Não lidas')),
+            ],
+            options={
+                'verbose_name': 'Contador de Notificações',
+                'verbose_name_plural': 'Contadores de Notificações',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('read', False)), fields=['user', '-sent_at'], name='notification_unread_idx'),
+        ),
+    ]
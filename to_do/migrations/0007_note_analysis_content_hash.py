@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 01:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('to_do', '0006_notification_unread_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='noteanalysis',
+            name='analyzed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Analisado em'),
+        ),
+        migrations.AddField(
+            model_name='noteanalysis',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64, verbose_name='Hash do Conteúdo'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-18 01:51
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('to_do', '0007_note_analysis_content_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userinteraction',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Data/Hora'),
+        ),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.1.6 on 2026-10-18 01:53
+
+from datetime import date
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# Recria as três tabelas de log como tabelas particionadas por mês. O
+# PostgreSQL exige a coluna de partição na chave primária, então a PK passa a
+# ser (id, coluna); o id continua único por vir de uma sequência própria
+# (colunas identity só são aceitas em tabelas particionadas a partir do PG 17).
+# A cópia dos dados existentes acontece uma única vez, aqui.
+PARTITIONED = [
+    ('LoginHistory', 'timestamp'),
+    ('SearchLog', 'created_at'),
+    ('UserInteraction', 'timestamp'),
+]
+MONTHS_AHEAD = 3
+
+
+# Cópias de to_do/partitions.py como estavam nesta migração, para que mudanças
+# posteriores no módulo não alterem o que ela cria
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def create_partition_sql(table, month):
+    return (
+        f'CREATE TABLE IF NOT EXISTS {table}_p{month:%Y%m} PARTITION OF {table} '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def create_default_partition_sql(table):
+    return f'CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT'
+
+
+def partition_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    execute = schema_editor.execute
+    for model_name, column in PARTITIONED:
+        model = apps.get_model('to_do', model_name)
+        table = model._meta.db_table
+        legacy = f'{table}_legacy'
+
+        execute(f'ALTER TABLE {table} RENAME TO {legacy}')
+        execute(
+            f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE ({column})'
+        )
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'SELECT min({column}), max(id) FROM {legacy}')
+            oldest, last_id = cursor.fetchone()
+        month = month_start(oldest or timezone.now())
+        last_month = add_months(month_start(timezone.now()), MONTHS_AHEAD)
+        while month <= last_month:
+            execute(create_partition_sql(table, month))
+            month = add_months(month, 1)
+        execute(create_default_partition_sql(table))
+
+        execute(f'INSERT INTO {table} SELECT * FROM {legacy}')
+        execute(f'DROP TABLE {legacy}')
+        # Depois do DROP: o nome do índice da PK antiga fica livre
+        execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id, {column})')
+        execute(f'CREATE SEQUENCE {table}_id_seq START WITH {(last_id or 0) + 1} OWNED BY {table}.id')
+        execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{table}_id_seq')")
+
+        for field in model._meta.fields:
+            if field.remote_field is None:
+                continue
+            target = field.remote_field.model._meta
+            execute(
+                f'ALTER TABLE {table} ADD CONSTRAINT {table}_{field.column}_fk '
+                f'FOREIGN KEY ({field.column}) REFERENCES {target.db_table} ({target.pk.column}) '
+                f'DEFERRABLE INITIALLY DEFERRED'
+            )
+            execute(f'CREATE INDEX {table}_{field.column}_idx ON {table} ({field.column})')
+        for index in model._meta.indexes:
+            schema_editor.add_index(model, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('to_do', '0008_interaction_event_timestamp'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='searchlog',
+            index=models.Index(fields=['user', '-created_at'], name='to_do_searc_user_id_908921_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userinteraction',
+            index=models.Index(fields=['user', '-timestamp'], name='to_do_useri_user_id_865515_idx'),
+        ),
+        # Sem volta: desfazer exigiria recriar as tabelas sem partição
+        migrations.RunPython(partition_tables),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.6 on 2026-10-18 01:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('to_do', '0009_partition_log_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('position', models.DateTimeField(verbose_name='Posição')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': "Marca d'água de Agregação",
+                'verbose_name_plural': "Marcas d'água de Agregação",
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hora'), ('day', 'Dia')], max_length=4, verbose_name='Período')),
+                ('bucket', models.DateTimeField(verbose_name='Início do Período')),
+                ('query', models.CharField(max_length=255, verbose_name='Consulta')),
+                ('searches', models.PositiveIntegerField(default=0, verbose_name='Buscas')),
+                ('total_results', models.BigIntegerField(default=0, verbose_name='Total de Resultados')),
+                ('zero_results', models.PositiveIntegerField(default=0, verbose_name='Buscas sem Resultado')),
+            ],
+            options={
+                'verbose_name': 'Agregado de Buscas',
+                'verbose_name_plural': 'Agregados de Buscas',
+                'ordering': ['-bucket', '-searches'],
+                'indexes': [models.Index(fields=['period', 'bucket'], name='to_do_searc_period_cdf49d_idx')],
+                'constraints': [models.UniqueConstraint(fields=('period', 'bucket', 'query'), name='unique_search_rollup')],
+            },
+        ),
+    ]
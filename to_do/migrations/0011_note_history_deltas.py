@@ -0,0 +1,146 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:05
+
+import difflib
+import json
+
+from django.db import migrations, models
+
+# Cópia do formato de to_do/history.py como era nesta migração: mudanças
+# futuras lá (formato do delta, SNAPSHOT_INTERVAL) não podem alterar o que
+# ela grava num banco novo
+SNAPSHOT_INTERVAL = 20
+
+
+def diff(source, target):
+    source_lines = source.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    delta = []
+    matcher = difflib.SequenceMatcher(None, source_lines, target_lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            delta.append(i2 - i1)
+            continue
+        if i2 > i1:
+            delta.append(i1 - i2)
+        if j2 > j1:
+            delta.append(''.join(target_lines[j1:j2]))
+    return delta
+
+
+def patch(source, delta):
+    lines = source.splitlines(keepends=True)
+    position, output = 0, []
+    for operation in delta:
+        if isinstance(operation, str):
+            output.append(operation)
+        elif operation > 0:
+            output.extend(lines[position:position + operation])
+            position += operation
+        else:
+            position -= operation
+    return ''.join(output)
+
+
+def encode_version(content, previous, base, chain_length):
+    fields = {'previous_delta': diff(content, previous), 'snapshot': None, 'content_delta': None}
+    if base is None or chain_length >= SNAPSHOT_INTERVAL:
+        fields['snapshot'] = content
+        return fields
+    delta = diff(base, content)
+    if len(json.dumps(delta)) > len(content) // 2:
+        fields['snapshot'] = content
+    else:
+        fields['content_delta'] = delta
+    return fields
+
+
+def encode_history(apps, schema_editor):
+    # Cada linha antiga só tinha o conteúdo anterior à edição; o conteúdo
+    # posterior é o anterior da edição seguinte (ou o atual, na última)
+    Note = apps.get_model('to_do', 'Note')
+    NoteHistory = apps.get_model('to_do', 'NoteHistory')
+    note_ids = NoteHistory.objects.values_list('note_id', flat=True).distinct().order_by()
+    for note_id in note_ids.iterator():
+        entries = list(NoteHistory.objects.filter(note_id=note_id).order_by('edited_at', 'id'))
+        current = Note.objects.filter(pk=note_id).values_list('content', flat=True).first() or ''
+        followers = [entry.previous_content for entry in entries[1:]] + [current]
+
+        base, chain_length = None, 0
+        for version, (entry, updated) in enumerate(zip(entries, followers), start=1):
+            fields = encode_version(updated, entry.previous_content, base, chain_length)
+            for name, value in fields.items():
+                setattr(entry, name, value)
+            entry.version = version
+            chain_length = 1 if fields['snapshot'] is not None else chain_length + 1
+            base = updated
+        NoteHistory.objects.bulk_update(
+            entries, ['version', 'snapshot', 'content_delta', 'previous_delta'], batch_size=500
+        )
+
+
+def decode_history(apps, schema_editor):
+    # Volta a gravar previous_content a partir dos deltas, versão a versão
+    NoteHistory = apps.get_model('to_do', 'NoteHistory')
+    note_ids = NoteHistory.objects.values_list('note_id', flat=True).distinct().order_by()
+    for note_id in note_ids.iterator():
+        entries = list(NoteHistory.objects.filter(note_id=note_id).order_by('version'))
+        content = ''
+        for entry in entries:
+            if entry.snapshot is not None:
+                content = entry.snapshot
+            elif entry.content_delta is not None:
+                content = patch(content, entry.content_delta)
+            entry.previous_content = patch(content, entry.previous_delta)
+        NoteHistory.objects.bulk_update(entries, ['previous_content'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('to_do', '0010_search_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notehistory',
+            name='version',
+            field=models.PositiveIntegerField(default=0, verbose_name='Versão'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='notehistory',
+            name='snapshot',
+            field=models.TextField(blank=True, null=True, verbose_name='Snapshot'),
+        ),
+        migrations.AddField(
+            model_name='notehistory',
+            name='content_delta',
+            field=models.JSONField(blank=True, null=True, verbose_name='Delta do Conteúdo'),
+        ),
+        migrations.AddField(
+            model_name='notehistory',
+            name='previous_delta',
+            field=models.JSONField(default=list, verbose_name='Delta do Conteúdo Anterior'),
+        ),
+        migrations.AddField(
+            model_name='notehistory',
+            name='change_reason',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Motivo da Alteração'),
+        ),
+        # Anulável antes de remover: na reversão a coluna volta anulável,
+        # decode_history a preenche e só então o AlterField restaura o NOT NULL
+        migrations.AlterField(
+            model_name='notehistory',
+            name='previous_content',
+            field=models.TextField(null=True),
+        ),
+        migrations.RunPython(encode_history, decode_history),
+        migrations.RemoveField(
+            model_name='notehistory',
+            name='previous_content',
+        ),
+        migrations.AddConstraint(
+            model_name='notehistory',
+            constraint=models.UniqueConstraint(fields=('note', 'version'), name='unique_note_history_version'),
+        ),
+    ]
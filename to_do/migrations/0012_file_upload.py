@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:02
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('to_do', '0011_note_history_deltas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='Nome do Arquivo')),
+                ('size', models.BigIntegerField(verbose_name='Tamanho')),
+                ('checksum', models.CharField(max_length=64, verbose_name='SHA-256')),
+                ('offset', models.BigIntegerField(default=0, verbose_name='Bytes Recebidos')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('note', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='file_uploads', to='to_do.note')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='file_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Envio de Arquivo',
+                'verbose_name_plural': 'Envios de Arquivos',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
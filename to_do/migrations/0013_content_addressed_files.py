@@ -0,0 +1,44 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('to_do', '0012_file_upload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('file', models.FileField(max_length=255, upload_to='blobs/', verbose_name='Arquivo')),
+                ('size', models.BigIntegerField(verbose_name='Tamanho')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='Referências')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+            ],
+            options={
+                'verbose_name': 'Conteúdo de Arquivo',
+                'verbose_name_plural': 'Conteúdos de Arquivos',
+            },
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='filename',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Nome do Arquivo'),
+        ),
+        migrations.AlterField(
+            model_name='file',
+            name='file',
+            field=models.FileField(max_length=255, upload_to='notes/files/%Y/%m/%d/', verbose_name='Arquivo'),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='files', to='to_do.blob'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def build_access(apps, schema_editor):
+    # Dono de cada nota + um registro por compartilhamento
+    Note = apps.get_model('to_do', 'Note')
+    Sharing = apps.get_model('to_do', 'Sharing')
+    NoteAccess = apps.get_model('to_do', 'NoteAccess')
+    batch = []
+    for note in Note.objects.only('user_id', 'created_at').iterator():
+        batch.append(NoteAccess(user_id=note.user_id, note_id=note.pk, is_owner=True, can_edit=True,
+                                created_at=note.created_at))
+        if len(batch) >= 1000:
+            NoteAccess.objects.bulk_create(batch)
+            batch = []
+    sharings = Sharing.objects.exclude(shared_with_id=F('note__user_id')) \
+        .values('shared_with_id', 'note_id', 'can_edit', 'note__created_at').iterator()
+    for sharing in sharings:
+        batch.append(NoteAccess(user_id=sharing['shared_with_id'], note_id=sharing['note_id'],
+                                can_edit=sharing['can_edit'], created_at=sharing['note__created_at']))
+        if len(batch) >= 1000:
+            NoteAccess.objects.bulk_create(batch)
+            batch = []
+    NoteAccess.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('to_do', '0013_content_addressed_files'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_owner', models.BooleanField(default=False, verbose_name='Dono?')),
+                ('can_edit', models.BooleanField(default=False, verbose_name='Pode editar?')),
+                ('created_at', models.DateTimeField(verbose_name='Nota criada em')),
+                ('note', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access_entries', to='to_do.note')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='note_access', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Acesso a Nota',
+                'verbose_name_plural': 'Acessos a Notas',
+                'indexes': [models.Index(fields=['user', '-created_at', 'note'], name='note_access_listing_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'note'), name='unique_note_access')],
+            },
+        ),
+        migrations.RunPython(build_access, migrations.RunPython.noop),
+    ]
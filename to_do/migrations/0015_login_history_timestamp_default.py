@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:19
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('to_do', '0014_note_access'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='loginhistory',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
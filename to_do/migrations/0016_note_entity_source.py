@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('to_do', '0015_login_history_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='noteentity',
+            name='source',
+            field=models.CharField(choices=[('user', 'Usuário'), ('analysis', 'Análise')], default='user', max_length=20, verbose_name='Origem'),
+        ),
+    ]
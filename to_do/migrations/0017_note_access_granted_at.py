@@ -0,0 +1,38 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:42
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_granted_at(apps, schema_editor):
+    # Sem isso todas as linhas ficariam com a hora da migração e todo cliente
+    # receberia de novo as notas na próxima sincronização
+    NoteAccess = apps.get_model('to_do', 'NoteAccess')
+    Sharing = apps.get_model('to_do', 'Sharing')
+    NoteAccess.objects.filter(is_owner=True).update(granted_at=F('created_at'))
+    shared_at = Sharing.objects.filter(
+        note_id=OuterRef('note_id'), shared_with_id=OuterRef('user_id')
+    ).values('shared_at')[:1]
+    NoteAccess.objects.filter(is_owner=False).update(granted_at=Coalesce(Subquery(shared_at), F('created_at')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('to_do', '0016_note_entity_source'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='noteaccess',
+            name='granted_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Acesso concedido em'),
+        ),
+        migrations.RunPython(backfill_granted_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='noteaccess',
+            index=models.Index(fields=['user', 'granted_at'], name='note_access_granted_idx'),
+        ),
+    ]
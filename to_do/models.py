@@ -1,10 +1,16 @@
+import uuid
+
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import (
     AbstractUser, Group, Permission, BaseUserManager
 )
 from django.core.validators import (
     RegexValidator, MinValueValidator, MaxValueValidator
 )
+from django.db.models.functions import Upper
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 # ---------------- Constants & Validators ----------------
@@ -109,6 +115,13 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Valores lidos, para a invalidação do cache saber quais campos mudaram
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
 # ---------------- Login History ----------------
 class LoginHistory(models.Model):
     user = models.ForeignKey(
@@ -116,7 +129,8 @@ class LoginHistory(models.Model):
         on_delete=models.CASCADE,
         related_name='login_histories'
     )
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # default em vez de auto_now_add: a gravação em lote (logins.py) usa a hora do login
+    timestamp = models.DateTimeField(default=timezone.now)
     ip_address = models.GenericIPAddressField(
         verbose_name=_("Endereço IP")
     )
@@ -125,6 +139,7 @@ class LoginHistory(models.Model):
         verbose_name=_("User Agent")
     )
 
+    # Tabela particionada por mês em timestamp (ver to_do/partitions.py)
     class Meta:
         verbose_name = _("Histórico de Login")
         verbose_name_plural = _("Históricos de Login")
@@ -224,6 +239,9 @@ class Category(models.Model):
         verbose_name = _("Categoria")
         verbose_name_plural = _("Categorias")
         ordering = ['name']
+        indexes = [
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='category_name_trgm_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -243,6 +261,9 @@ class Subject(models.Model):
         verbose_name = _("Assunto")
         verbose_name_plural = _("Assuntos")
         ordering = ['name']
+        indexes = [
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='subject_name_trgm_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -286,6 +307,11 @@ class Note(models.Model):
         related_name='notes',
         verbose_name=_("Assuntos")
     )
+    # Mantido por triggers no banco (título, conteúdo, tags e entidades)
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False
+    )
 
     class Meta:
         constraints = [
@@ -301,22 +327,105 @@ class Note(models.Model):
             models.Index(fields=['title']),
             models.Index(fields=['created_at']),
             models.Index(fields=['updated_at']),
+            GinIndex(fields=['search_vector'], name='note_search_vector_idx'),
+            GinIndex(OpClass(Upper('title'), name='gin_trgm_ops'), name='note_title_trgm_idx'),
         ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Guarda o conteúdo lido para o histórico saber se a edição mudou algo
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_content = instance.__dict__.get('content')
+        return instance
+
+class NoteTombstone(models.Model):
+    # Registro das notas excluídas, para a sincronização incremental.
+    # Sem FK real: a nota já não existe e o usuário pode ser removido depois.
+    note_id = models.BigIntegerField(
+        verbose_name=_("Nota")
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    deleted_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_("Excluída em")
+    )
+
+    class Meta:
+        verbose_name = _("Nota Excluída")
+        verbose_name_plural = _("Notas Excluídas")
+        ordering = ['-deleted_at']
+        indexes = [
+            models.Index(fields=['user', 'deleted_at']),
+        ]
+
 # ---------------- File ----------------
+class Blob(models.Model):
+    # Conteúdo de anexo guardado uma única vez, endereçado pelo SHA-256
+    # (to_do/blobs.py). ref_count conta os File que apontam para ele; ao
+    # chegar a zero o blob e o arquivo no storage são removidos.
+    digest = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name=_("SHA-256")
+    )
+    file = models.FileField(
+        upload_to='blobs/',
+        max_length=255,
+        verbose_name=_("Arquivo")
+    )
+    size = models.BigIntegerField(
+        verbose_name=_("Tamanho")
+    )
+    ref_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Referências")
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_("Criado em")
+    )
+
+    class Meta:
+        verbose_name = _("Conteúdo de Arquivo")
+        verbose_name_plural = _("Conteúdos de Arquivos")
+
+    def __str__(self):
+        return self.digest
+
 class File(models.Model):
     note = models.ForeignKey(
         Note,
         on_delete=models.CASCADE,
         related_name='files'
     )
+    # Arquivos enviados pela API apontam para o blob; file guarda o mesmo
+    # caminho do blob. Anexos antigos (blob nulo) têm arquivo próprio até
+    # passarem por manage.py dedup_files.
+    blob = models.ForeignKey(
+        Blob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='files'
+    )
     file = models.FileField(
         upload_to='notes/files/%Y/%m/%d/',
+        max_length=255,
         verbose_name=_("Arquivo")
     )
+    filename = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name=_("Nome do Arquivo")
+    )
     uploaded_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name=_("Enviado em")
@@ -328,7 +437,64 @@ class File(models.Model):
         ordering = ['-uploaded_at']
 
     def __str__(self):
-        return self.file.name
+        return self.filename or self.file.name
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Para os sinais saberem se o blob foi trocado
+        instance._loaded_blob_id = instance.__dict__.get('blob_id')
+        return instance
+
+class FileUpload(models.Model):
+    # Envio em partes ainda não concluído (to_do/uploads.py); vira um File
+    # quando todos os bytes chegam e o checksum confere
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='file_uploads'
+    )
+    note = models.ForeignKey(
+        Note,
+        on_delete=models.CASCADE,
+        related_name='file_uploads'
+    )
+    filename = models.CharField(
+        max_length=255,
+        verbose_name=_("Nome do Arquivo")
+    )
+    size = models.BigIntegerField(
+        verbose_name=_("Tamanho")
+    )
+    checksum = models.CharField(
+        max_length=64,
+        verbose_name=_("SHA-256")
+    )
+    offset = models.BigIntegerField(
+        default=0,
+        verbose_name=_("Bytes Recebidos")
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_("Criado em")
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_("Atualizado em")
+    )
+
+    class Meta:
+        verbose_name = _("Envio de Arquivo")
+        verbose_name_plural = _("Envios de Arquivos")
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
 
 # ---------------- Sharing ----------------
 class Sharing(models.Model):
@@ -362,6 +528,62 @@ class Sharing(models.Model):
         verbose_name_plural = _("Compartilhamentos")
         ordering = ['-shared_at']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Par (nota, usuário) lido, para o índice de acesso saber se mudou
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_access = (instance.__dict__.get('note_id'), instance.__dict__.get('shared_with_id'))
+        return instance
+
+class NoteAccess(models.Model):
+    # Índice materializado de "notas que o usuário acessa": uma linha para o
+    # dono e uma por compartilhamento, mantido pelos sinais (to_do/access.py).
+    # created_at repete o da nota para que a listagem ordenada saia de um
+    # único range scan em note_access_listing_idx; granted_at é quando o
+    # acesso foi concedido ou alterado, usado pelo /api/sync/.
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='note_access'
+    )
+    note = models.ForeignKey(
+        Note,
+        on_delete=models.CASCADE,
+        related_name='access_entries'
+    )
+    is_owner = models.BooleanField(
+        default=False,
+        verbose_name=_("Dono?")
+    )
+    can_edit = models.BooleanField(
+        default=False,
+        verbose_name=_("Pode editar?")
+    )
+    created_at = models.DateTimeField(
+        verbose_name=_("Nota criada em")
+    )
+    granted_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name=_("Acesso concedido em")
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'note'],
+                name='unique_note_access'
+            )
+        ]
+        verbose_name = _("Acesso a Nota")
+        verbose_name_plural = _("Acessos a Notas")
+        indexes = [
+            models.Index(fields=['user', '-created_at', 'note'], name='note_access_listing_idx'),
+            models.Index(fields=['user', 'granted_at'], name='note_access_granted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} -> {self.note_id}"
+
 # ---------------- Notification ----------------
 class NotificationType(models.Model):
     name = models.CharField(
@@ -419,8 +641,37 @@ class Notification(models.Model):
         ordering = ['-sent_at']
         indexes = [
             models.Index(fields=['sent_at']),
+            models.Index(
+                fields=['user', '-sent_at'],
+                condition=models.Q(read=False),
+                name='notification_unread_idx'
+            ),
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Guarda o valor lido de "read" para os contadores saberem o que mudou
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_read = instance.__dict__.get('read')
+        return instance
+
+class NotificationCounter(models.Model):
+    # Total de notificações não lidas, mantido em to_do/counters.py
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_counter'
+    )
+    unread = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Não lidas")
+    )
+
+    class Meta:
+        verbose_name = _("Contador de Notificações")
+        verbose_name_plural = _("Contadores de Notificações")
+
 # ---------------- Review ----------------
 class Review(models.Model):
     note = models.ForeignKey(
@@ -477,6 +728,17 @@ class NoteAnalysis(models.Model):
         default=list,
         verbose_name=_("Palavras-chave")
     )
+    # Preenchidos pelo pipeline (manage.py analyze_notes)
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name=_("Hash do Conteúdo")
+    )
+    analyzed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Analisado em")
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name=_("Criado em")
@@ -592,10 +854,78 @@ class SearchLog(models.Model):
         verbose_name=_("Criado em")
     )
 
+    # Tabela particionada por mês em created_at (ver to_do/partitions.py)
     class Meta:
         verbose_name = _("Log de Busca")
         verbose_name_plural = _("Logs de Busca")
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+
+class SearchRollup(models.Model):
+    # Agregados de SearchLog por hora e por dia (manage.py rollup_search_logs)
+    PERIOD_CHOICES = [
+        ('hour', 'Hora'),
+        ('day', 'Dia'),
+    ]
+
+    period = models.CharField(
+        max_length=4,
+        choices=PERIOD_CHOICES,
+        verbose_name=_("Período")
+    )
+    bucket = models.DateTimeField(
+        verbose_name=_("Início do Período")
+    )
+    query = models.CharField(
+        max_length=255,
+        verbose_name=_("Consulta")
+    )
+    searches = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Buscas")
+    )
+    total_results = models.BigIntegerField(
+        default=0,
+        verbose_name=_("Total de Resultados")
+    )
+    zero_results = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Buscas sem Resultado")
+    )
+
+    class Meta:
+        verbose_name = _("Agregado de Buscas")
+        verbose_name_plural = _("Agregados de Buscas")
+        ordering = ['-bucket', '-searches']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'bucket', 'query'],
+                name='unique_search_rollup'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['period', 'bucket']),
+        ]
+
+class RollupWatermark(models.Model):
+    # Até onde (exclusive) os logs já foram agregados, por rollup
+    name = models.CharField(
+        max_length=50,
+        primary_key=True
+    )
+    position = models.DateTimeField(
+        verbose_name=_("Posição")
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_("Atualizado em")
+    )
+
+    class Meta:
+        verbose_name = _("Marca d'água de Agregação")
+        verbose_name_plural = _("Marcas d'água de Agregação")
 
 class NoteTag(models.Model):
     note = models.ForeignKey(
@@ -612,6 +942,9 @@ class NoteTag(models.Model):
     class Meta:
         verbose_name = _("Tag de Nota")
         verbose_name_plural = _("Tags de Notas")
+        indexes = [
+            GinIndex(OpClass(Upper('tag'), name='gin_trgm_ops'), name='notetag_tag_trgm_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['note', 'tag'],
@@ -620,6 +953,11 @@ class NoteTag(models.Model):
         ]
 
 class NoteEntity(models.Model):
+    SOURCE_CHOICES = [
+        ('user', 'Usuário'),
+        ('analysis', 'Análise'),
+    ]
+
     note = models.ForeignKey(
         Note,
         on_delete=models.CASCADE,
@@ -633,6 +971,13 @@ class NoteEntity(models.Model):
         max_length=255,
         verbose_name=_("Valor da Entidade")
     )
+    # A análise (analysis.py) só substitui as entidades que ela mesma criou
+    source = models.CharField(
+        max_length=20,
+        choices=SOURCE_CHOICES,
+        default='user',
+        verbose_name=_("Origem")
+    )
 
     class Meta:
         verbose_name = _("Entidade de Nota")
@@ -664,8 +1009,9 @@ class UserInteraction(models.Model):
         choices=INTERACTION_CHOICES,
         verbose_name=_("Tipo de Interação")
     )
+    # default em vez de auto_now_add: a ingestão em lote grava a hora do evento
     timestamp = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
         verbose_name=_("Data/Hora")
     )
     metadata = models.JSONField(
@@ -674,12 +1020,14 @@ class UserInteraction(models.Model):
         verbose_name=_("Metadados")
     )
 
+    # Tabela particionada por mês em timestamp (ver to_do/partitions.py)
     class Meta:
         verbose_name = _("Interação do Usuário")
         verbose_name_plural = _("Interações dos Usuários")
         ordering = ['-timestamp']
         indexes = [
             models.Index(fields=['interaction_type']),
+            models.Index(fields=['user', '-timestamp']),
         ]
 
 class NoteHistory(models.Model):
@@ -694,8 +1042,29 @@ class NoteHistory(models.Model):
         null=True,
         related_name='note_edits'
     )
-    previous_content = models.TextField(
-        verbose_name=_("Conteúdo Anterior")
+    # Conteúdo guardado como snapshots e deltas (ver to_do/history.py);
+    # previous_content e updated_content são reconstruídos sob demanda
+    version = models.PositiveIntegerField(
+        verbose_name=_("Versão")
+    )
+    snapshot = models.TextField(
+        null=True,
+        blank=True,
+        verbose_name=_("Snapshot")
+    )
+    content_delta = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name=_("Delta do Conteúdo")
+    )
+    previous_delta = models.JSONField(
+        default=list,
+        verbose_name=_("Delta do Conteúdo Anterior")
+    )
+    change_reason = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name=_("Motivo da Alteração")
     )
     edited_at = models.DateTimeField(
         auto_now_add=True,
@@ -706,3 +1075,30 @@ class NoteHistory(models.Model):
         verbose_name = _("Histórico de Nota")
         verbose_name_plural = _("Históricos de Notas")
         ordering = ['-edited_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['note', 'version'],
+                name='unique_note_history_version'
+            )
+        ]
+
+    _contents = None
+
+    def set_contents(self, updated_content):
+        from .history import patch
+        previous = None if updated_content is None else patch(updated_content, self.previous_delta)
+        self._contents = (updated_content, previous)
+
+    @property
+    def updated_content(self):
+        if self._contents is None:
+            from .history import materialize
+            materialize([self])
+        return self._contents[0]
+
+    @property
+    def previous_content(self):
+        if self._contents is None:
+            from .history import materialize
+            materialize([self])
+        return self._contents[1]
@@ -0,0 +1,160 @@
+import logging
+import queue
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.template import Context, Engine
+from django.utils.module_loading import import_string
+
+from .cache import invalidate_users
+from .counters import adjust_unread_many
+from .models import Note, Notification, NotificationType, User
+from .pubsub import get_broker
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Notification Dispatch ----------------
+# Compartilhar ou avaliar uma nota gera um evento (tipo, nota, autor,
+# destinatários). Depois do commit da requisição o evento vai para o
+# dispatcher, que roda numa thread própria: renderiza o template do tipo uma
+# vez por evento (o template compilado fica em cache pelo texto) e grava uma
+# notificação por destinatário com bulk_create, em lotes. Como bulk_create
+# não dispara sinais, contadores, cache de respostas e stream são
+# atualizados aqui. A fila é em memória: eventos pendentes numa queda do
+# processo se perdem.
+BATCH_SIZE = 1000
+
+# Mensagens são texto puro, sem escape de HTML. Os templates vêm do banco,
+# então o contexto é um dict só com os campos abaixo, nunca instâncias de
+# modelo (senão {{ actor.email }} ou {{ note.user.password }} vazariam).
+ENGINE = Engine(autoescape=False)
+EVENT_CONTEXT_FIELDS = ('rating',)
+
+DEFAULT_TYPES = {
+    'note_shared': (
+        'Nota compartilhada com você',
+        '{{ actor }} compartilhou a nota "{{ note.title }}" com você.',
+    ),
+    'note_reviewed': (
+        'Nova avaliação em uma nota sua',
+        '{{ actor }} avaliou a nota "{{ note.title }}" com {{ rating }} estrela{{ rating|pluralize }}.',
+    ),
+}
+
+
+@lru_cache(maxsize=256)
+def compile_template(source):
+    return ENGINE.from_string(source)
+
+
+def notification_type(name):
+    description, template = DEFAULT_TYPES[name]
+    instance, _ = NotificationType.objects.get_or_create(
+        name=name, defaults={'description': description, 'template': template}
+    )
+    return instance
+
+
+def message_context(note, actor, event_context):
+    context = {
+        'note': {'title': note.title},
+        'actor': actor.username if actor is not None else '',
+    }
+    context.update({key: event_context[key] for key in EVENT_CONTEXT_FIELDS if key in event_context})
+    return context
+
+
+def render_message(notification_type, context):
+    return compile_template(notification_type.template).render(Context(context))
+
+
+def deliver(event):
+    recipients = sorted(set(event['recipient_ids']) - {event.get('actor_id')})
+    note = Note.objects.filter(pk=event['note_id']).first()
+    if not recipients or note is None:
+        return 0
+    actor = User.objects.filter(pk=event.get('actor_id')).first()
+    kind = notification_type(event['type'])
+    message = render_message(kind, message_context(note, actor, event.get('context', {})))
+
+    created = 0
+    for start in range(0, len(recipients), BATCH_SIZE):
+        batch = recipients[start:start + BATCH_SIZE]
+        with transaction.atomic():
+            notifications = Notification.objects.bulk_create([
+                Notification(type=kind, user_id=user_id, note=note, message=message) for user_id in batch
+            ])
+            adjust_unread_many(batch, 1)
+            transaction.on_commit(lambda notifications=notifications: publish(notifications))
+        invalidate_users(batch)
+        created += len(notifications)
+    return created
+
+
+def publish(notifications):
+    broker = get_broker()
+    for notification in notifications:
+        broker.publish(notification.user_id, notification.pk)
+
+
+class InlineDispatcher:
+    """Entrega na própria thread; útil em testes e comandos."""
+
+    def submit(self, event):
+        deliver(event)
+
+
+class ThreadDispatcher:
+    """Entrega numa thread de fundo, fora da requisição."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, event):
+        self._queue.put(event)
+        if self._worker is None or not self._worker.is_alive():
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, name='notification-dispatch', daemon=True)
+                    self._worker.start()
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            try:
+                deliver(event)
+            except Exception:
+                logger.exception('Falha ao entregar notificações do evento %s', event)
+            finally:
+                connection.close()
+                self._queue.task_done()
+
+    def join(self):
+        self._queue.join()
+
+
+_dispatcher = None
+
+
+def get_dispatcher():
+    global _dispatcher
+    if _dispatcher is None:
+        dispatcher_class = getattr(settings, 'NOTIFICATION_DISPATCHER', 'to_do.notifications.ThreadDispatcher')
+        _dispatcher = import_string(dispatcher_class)()
+    return _dispatcher
+
+
+def notify(type_name, note_id, actor_id, recipient_ids, **context):
+    event = {
+        'type': type_name,
+        'note_id': note_id,
+        'actor_id': actor_id,
+        'recipient_ids': list(recipient_ids),
+        'context': context,
+    }
+    # Só depois do commit: o worker precisa enxergar a nota e os destinatários
+    transaction.on_commit(lambda: get_dispatcher().submit(event))
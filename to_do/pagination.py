@@ -0,0 +1,45 @@
+from rest_framework.pagination import CursorPagination
+
+# ---------------- Keyset Pagination ----------------
+# Paginação por cursor: cada página continua a partir da última posição
+# vista, usando a ordenação/índice da tabela, sem COUNT(*) nem OFFSET.
+
+
+class KeysetPagination(CursorPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class NoteKeysetPagination(KeysetPagination):
+    # /api/notes/ sempre respondeu uma lista simples: o envelope
+    # {next, previous, results} só vem quando o cliente pede ?cursor= ou
+    # ?page_size=
+    ordering = '-created_at'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class AccessibleNoteKeysetPagination(KeysetPagination):
+    # Coluna de NoteAccess anotada em access.accessible_notes
+    ordering = '-access_created_at'
+
+
+class NotificationKeysetPagination(KeysetPagination):
+    ordering = '-sent_at'
+
+
+class InteractionKeysetPagination(KeysetPagination):
+    ordering = '-timestamp'
+
+
+class LoginHistoryKeysetPagination(KeysetPagination):
+    ordering = '-timestamp'
+
+
+class SearchLogKeysetPagination(KeysetPagination):
+    ordering = '-created_at'
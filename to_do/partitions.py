@@ -0,0 +1,180 @@
+import logging
+import re
+from datetime import date, datetime, time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Time Partitions ----------------
+# LoginHistory, SearchLog e UserInteraction são tabelas particionadas por mês
+# no PostgreSQL (migração 0009). Cada partição se chama <tabela>_pAAAAMM e
+# cobre [primeiro dia do mês, primeiro dia do mês seguinte); a <tabela>_default
+# recebe o que cair fora delas. Apagar um mês antigo é um DETACH + DROP, sem
+# DELETE linha a linha. Se o job atrasar e a default acumular linhas de um
+# mês, ensure_partitions move essas linhas para a partição nova.
+PARTITIONED_TABLES = {
+    'to_do_loginhistory': 'timestamp',
+    'to_do_searchlog': 'created_at',
+    'to_do_userinteraction': 'timestamp',
+}
+ARCHIVE_SCHEMA = 'to_do_archive'
+PARTITION_RE = re.compile(r'_p(\d{4})(\d{2})$')
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y%m}'
+
+
+def create_partition_sql(table, month):
+    return (
+        f'CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def create_default_partition_sql(table):
+    return f'CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT'
+
+
+def list_partitions(table):
+    # (mês, nome) das partições mensais anexadas, em ordem cronológica
+    with connection.cursor() as cursor:
+        cursor.execute(
+            '''
+            SELECT child.relname
+              FROM pg_inherits
+              JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+              JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+             WHERE parent.relname = %s
+            ''',
+            [table]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = []
+    for name in names:
+        match = PARTITION_RE.search(name)
+        if match:
+            partitions.append((date(int(match[1]), int(match[2]), 1), name))
+    return sorted(partitions)
+
+
+def default_rows_in(cursor, table, month):
+    # A partição default já tem linhas do mês (o job deixou de rodar)?
+    cursor.execute('SELECT to_regclass(%s)', [f'{table}_default'])
+    if cursor.fetchone()[0] is None:
+        return False
+    column = PARTITIONED_TABLES[table]
+    cursor.execute(
+        f'SELECT 1 FROM {table}_default WHERE {column} >= %s AND {column} < %s LIMIT 1',
+        [month, add_months(month, 1)]
+    )
+    return cursor.fetchone() is not None
+
+
+def move_default_rows_sql(table, month):
+    # Com linhas do mês na default, CREATE ... PARTITION OF falha. A partição
+    # é criada solta, recebe as linhas, que saem da default, e só então é
+    # anexada (o ATTACH confere que a default não tem mais nada do intervalo).
+    # Tudo numa transação: as escritas na tabela esperam o fim.
+    name, column = partition_name(table, month), PARTITIONED_TABLES[table]
+    bounds = f"{column} >= '{month.isoformat()}' AND {column} < '{add_months(month, 1).isoformat()}'"
+    return [
+        f'CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+        f'INSERT INTO {name} SELECT * FROM {table}_default WHERE {bounds}',
+        f'DELETE FROM {table}_default WHERE {bounds}',
+        f'ALTER TABLE {table} ATTACH PARTITION {name} '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')",
+    ]
+
+
+def ensure_partitions(table, months_ahead=3, today=None):
+    current = month_start(today or timezone.localdate())
+    created = []
+    existing = {name for _, name in list_partitions(table)}
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if partition_name(table, month) in existing:
+                continue
+            with transaction.atomic():
+                if default_rows_in(cursor, table, month):
+                    logger.warning(
+                        'Linhas de %s em %s_default; movendo para %s',
+                        f'{month:%Y-%m}', table, partition_name(table, month)
+                    )
+                    for sql in move_default_rows_sql(table, month):
+                        cursor.execute(sql)
+                else:
+                    cursor.execute(create_partition_sql(table, month))
+            created.append(partition_name(table, month))
+        cursor.execute(create_default_partition_sql(table))
+    return created
+
+
+def retention_months(table):
+    return getattr(settings, 'PARTITION_RETENTION_MONTHS', {}).get(table)
+
+
+def expire_partitions(table, keep_months, archive=False, today=None):
+    # Remove (ou arquiva) os meses inteiros anteriores à janela de retenção
+    cutoff = add_months(month_start(today or timezone.localdate()), -keep_months)
+    expired = [name for month, name in list_partitions(table) if month < cutoff]
+    with transaction.atomic(), connection.cursor() as cursor:
+        if archive and expired:
+            cursor.execute(f'CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}')
+        for name in expired:
+            cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {name}')
+            if archive:
+                cursor.execute(f'ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}')
+            else:
+                cursor.execute(f'DROP TABLE {name}')
+    return expired
+
+
+class TimeRangeFilter(BaseFilterBackend):
+    # ?since= e ?until= (data ou data/hora ISO) viram um intervalo na coluna
+    # de partição, o que deixa o PostgreSQL descartar as partições de fora.
+    def parse(self, request, param, end_of_day=False):
+        raw = request.query_params.get(param)
+        if not raw:
+            return None
+        # Data pura primeiro: parse_datetime também aceita '2025-02-15' (meia-noite)
+        try:
+            day = parse_date(raw)
+            value = None if day else parse_datetime(raw)
+        except ValueError:
+            day = value = None
+        if day is not None:
+            value = datetime.combine(day, time.max if end_of_day else time.min)
+        elif value is None:
+            raise ValidationError({param: 'Use uma data ou data/hora ISO 8601.'})
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value
+
+    def filter_queryset(self, request, queryset, view):
+        field = getattr(view, 'time_field', None)
+        if field is None:
+            return queryset
+        since = self.parse(request, 'since')
+        until = self.parse(request, 'until', end_of_day=True)
+        if since is not None:
+            queryset = queryset.filter(**{f'{field}__gte': since})
+        if until is not None:
+            queryset = queryset.filter(**{f'{field}__lte': until})
+        return queryset
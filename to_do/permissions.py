@@ -0,0 +1,111 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import SAFE_METHODS, BasePermission
+
+from .cache import get_version
+from .models import Note, NoteAccess
+
+# ---------------- Note Permissions ----------------
+# O acesso de um usuário às notas (dono, compartilhada, com ou sem edição) é
+# lido de NoteAccess uma vez por requisição e guardado no cache por alguns
+# segundos. A chave inclui a versão do usuário (cache.py), incrementada pelos
+# sinais quando uma nota dele é criada ou um compartilhamento que o envolve
+# muda, então a permissão nova vale na requisição seguinte. As verificações
+# por objeto e as criações consultam só esse mapa, sem query por objeto.
+NOTE_ACCESS_CACHE_TIMEOUT = getattr(settings, 'NOTE_ACCESS_CACHE_TIMEOUT', 60)
+READ, EDIT, OWNER = 'read', 'edit', 'owner'
+
+
+class NoteAccessMap:
+    def __init__(self, entries):
+        # {note_id: (is_owner, can_edit)}
+        self.entries = entries
+
+    def allows(self, note_id, level=READ):
+        entry = self.entries.get(note_id)
+        if entry is None:
+            return False
+        is_owner, can_edit = entry
+        if level == OWNER:
+            return is_owner
+        if level == EDIT:
+            return is_owner or can_edit
+        return True
+
+    def filter_ids(self, note_ids, level=READ):
+        return {note_id for note_id in note_ids if self.allows(note_id, level)}
+
+
+def load_note_access(user_id):
+    key = f'to_do:note-access:{user_id}:{get_version(f"user:{user_id}")}'
+    entries = cache.get(key)
+    if entries is None:
+        entries = {
+            note_id: (is_owner, can_edit)
+            for note_id, is_owner, can_edit in NoteAccess.objects.filter(user_id=user_id)
+            .values_list('note_id', 'is_owner', 'can_edit').iterator()
+        }
+        cache.set(key, entries, NOTE_ACCESS_CACHE_TIMEOUT)
+    return NoteAccessMap(entries)
+
+
+def note_access(request):
+    access = getattr(request, '_note_access', None)
+    if access is None:
+        access = request._note_access = load_note_access(request.user.pk)
+    return access
+
+
+def object_note_id(obj):
+    return obj.pk if isinstance(obj, Note) else obj.note_id
+
+
+class NotePermission(BasePermission):
+    # Leitura para quem acessa a nota do objeto; escrita conforme
+    # view.note_write_level. Sem acesso algum a resposta é 404, para não
+    # revelar que o objeto existe.
+    def has_object_permission(self, request, view, obj):
+        access = note_access(request)
+        note_id = object_note_id(obj)
+        if not access.allows(note_id, READ):
+            raise NotFound()
+        if request.method in SAFE_METHODS:
+            return True
+        return access.allows(note_id, getattr(view, 'note_write_level', OWNER))
+
+
+class IsAdminOrReadOnly(BasePermission):
+    # Leitura para qualquer autenticado; escrita só para staff
+    def has_permission(self, request, view):
+        if request.method in SAFE_METHODS:
+            return bool(request.user and request.user.is_authenticated)
+        return bool(request.user and request.user.is_staff)
+
+
+class NotePermissionMixin:
+    # Para viewsets de objetos ligados a uma nota: a nota informada na
+    # criação/atualização precisa aceitar escrita no nível note_write_level
+    note_write_level = OWNER
+
+    def get_permissions(self):
+        return super().get_permissions() + [NotePermission()]
+
+    def check_note(self, note_id):
+        if not note_access(self.request).allows(note_id, self.note_write_level):
+            raise ValidationError({'note': ['Nota não encontrada.']})
+
+    def perform_create(self, serializer):
+        self.check_note(serializer.validated_data['note'].pk)
+        super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        note = serializer.validated_data.get('note')
+        if note is not None:
+            self.check_note(note.pk)
+        super().perform_update(serializer)
+
+    def owned_note_ids(self, items):
+        # Operações em lote: as notas vêm do mesmo mapa, sem consulta
+        note_ids = {data['note'] for _, data in items if 'note' in data}
+        return note_access(self.request).filter_ids(note_ids, self.note_write_level)
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import select
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Notification Pub/Sub ----------------
+# As mensagens só acordam os streams de /api/notifications/stream/; o banco
+# continua sendo a fonte da verdade (o stream relê id > último enviado), então
+# perder ou juntar avisos nunca perde notificações.
+
+
+class Subscription:
+    def __init__(self, user_id, loop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=1)
+
+    def wake(self):
+        try:
+            self.queue.put_nowait(True)
+        except asyncio.QueueFull:
+            pass
+
+
+class InProcessBroker:
+    """Entrega os avisos aos streams abertos neste processo."""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id, notification_id):
+        self.dispatch(user_id)
+
+    def dispatch(self, user_id):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(subscription.wake)
+
+
+class PostgresBroker(InProcessBroker):
+    """Usa LISTEN/NOTIFY para avisar os streams de todos os processos."""
+
+    channel = 'to_do_notifications'
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def subscribe(self, user_id):
+        self.start()
+        return super().subscribe(user_id)
+
+    def publish(self, user_id, notification_id):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, f'{user_id}:{notification_id}'])
+
+    def start(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self.listen, name='notification-listener', daemon=True)
+                self._listener.start()
+
+    def listen(self):
+        import psycopg2
+
+        params = connection.get_connection_params()
+        conn = psycopg2.connect(**params)
+        conn.set_session(autocommit=True)
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN {self.channel}')
+        try:
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    payload = conn.notifies.pop(0).payload
+                    user_id, _, _ = payload.partition(':')
+                    if user_id.isdigit():
+                        self.dispatch(int(user_id))
+        except Exception:
+            logger.exception('Listener de notificações encerrado')
+        finally:
+            conn.close()
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        broker_class = getattr(settings, 'NOTIFICATION_BROKER', 'to_do.pubsub.InProcessBroker')
+        _broker = import_string(broker_class)()
+    return _broker
@@ -0,0 +1,85 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+# ---------------- Query Planner ----------------
+# Descobre, a partir dos campos declarados no serializer, quais relações
+# serão renderizadas e gera os select_related/prefetch_related necessários
+# para que a listagem rode em um número constante de queries.
+
+
+def _relation_field(model, source):
+    if not source or '.' in source or source == '*':
+        return None
+    try:
+        return model._meta.get_field(source)
+    except FieldDoesNotExist:
+        return None
+
+
+def _nested_serializer(field):
+    if isinstance(field, serializers.ListSerializer):
+        return field.child if isinstance(field.child, serializers.ModelSerializer) else None
+    if isinstance(field, serializers.ModelSerializer):
+        return field
+    return None
+
+
+def _needs_instance(field):
+    # PrimaryKeyRelatedField usa apenas o <campo>_id já carregado na linha
+    if isinstance(field, serializers.ManyRelatedField):
+        return True
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        return False
+    return isinstance(field, serializers.RelatedField)
+
+
+def _walk(serializer, model, prefix, in_prefetch, select, prefetch):
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+
+        relation = _relation_field(model, field.source)
+        if relation is None or not relation.is_relation:
+            continue
+
+        nested = _nested_serializer(field)
+        if nested is None and not _needs_instance(field):
+            continue
+
+        lookup = f'{prefix}{field.source}'
+        is_forward = relation.many_to_one or relation.one_to_one
+        if is_forward and relation.concrete and not in_prefetch:
+            select.append(lookup)
+            child_in_prefetch = False
+        else:
+            prefetch.append(lookup)
+            child_in_prefetch = True
+
+        if nested is not None:
+            _walk(
+                nested, relation.related_model, f'{lookup}__',
+                child_in_prefetch, select, prefetch
+            )
+
+
+@lru_cache(maxsize=None)
+def plan_for(serializer_class):
+    """Retorna as tuplas (select_related, prefetch_related) do serializer."""
+    model = serializer_class.Meta.model
+    select, prefetch = [], []
+    _walk(serializer_class(), model, '', False, select, prefetch)
+    return tuple(select), tuple(prefetch)
+
+
+def optimize_queryset(queryset, serializer_class):
+    if not issubclass(serializer_class, serializers.ModelSerializer):
+        return queryset
+
+    select, prefetch = plan_for(serializer_class)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
@@ -0,0 +1,213 @@
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from scipy import sparse
+from scipy.sparse.linalg import svds
+
+from .cache import invalidate_users
+from .models import Note, NoteRecommendation, NoteTag, Review, Sharing, UserInteraction
+
+# ---------------- Recommendation Engine ----------------
+# Pontuação offline das notas. Todos os sinais viram matrizes esparsas
+# usuário × nota; as notas ganham um vetor de fatores latentes (SVD truncado
+# da matriz de interações) e um vetor de tags. O score de uma nota candidata
+# é a média da similaridade (cosseno) dela com as notas em que o usuário já se
+# engajou, ponderada pelo engajamento, o que mantém o valor entre 0 e 1.
+#
+# Só são candidatas as notas compartilhadas com o usuário em que ele ainda
+# não mexeu: o serializer expõe o título da nota recomendada, então nunca se
+# recomenda uma nota a quem não tem acesso a ela.
+ALGORITHM_VERSION = 'svd-tags-v1'
+
+INTERACTION_WEIGHTS = {'view': 1.0, 'edit': 3.0, 'share': 4.0, 'rate': 2.0}
+AUTHOR_WEIGHT = 5.0
+REVIEW_WEIGHT = 1.0  # multiplicado pela nota (1 a 5)
+SHARING_WEIGHT = 2.0
+
+
+def _fetch(queryset, fields, chunk_size=100_000):
+    # Lê colunas grandes direto para arrays, sem montar instâncias
+    columns = [[] for _ in fields]
+    for row in queryset.values_list(*fields).iterator(chunk_size=chunk_size):
+        for column, value in zip(columns, row):
+            column.append(value)
+    return [np.asarray(column) for column in columns]
+
+
+def _normalize_rows(matrix, norm='l2'):
+    if norm == 'l1':
+        sums = np.asarray(abs(matrix).sum(axis=1)).ravel()
+    else:
+        sums = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    sums[sums == 0] = 1.0
+    return sparse.diags(1.0 / sums).astype(np.float32) @ matrix
+
+
+class RecommendationEngine:
+    def __init__(self, top_k=10, factors=64, tag_weight=0.3, batch_size=10_000,
+                 algorithm_version=ALGORITHM_VERSION):
+        self.top_k = top_k
+        self.factors = factors
+        self.tag_weight = tag_weight
+        self.batch_size = batch_size
+        self.algorithm_version = algorithm_version
+
+    # ---- Carga dos sinais ----
+    def load(self):
+        users, notes, weights = [], [], []
+
+        grouped = UserInteraction.objects.values('user_id', 'note_id', 'interaction_type') \
+            .annotate(total=Count('id')).order_by()
+        user_ids, note_ids, kinds, totals = _fetch(grouped, ['user_id', 'note_id', 'interaction_type', 'total'])
+        if len(user_ids):
+            kind_weight = np.vectorize(
+                lambda kind: INTERACTION_WEIGHTS.get(kind, 1.0), otypes=[np.float32]
+            )(kinds)
+            # Repetições contam, mas com retorno decrescente
+            users.append(user_ids)
+            notes.append(note_ids)
+            weights.append(kind_weight * np.log1p(totals.astype(np.float32)))
+
+        user_ids, note_ids, ratings = _fetch(
+            Review.objects.filter(reviewer__isnull=False), ['reviewer_id', 'note_id', 'rating']
+        )
+        users.append(user_ids)
+        notes.append(note_ids)
+        weights.append(REVIEW_WEIGHT * ratings.astype(np.float32))
+
+        user_ids, note_ids = _fetch(Note.objects.all(), ['user_id', 'id'])
+        users.append(user_ids)
+        notes.append(note_ids)
+        weights.append(np.full(len(user_ids), AUTHOR_WEIGHT, dtype=np.float32))
+
+        shared_users, shared_notes = _fetch(Sharing.objects.all(), ['shared_with_id', 'note_id'])
+        tag_notes, tags = _fetch(NoteTag.objects.all(), ['note_id', 'tag'])
+
+        engaged_users = np.concatenate(users).astype(np.int64)
+        engaged_notes = np.concatenate(notes).astype(np.int64)
+        engaged_weights = np.concatenate(weights).astype(np.float32)
+        shared_users = shared_users.astype(np.int64)
+        shared_notes = shared_notes.astype(np.int64)
+
+        self.user_index = np.unique(np.concatenate([engaged_users, shared_users]))
+        self.note_index = np.unique(np.concatenate([engaged_notes, shared_notes]))
+        shape = (len(self.user_index), len(self.note_index))
+
+        # Duplicatas (mesmo usuário e nota) são somadas na conversão para CSR
+        self.engagement = sparse.csr_matrix(
+            (engaged_weights, (np.searchsorted(self.user_index, engaged_users),
+                               np.searchsorted(self.note_index, engaged_notes))),
+            shape=shape, dtype=np.float32
+        )
+        self.sharing = sparse.csr_matrix(
+            (np.ones(len(shared_users), dtype=np.float32),
+             (np.searchsorted(self.user_index, shared_users),
+              np.searchsorted(self.note_index, shared_notes))),
+            shape=shape, dtype=np.float32
+        )
+        self.sharing.data[:] = 1.0
+
+        known = np.isin(tag_notes.astype(np.int64), self.note_index)
+        tag_notes, tags = tag_notes[known].astype(np.int64), np.char.lower(tags[known].astype(str))
+        tag_index, tag_columns = np.unique(tags, return_inverse=True)
+        self.tags = sparse.csr_matrix(
+            (np.ones(len(tag_notes), dtype=np.float32),
+             (np.searchsorted(self.note_index, tag_notes), tag_columns)),
+            shape=(len(self.note_index), len(tag_index)), dtype=np.float32
+        )
+
+    # ---- Matrizes derivadas ----
+    def build(self):
+        interactions = self.engagement + SHARING_WEIGHT * self.sharing
+        self.item_factors = self.factorize(interactions)
+        self.tag_vectors = _normalize_rows(self.tags).tocsr()
+        self.profiles = _normalize_rows(self.engagement, norm='l1').tocsr()
+
+        # Compartilhadas com o usuário e ainda sem engajamento dele
+        candidates = self.sharing - self.sharing.multiply(self.engagement > 0)
+        candidates.eliminate_zeros()
+        self.candidates = candidates.tocsr()
+
+    def factorize(self, matrix):
+        k = min(self.factors, min(matrix.shape) - 1)
+        if k < 1:
+            items = matrix.T.toarray()
+        else:
+            _, singular, vt = svds(matrix.astype(np.float32), k=k)
+            items = vt.T * singular
+        norms = np.linalg.norm(items, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (items / norms).astype(np.float32)
+
+    # ---- Pontuação ----
+    def score_batch(self, start, stop):
+        candidates = self.candidates[start:stop].tocoo()
+        if not candidates.nnz:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        rows, columns = candidates.row, candidates.col
+
+        profiles = self.profiles[start:stop]
+        latent = np.asarray(profiles @ self.item_factors)
+        latent_score = np.einsum('ij,ij->i', latent[rows], self.item_factors[columns])
+        tag_profiles = (profiles @ self.tag_vectors).tocsr()
+        tag_score = np.asarray(
+            tag_profiles[rows].multiply(self.tag_vectors[columns]).sum(axis=1)
+        ).ravel()
+
+        scores = np.clip((1 - self.tag_weight) * latent_score + self.tag_weight * tag_score, 0, 1)
+
+        # top-k por usuário: ordena por (usuário, -score) e numera dentro do grupo
+        order = np.lexsort((-scores, rows))
+        rows, columns, scores = rows[order], columns[order], scores[order]
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        group_start = np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+        keep = (np.arange(len(rows)) - group_start < self.top_k) & (scores >= 0.005)
+        return rows[keep] + start, columns[keep], scores[keep]
+
+    # ---- Escrita ----
+    def write_batch(self, user_ids, rows, columns, scores):
+        recommendations = [
+            NoteRecommendation(
+                user_id=int(self.user_index[row]),
+                recommended_note_id=int(self.note_index[column]),
+                score=Decimal(f'{score:.2f}'),
+                algorithm_version=self.algorithm_version,
+            )
+            for row, column, score in zip(rows, columns, scores)
+        ]
+        with transaction.atomic():
+            NoteRecommendation.objects.filter(
+                user_id__in=user_ids, algorithm_version=self.algorithm_version
+            ).delete()
+            NoteRecommendation.objects.bulk_create(recommendations, batch_size=5_000)
+        invalidate_users(user_ids)
+        return len(recommendations)
+
+    def run(self):
+        started = timezone.now()
+        self.load()
+        self.build()
+
+        written = 0
+        for start in range(0, len(self.user_index), self.batch_size):
+            stop = min(start + self.batch_size, len(self.user_index))
+            rows, columns, scores = self.score_batch(start, stop)
+            user_ids = [int(user_id) for user_id in self.user_index[start:stop]]
+            written += self.write_batch(user_ids, rows, columns, scores)
+
+        # Usuários que sumiram das matrizes perdem as recomendações antigas
+        leftovers = NoteRecommendation.objects.filter(
+            algorithm_version=self.algorithm_version, created_at__lt=started
+        )
+        stale_users = list(leftovers.values_list('user_id', flat=True).distinct())
+        leftovers.delete()
+        invalidate_users(stale_users)
+        return {
+            'users': len(self.user_index),
+            'notes': len(self.note_index),
+            'interactions': self.engagement.nnz,
+            'recommendations': written,
+        }
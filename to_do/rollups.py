@@ -0,0 +1,115 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Min, Q, Sum
+from django.db.models.functions import Lower, Trim, TruncHour
+from django.utils import timezone
+
+from .models import SearchLog, SearchRollup, RollupWatermark
+
+# ---------------- Search Rollups ----------------
+# Agrega SearchLog em SearchRollup por hora e por dia. A marca d'água guarda
+# a próxima hora a agregar: cada execução recalcula as horas completas entre
+# ela e agora - lag (o lag cobre transações que ainda não tinham feito commit)
+# e substitui esses agregados, então rodar de novo nunca duplica contagens.
+# Os totais do dia saem da soma das horas, não dos logs brutos, e sobrevivem
+# à remoção das partições antigas de SearchLog.
+SEARCH_WATERMARK = 'search_logs'
+DEFAULT_LAG = timedelta(minutes=5)
+
+
+def floor_hour(value):
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(value):
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _upsert(rollups):
+    SearchRollup.objects.bulk_create(
+        rollups,
+        update_conflicts=True,
+        unique_fields=['period', 'bucket', 'query'],
+        update_fields=['searches', 'total_results', 'zero_results'],
+        batch_size=1_000,
+    )
+
+
+def _aggregate_hours(start, end):
+    rows = (
+        SearchLog.objects
+        .filter(created_at__gte=start, created_at__lt=end)
+        .annotate(bucket=TruncHour('created_at'), normalized=Lower(Trim('query')))
+        .values('bucket', 'normalized')
+        .annotate(
+            searches=Count('id'),
+            total_results=Sum('results_count'),
+            zero_results=Count('id', filter=Q(results_count=0)),
+        )
+        .order_by()
+    )
+    return [
+        SearchRollup(
+            period='hour', bucket=row['bucket'], query=row['normalized'][:255],
+            searches=row['searches'], total_results=row['total_results'] or 0,
+            zero_results=row['zero_results'],
+        )
+        for row in rows
+    ]
+
+
+def _aggregate_days(start, end):
+    rollups = []
+    day = floor_day(start)
+    while day < end:
+        rows = (
+            SearchRollup.objects
+            .filter(period='hour', bucket__gte=day, bucket__lt=day + timedelta(days=1))
+            .values('query')
+            .annotate(
+                total_searches=Sum('searches'),
+                total=Sum('total_results'),
+                zero=Sum('zero_results'),
+            )
+            .order_by()
+        )
+        rollups.extend(
+            SearchRollup(
+                period='day', bucket=day, query=row['query'], searches=row['total_searches'],
+                total_results=row['total'], zero_results=row['zero'],
+            )
+            for row in rows
+        )
+        day += timedelta(days=1)
+    return rollups
+
+
+def rollup_search_logs(lag=DEFAULT_LAG, step=timedelta(days=1), now=None):
+    cutoff = floor_hour((now or timezone.now()) - lag)
+    watermark = RollupWatermark.objects.filter(name=SEARCH_WATERMARK).first()
+    if watermark is not None:
+        start = watermark.position
+    else:
+        oldest = SearchLog.objects.aggregate(oldest=Min('created_at'))['oldest']
+        start = floor_hour(oldest) if oldest else cutoff
+
+    hours = 0
+    while start < cutoff:
+        end = min(start + step, cutoff)
+        with transaction.atomic():
+            rollups = _aggregate_hours(start, end)
+            _upsert(rollups)
+            _upsert(_aggregate_days(start, end))
+            RollupWatermark.objects.update_or_create(
+                name=SEARCH_WATERMARK, defaults={'position': end}
+            )
+        hours += int((end - start) / timedelta(hours=1))
+        start = end
+    return {'hours': hours, 'watermark': start}
+
+
+def reset_search_rollups():
+    with transaction.atomic():
+        SearchRollup.objects.all().delete()
+        RollupWatermark.objects.filter(name=SEARCH_WATERMARK).delete()
@@ -0,0 +1,49 @@
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db.models import Count, F, Window
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+# ---------------- Full-Text Search ----------------
+# Note.search_vector é mantido por triggers (migração 0003) com o mesmo
+# dicionário usado aqui nas consultas.
+SEARCH_CONFIG = 'portuguese'
+
+
+def build_query(text):
+    return SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+
+
+def search_notes(queryset, text):
+    """Filtra e ordena as notas por relevância.
+
+    Cada linha recebe ``rank``, ``headline`` (trechos do conteúdo com os
+    termos destacados) e ``total``, a quantidade de resultados calculada por
+    window function na mesma query da página.
+    """
+    query = build_query(text)
+    return (
+        queryset
+        .filter(search_vector=query)
+        .annotate(
+            rank=SearchRank(F('search_vector'), query),
+            headline=SearchHeadline(
+                'content', query,
+                config=SEARCH_CONFIG,
+                start_sel='<mark>', stop_sel='</mark>',
+                max_fragments=3
+            ),
+            total=Window(Count('pk')),
+        )
+        .order_by('-rank', '-created_at')
+    )
+
+
+class FullTextSearchFilter(filters.BaseFilterBackend):
+    """Substitui o SearchFilter (ILIKE) pelo índice GIN de search_vector."""
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        if not text:
+            return queryset
+        return queryset.filter(search_vector=build_query(text))
@@ -1,10 +1,14 @@
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
 from .models import (
     User, LoginHistory, Address, Contact, Note, Category, Subject, File,
     Sharing, Notification, NotificationType, Review, NoteAnalysis,
     NoteSuggestion, ChatInteraction, NoteRecommendation, SearchLog,
-    NoteTag, NoteEntity, UserInteraction, NoteHistory
+    NoteTag, NoteEntity, UserInteraction, NoteHistory, FileUpload
 )
+from .blobs import attach_blob, store_blob
+from .history import record_version
 
 # --------------------- Validações Customizadas ---------------------
 def validate_postal_code(value):
@@ -76,8 +80,58 @@ class SubjectSerializer(serializers.ModelSerializer):
 class FileSerializer(serializers.ModelSerializer):
     class Meta:
         model = File
-        fields = ['id', 'note', 'file', 'uploaded_at']
-        read_only_fields = ['id', 'uploaded_at']
+        fields = ['id', 'note', 'file', 'filename', 'uploaded_at']
+        read_only_fields = ['id', 'filename', 'uploaded_at']
+
+    # O conteúdo vai para o blob do seu SHA-256 (blobs.py); cópias repetidas
+    # reaproveitam o mesmo arquivo no storage. O blob e o File são gravados
+    # na mesma transação
+    @transaction.atomic
+    def create(self, validated_data):
+        content = validated_data.pop('file')
+        instance = attach_blob(File(**validated_data), store_blob(content), content.name)
+        instance.save()
+        return instance
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        content = validated_data.pop('file', None)
+        if content is not None:
+            attach_blob(instance, store_blob(content), content.name)
+        return super().update(instance, validated_data)
+
+class FileUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FileUpload
+        fields = ['id', 'note', 'filename', 'size', 'checksum', 'offset', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'offset', 'created_at', 'updated_at']
+
+    def validate_note(self, note):
+        request = self.context.get('request')
+        if request is not None and note.user_id != request.user.pk:
+            raise serializers.ValidationError('Nota não encontrada.')
+        return note
+
+    def validate_filename(self, value):
+        # Só o nome; o diretório é definido pelo upload_to de File
+        name = value.replace('\\', '/').rsplit('/', 1)[-1].strip()
+        if not name or name in ('.', '..'):
+            raise serializers.ValidationError('Nome de arquivo inválido.')
+        return name
+
+    def validate_size(self, value):
+        limit = getattr(settings, 'FILE_UPLOAD_MAX_SIZE', None)
+        if value < 0:
+            raise serializers.ValidationError('O tamanho não pode ser negativo.')
+        if limit is not None and value > limit:
+            raise serializers.ValidationError(f'Tamanho máximo: {limit} bytes.')
+        return value
+
+    def validate_checksum(self, value):
+        value = value.lower()
+        if len(value) != 64 or any(char not in '0123456789abcdef' for char in value):
+            raise serializers.ValidationError('Informe o SHA-256 em hexadecimal (64 caracteres).')
+        return value
 
 class NoteSerializer(serializers.ModelSerializer):
     categories = CategorySerializer(many=True, read_only=True)
@@ -111,12 +165,40 @@ class NoteSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("O título não pode estar vazio.")
         return value
 
+class NoteSearchResultSerializer(NoteSerializer):
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.CharField(read_only=True)
+
+    class Meta(NoteSerializer.Meta):
+        fields = NoteSerializer.Meta.fields + ['rank', 'headline']
+
+class AccessibleNoteSerializer(NoteSerializer):
+    # Vêm das anotações de access.accessible_notes
+    is_owner = serializers.BooleanField(read_only=True)
+    can_edit = serializers.BooleanField(read_only=True)
+
+    class Meta(NoteSerializer.Meta):
+        fields = NoteSerializer.Meta.fields + ['is_owner', 'can_edit']
+
 class SharingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Sharing
         fields = ['id', 'note', 'shared_with', 'shared_at', 'can_edit']
         read_only_fields = ['id', 'shared_at']
 
+class BulkShareSerializer(serializers.Serializer):
+    note = serializers.PrimaryKeyRelatedField(queryset=Note.objects.all())
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=10000
+    )
+    can_edit = serializers.BooleanField(default=False)
+
+    def validate_note(self, note):
+        request = self.context.get('request')
+        if request is not None and note.user_id != request.user.pk:
+            raise serializers.ValidationError('Nota não encontrada.')
+        return note
+
 class NotificationTypeSerializer(serializers.ModelSerializer):
     class Meta:
         model = NotificationType
@@ -146,8 +228,8 @@ class ReviewSerializer(serializers.ModelSerializer):
 class NoteAnalysisSerializer(serializers.ModelSerializer):
     class Meta:
         model = NoteAnalysis
-        fields = ['id', 'note', 'summary', 'sentiment', 'keywords', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'note', 'summary', 'sentiment', 'keywords', 'analyzed_at', 'created_at']
+        read_only_fields = ['id', 'analyzed_at', 'created_at']
 
 class NoteSuggestionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -188,8 +270,8 @@ class NoteTagSerializer(serializers.ModelSerializer):
 class NoteEntitySerializer(serializers.ModelSerializer):
     class Meta:
         model = NoteEntity
-        fields = ['id', 'note', 'entity_type', 'entity_value']
-        read_only_fields = ['id']
+        fields = ['id', 'note', 'entity_type', 'entity_value', 'source']
+        read_only_fields = ['id', 'source']
 
 class UserInteractionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -197,13 +279,76 @@ class UserInteractionSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'note', 'interaction_type', 'timestamp', 'metadata']
         read_only_fields = ['id', 'timestamp']
 
+class InteractionEventSerializer(serializers.Serializer):
+    # Validação sem consultas: o acesso à nota é conferido na view pelo mapa
+    # de NoteAccess (em cache) e a existência de novo no flush
+    note = serializers.IntegerField(min_value=1)
+    interaction_type = serializers.ChoiceField(choices=UserInteraction.INTERACTION_CHOICES)
+    metadata = serializers.JSONField(required=False, allow_null=True)
+
 class NoteHistorySerializer(serializers.ModelSerializer):
     edited_by = serializers.StringRelatedField()
+    # Reconstruídos a partir de snapshots e deltas (to_do/history.py)
+    previous_content = serializers.CharField(required=False, allow_blank=True, trim_whitespace=False)
+    updated_content = serializers.CharField(required=False, allow_blank=True, trim_whitespace=False)
 
     class Meta:
         model = NoteHistory
         fields = [
-            'id', 'note', 'edited_by', 'previous_content', 
+            'id', 'note', 'version', 'edited_by', 'previous_content',
             'updated_content', 'change_reason', 'edited_at'
         ]
-        read_only_fields = ['id', 'edited_at']
\ No newline at end of file
+        read_only_fields = ['id', 'version', 'edited_at']
+
+    def validate_note(self, note):
+        request = self.context.get('request')
+        if request is not None and note.user_id != request.user.pk:
+            raise serializers.ValidationError('Nota não encontrada.')
+        return note
+
+    def create(self, validated_data):
+        if 'updated_content' not in validated_data:
+            raise serializers.ValidationError({'updated_content': 'Este campo é obrigatório.'})
+        request = self.context.get('request')
+        return record_version(
+            validated_data['note'],
+            validated_data['updated_content'],
+            previous_content=validated_data.get('previous_content'),
+            edited_by=request.user if request is not None else None,
+            change_reason=validated_data.get('change_reason', ''),
+        )
+
+    def update(self, instance, validated_data):
+        # Versões são imutáveis; só o motivo pode ser corrigido
+        changed_note = validated_data.pop('note', instance.note) != instance.note
+        if changed_note or {'previous_content', 'updated_content'} & set(validated_data):
+            raise serializers.ValidationError('O conteúdo de uma versão não pode ser alterado.')
+        return super().update(instance, validated_data)
+
+# --------------------- Serializadores em Lote ---------------------
+# Validam cada item sem consultar o banco; referências (notas, categorias,
+# assuntos) são conferidas de uma vez pela view.
+class BulkNoteSerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False)
+    title = serializers.CharField(max_length=200)
+    content = serializers.CharField()
+    completed = serializers.BooleanField(required=False)
+    category_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    subject_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    tags = serializers.ListField(child=serializers.CharField(max_length=100), required=False)
+
+    def validate_title(self, value):
+        if not value.strip():
+            raise serializers.ValidationError("O título não pode estar vazio.")
+        return value
+
+class BulkNoteTagSerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False)
+    note = serializers.IntegerField()
+    tag = serializers.CharField(max_length=100)
+
+class BulkNoteEntitySerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False)
+    note = serializers.IntegerField()
+    entity_type = serializers.CharField(max_length=100)
+    entity_value = serializers.CharField(max_length=255)
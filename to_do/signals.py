@@ -0,0 +1,234 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .access import grant_owner_access, sync_access
+from .authentication import forget_auth_state
+from .blobs import acquire_blob, release_blob
+from .cache import invalidate_global, invalidate_users
+from .counters import adjust_unread
+from .history import capture_edit, detach_version
+from .models import (
+    User, Category, Subject, Note, NoteAccess, NoteTombstone, Notification, NotificationType, NoteHistory,
+    File, FileUpload, Sharing, Review
+)
+from .notifications import notify
+from .pubsub import get_broker
+from .uploads import part_path, remove_part
+
+# ---------------- Cache Invalidation ----------------
+# Tabelas compartilhadas entre usuários invalidam a versão global; as demais
+# invalidam os usuários afetados: o dono do objeto e todos que acessam a
+# nota dele (NoteAccess), já que o destinatário de uma nota compartilhada
+# também vê os anexos, tags etc. Usuários só invalidam a versão global
+# quando muda um campo que aparece nas respostas de outros usuários; as
+# permissões mudam só o que o próprio usuário vê.
+GLOBAL_MODELS = (Category, Subject, NotificationType)
+USER_PUBLIC_FIELDS = {'username', 'email', 'date_of_birth', 'is_active'}
+USER_SCOPE_FIELDS = {'is_staff', 'is_superuser'}
+
+
+def note_user_ids(note_id):
+    return list(NoteAccess.objects.filter(note_id=note_id).values_list('user_id', flat=True))
+
+
+def affected_user_ids(instance):
+    user_ids = []
+    if isinstance(instance, Note):
+        user_ids.append(instance.user_id)
+        user_ids += note_user_ids(instance.pk)
+    else:
+        user_ids.append(getattr(instance, 'user_id', None))
+        user_ids.append(getattr(instance, 'shared_with_id', None))
+        user_ids.append(getattr(instance, 'reviewer_id', None))
+        # O índice e as lápides só dizem respeito ao próprio usuário
+        own_only = isinstance(instance, (NoteAccess, NoteTombstone))
+        if getattr(instance, 'note_id', None) is not None and not own_only:
+            user_ids += note_user_ids(instance.note_id)
+    return user_ids
+
+
+def changed_user_fields(instance, created, update_fields):
+    # Campos alterados desde a leitura (ou o último save); None quando não dá
+    # para saber, como num usuário novo
+    loaded = getattr(instance, '_loaded_values', None)
+    instance._loaded_values = {
+        field.attname: instance.__dict__[field.attname]
+        for field in User._meta.concrete_fields if field.attname in instance.__dict__
+    }
+    if created:
+        return None
+    if loaded is None:
+        return set(update_fields) if update_fields else None
+    changed = {name for name, value in loaded.items() if instance._loaded_values.get(name) != value}
+    return changed & set(update_fields) if update_fields else changed
+
+
+def invalidate_user(instance, created=False, update_fields=None):
+    changed = changed_user_fields(instance, created, update_fields)
+    if changed is None or changed & USER_PUBLIC_FIELDS:
+        invalidate_global()
+    elif changed & USER_SCOPE_FIELDS:
+        invalidate_users([instance.pk])
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_response_cache(sender, instance, **kwargs):
+    if sender._meta.app_label != 'to_do':
+        return
+    if isinstance(instance, User):
+        if kwargs.get('signal') is post_delete:
+            invalidate_global()
+        else:
+            invalidate_user(instance, kwargs.get('created'), kwargs.get('update_fields'))
+    elif isinstance(instance, GLOBAL_MODELS):
+        invalidate_global()
+    else:
+        invalidate_users(affected_user_ids(instance))
+
+
+@receiver(m2m_changed, sender=Note.categories.through)
+@receiver(m2m_changed, sender=Note.subjects.through)
+def invalidate_note_relations(sender, instance, action, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if isinstance(instance, Note):
+        invalidate_users([instance.user_id])
+    else:
+        invalidate_global()
+
+
+# ---------------- Sync Tombstones ----------------
+@receiver(post_delete, sender=Note)
+def record_note_tombstone(sender, instance, **kwargs):
+    NoteTombstone.objects.create(note_id=instance.pk, user_id=instance.user_id)
+
+
+@receiver(post_delete, sender=Sharing)
+def record_sharing_tombstone(sender, instance, **kwargs):
+    # Compartilhamento revogado (ou nota excluída, em cascata): a nota some
+    # do próximo /api/sync/ de quem a recebeu
+    NoteTombstone.objects.create(note_id=instance.note_id, user_id=instance.shared_with_id)
+
+
+# ---------------- Notification Stream ----------------
+@receiver(post_save, sender=Notification)
+def publish_notification(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: get_broker().publish(instance.user_id, instance.pk))
+
+
+# ---------------- Unread Counters ----------------
+@receiver(post_save, sender=Notification)
+def count_unread_on_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_loaded_read', None)
+    if created:
+        delta = 0 if instance.read else 1
+    elif previous is not None and previous != instance.read:
+        delta = -1 if instance.read else 1
+    else:
+        delta = 0
+    instance._loaded_read = instance.read
+    adjust_unread(instance.user_id, delta)
+
+
+@receiver(post_delete, sender=Notification)
+def count_unread_on_delete(sender, instance, **kwargs):
+    # Sem criar contador: na exclusão em cascata o usuário pode estar saindo
+    if not getattr(instance, '_loaded_read', instance.read):
+        adjust_unread(instance.user_id, -1, create=False)
+
+
+# ---------------- Note History ----------------
+@receiver(pre_delete, sender=NoteHistory)
+def detach_note_history(sender, instance, origin=None, **kwargs):
+    # Na exclusão da nota todo o histórico vai junto; não há o que preservar
+    if isinstance(origin, Note):
+        return
+    detach_version(instance)
+
+
+@receiver(post_save, sender=Note)
+def capture_note_history(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_loaded_content', None)
+    instance._loaded_content = instance.content
+    if created or previous is None:
+        return
+    # Só o dono edita pela API; a edição é atribuída a ele
+    capture_edit(instance, previous, instance.content, edited_by=instance.user)
+
+
+# ---------------- Chunked Uploads ----------------
+@receiver(post_delete, sender=FileUpload)
+def remove_upload_part(sender, instance, **kwargs):
+    # Concluído, cancelado, expirado ou levado junto com a nota. O caminho é
+    # calculado agora: depois do delete a instância fica sem pk
+    path = part_path(instance)
+    transaction.on_commit(lambda: remove_part(path))
+
+
+# ---------------- Blob References ----------------
+@receiver(post_save, sender=File)
+def count_blob_reference(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_loaded_blob_id', None)
+    instance._loaded_blob_id = instance.blob_id
+    if previous == instance.blob_id:
+        return
+    if instance.blob_id is not None:
+        acquire_blob(instance.blob_id)
+    if previous is not None:
+        release_blob(previous)
+
+
+@receiver(post_delete, sender=File)
+def release_blob_reference(sender, instance, **kwargs):
+    # Também na exclusão em cascata da nota
+    if instance.blob_id is not None:
+        release_blob(instance.blob_id)
+
+
+# ---------------- Note Access Index ----------------
+@receiver(post_save, sender=Note)
+def index_note_owner(sender, instance, created, **kwargs):
+    if created:
+        grant_owner_access([instance])
+
+
+@receiver(post_save, sender=Sharing)
+def index_sharing(sender, instance, **kwargs):
+    current = (instance.note_id, instance.shared_with_id)
+    previous = getattr(instance, '_loaded_access', None)
+    instance._loaded_access = current
+    sync_access(*current)
+    # Compartilhamento movido para outra nota ou usuário
+    if previous is not None and previous != current:
+        sync_access(*previous)
+
+
+@receiver(post_delete, sender=Sharing)
+def unindex_sharing(sender, instance, **kwargs):
+    # Na exclusão em cascata da nota o índice já vai junto
+    sync_access(instance.note_id, instance.shared_with_id)
+
+
+# ---------------- Notification Dispatch ----------------
+@receiver(post_save, sender=Sharing)
+def notify_sharing(sender, instance, created, **kwargs):
+    if created:
+        notify('note_shared', instance.note_id, instance.note.user_id, [instance.shared_with_id])
+
+
+@receiver(post_save, sender=Review)
+def notify_review(sender, instance, created, **kwargs):
+    if created:
+        notify('note_reviewed', instance.note_id, instance.reviewer_id, [instance.note.user_id],
+               rating=instance.rating)
+
+
+# ---------------- Stateless JWT ----------------
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def reset_auth_state(sender, instance, **kwargs):
+    # Desativação e troca de senha valem já na próxima requisição
+    forget_auth_state(instance.pk)
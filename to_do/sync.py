@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Note, NoteAccess, NoteTombstone, Notification, Sharing
+from .query_planner import optimize_queryset
+from .serializers import NoteSerializer, NotificationSerializer, SharingSerializer
+
+# ---------------- Delta Sync ----------------
+# Gera a resposta de /api/sync/ em pedaços: cada seção é percorrida com
+# iterator(), então nem o queryset nem o JSON ficam inteiros em memória.
+#
+# A marca d'água é a hora do servidor, mas updated_at e os demais carimbos
+# são gravados antes do commit: uma transação que confirma depois da consulta
+# pode ter carimbo anterior à marca. Por isso cada sincronização volta
+# SYNC_OVERLAP_SECONDS antes de since e reenvia o que estiver nessa janela; o
+# cliente descarta repetidos pelo id (e updated_at). Notas entram pelo índice
+# de acesso (próprias e compartilhadas), inclusive as compartilhadas depois
+# de since (NoteAccess.granted_at, não a criação da nota), e deleted_notes traz as notas excluídas e os compartilhamentos
+# revogados, exceto as que o usuário voltou a acessar.
+SYNC_CHUNK_SIZE = 500
+SYNC_OVERLAP_SECONDS = getattr(settings, 'SYNC_OVERLAP_SECONDS', 30)
+
+
+def _changes(user, since):
+    notes = Note.objects.filter(access_entries__user=user)
+    sharings = Sharing.objects.filter(shared_with=user)
+    notifications = Notification.objects.filter(user=user)
+    tombstones = NoteTombstone.objects.filter(user=user).exclude(
+        note_id__in=NoteAccess.objects.filter(user=user).values('note_id')
+    )
+    if since is not None:
+        since -= timedelta(seconds=SYNC_OVERLAP_SECONDS)
+        # Na mesma chamada de filter, para usar o mesmo join de access_entries
+        notes = Note.objects.filter(
+            Q(updated_at__gt=since) | Q(access_entries__granted_at__gt=since),
+            access_entries__user=user,
+        )
+        sharings = sharings.filter(shared_at__gt=since)
+        notifications = notifications.filter(sent_at__gt=since)
+        tombstones = tombstones.filter(deleted_at__gt=since)
+    else:
+        tombstones = tombstones.none()
+
+    return [
+        ('notes', optimize_queryset(notes.order_by('updated_at'), NoteSerializer), NoteSerializer),
+        ('sharings', sharings.order_by('shared_at'), SharingSerializer),
+        ('notifications', optimize_queryset(notifications.order_by('sent_at'), NotificationSerializer),
+         NotificationSerializer),
+        ('deleted_notes', tombstones.order_by('deleted_at').values_list('note_id', flat=True), None),
+    ]
+
+
+def stream_changes(user, since, context):
+    # A marca d'água é fixada antes das consultas: o que mudar durante o
+    # envio volta na próxima sincronização (e a janela cobre commits atrasados)
+    watermark = timezone.now()
+    encoder = JSONEncoder(ensure_ascii=False)
+
+    yield '{"watermark": %s' % encoder.encode(watermark)
+    for name, queryset, serializer_class in _changes(user, since):
+        yield ', "%s": [' % name
+        first = True
+        for row in queryset.iterator(chunk_size=SYNC_CHUNK_SIZE):
+            data = row if serializer_class is None else serializer_class(row, context=context).data
+            yield ('' if first else ', ') + encoder.encode(data)
+            first = False
+        yield ']'
+    yield '}'
+
@@ -0,0 +1,10 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # O cache local em memória sobrevive entre testes; IDs de usuário se repetem
+    cache.clear()
+    yield
+    cache.clear()
@@ -0,0 +1,1552 @@
+import asyncio
+import io
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import Client
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from to_do.autocomplete import PrefixCache, prefix_cache
+from to_do.async_views import NotificationStreamView
+from to_do.models import (
+    User, Note, Category, Subject, File, NoteTag, SearchLog, Notification, NotificationType,
+    NoteRecommendation, Sharing, UserInteraction, NoteAnalysis, NoteEntity, LoginHistory, NoteHistory,
+    FileUpload, Blob, Review
+)
+from to_do.pubsub import InProcessBroker
+
+
+def make_user(username='testuser'):
+    return User.objects.create_user(
+        username=username,
+        email=f'{username}@example.com',
+        password='password123'
+    )
+
+
+def make_notes(user, count, start=0):
+    category = Category.objects.create(name=f'Categoria {start}')
+    subject = Subject.objects.create(name=f'Assunto {start}')
+    for i in range(start, start + count):
+        note = Note.objects.create(user=user, title=f'Nota {i}', content='Conteúdo')
+        note.categories.add(category)
+        note.subjects.add(subject)
+        File.objects.create(note=note, file=f'notes/files/arquivo_{i}.pdf')
+
+
+@pytest.mark.django_db
+class TestNoteListQueries:
+    def count_list_queries(self, client):
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get('/api/notes/')
+        assert response.status_code == 200
+        return len(response.data), len(ctx.captured_queries)
+
+    def test_note_list_constant_queries(self):
+        # O número de queries não deve crescer com a quantidade de notas
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        make_notes(user, 3)
+        rows_small, queries_small = self.count_list_queries(client)
+
+        make_notes(user, 20, start=3)
+        rows_large, queries_large = self.count_list_queries(client)
+
+        assert (rows_small, rows_large) == (3, 23)
+        assert queries_small == queries_large
+
+    def test_note_list_paginates_only_when_asked(self):
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        make_notes(user, 3)
+
+        assert [note['title'] for note in client.get('/api/notes/').data] == ['Nota 2', 'Nota 1', 'Nota 0']
+        first = client.get('/api/notes/', {'page_size': 2}).data
+        assert [note['title'] for note in first['results']] == ['Nota 2', 'Nota 1']
+        second = client.get(first['next']).data
+        assert [note['title'] for note in second['results']] == ['Nota 0']
+        assert second['next'] is None
+
+    def test_note_list_renders_nested_relations(self):
+        # As relações pré-carregadas continuam sendo serializadas
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        make_notes(user, 1)
+
+        response = client.get('/api/notes/')
+        note = response.data[0]
+        assert note['categories'][0]['name'] == 'Categoria 0'
+        assert note['subjects'][0]['name'] == 'Assunto 0'
+        assert len(note['files']) == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason='Busca textual depende do PostgreSQL')
+class TestNoteSearch:
+    def test_search_ranks_results_and_logs_query(self):
+        # Título pesa mais que conteúdo; tags também entram no documento
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        Note.objects.create(user=user, title='Orçamento', content='Revisar a planilha de viagem')
+        Note.objects.create(user=user, title='Viagem para Recife', content='Comprar passagens')
+        tagged = Note.objects.create(user=user, title='Lista', content='Itens diversos')
+        NoteTag.objects.create(note=tagged, tag='viagem')
+        Note.objects.create(user=user, title='Mercado', content='Frutas e legumes')
+
+        response = client.get('/api/notes/search/', {'q': 'viagem'})
+
+        assert response.status_code == 200
+        assert response.data['count'] == 3
+        assert response.data['results'][0]['title'] == 'Viagem para Recife'
+        headlines = {row['title']: row['headline'] for row in response.data['results']}
+        assert '<mark>viagem</mark>' in headlines['Orçamento']
+        log = SearchLog.objects.get(user=user)
+        assert (log.query, log.results_count) == ('viagem', 3)
+
+    def test_search_requires_query(self):
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        response = client.get('/api/notes/search/')
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason='Trigramas dependem do PostgreSQL')
+class TestNoteAutocomplete:
+    def test_autocomplete_prefix_and_typo(self):
+        # Prefixo vem antes de similaridade; erros de digitação ainda casam
+        prefix_cache.clear()
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        note = Note.objects.create(user=user, title='Reunião de planejamento', content='...')
+        NoteTag.objects.create(note=note, tag='planejamento')
+        Category.objects.create(name='Planos')
+
+        response = client.get('/api/notes/autocomplete/', {'q': 'plan'})
+        assert response.status_code == 200
+        assert {(s['type'], s['value']) for s in response.data} >= {
+            ('tag', 'planejamento'), ('category', 'Planos')
+        }
+
+        response = client.get('/api/notes/autocomplete/', {'q': 'planejamneto'})
+        assert ('tag', 'planejamento') in {(s['type'], s['value']) for s in response.data}
+
+    def test_autocomplete_hits_cache(self):
+        prefix_cache.clear()
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        Note.objects.create(user=user, title='Reunião', content='...')
+
+        client.get('/api/notes/autocomplete/', {'q': 'reu'})
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get('/api/notes/autocomplete/', {'q': 'REU'})
+        assert response.data[0]['value'] == 'Reunião'
+        assert not [q for q in ctx.captured_queries if 'to_do_note' in q['sql']]
+
+
+class TestPrefixCache:
+    def test_evicts_least_recently_used(self):
+        cache = PrefixCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+
+    def test_expires_entries(self):
+        cache = PrefixCache(ttl=0)
+        cache.set('a', 1)
+        assert cache.get('a') is None
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+    def test_etag_returns_not_modified(self):
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        make_notes(user, 2)
+
+        first = client.get('/api/notes/')
+        etag = first['ETag']
+        with CaptureQueriesContext(connection) as ctx:
+            second = client.get('/api/notes/', HTTP_IF_NONE_MATCH=etag)
+
+        assert second.status_code == 304
+        assert len(ctx.captured_queries) == 0
+
+    def test_write_invalidates_cached_list(self):
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        make_notes(user, 1)
+
+        etag = client.get('/api/notes/')['ETag']
+        response = client.post('/api/notes/', {
+            'title': 'Nova', 'content': 'Texto', 'category_ids': [], 'subject_ids': []
+        }, format='json')
+        assert response.status_code == 201
+
+        response = client.get('/api/notes/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+        assert len(response.data) == 2
+
+    def test_cache_is_per_user(self):
+        owner, other = make_user('owner'), make_user('other')
+        make_notes(owner, 1)
+        client = APIClient()
+
+        client.force_authenticate(user=owner)
+        assert len(client.get('/api/notes/').data) == 1
+        client.force_authenticate(user=other)
+        assert len(client.get('/api/notes/').data) == 0
+
+    def test_owner_write_invalidates_recipient(self):
+        owner, friend = make_user('owner'), make_user('friend')
+        note = Note.objects.create(user=owner, title='Compartilhada', content='...')
+        Sharing.objects.create(note=note, shared_with=friend)
+        attachment = File.objects.create(note=note, file='notes/files/antigo.pdf')
+        client = APIClient()
+        client.force_authenticate(user=friend)
+        url = f'/api/files/{attachment.pk}/'
+        etag = client.get(url)['ETag']
+
+        attachment.file = 'notes/files/novo.pdf'
+        attachment.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.data['file'].endswith('novo.pdf')
+
+        attachment.delete()
+        assert client.get(url).status_code == 404
+
+    def test_user_save_only_invalidates_on_visible_fields(self):
+        from django.utils import timezone
+
+        user, other = make_user('owner'), make_user('other')
+        client = APIClient()
+        client.force_authenticate(user=other)
+        etag = client.get('/api/users/')['ETag']
+
+        user.last_login = timezone.now()
+        user.save(update_fields=['last_login'])
+        user.last_login = timezone.now()
+        user.save()
+        assert client.get('/api/users/', HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+        user.email = 'novo@example.com'
+        user.save()
+        assert client.get('/api/users/', HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.django_db
+class TestBulkEndpoints:
+    def setup_client(self):
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return user, client
+
+    def test_bulk_create_notes_reports_each_item(self):
+        user, client = self.setup_client()
+        Note.objects.create(user=user, title='Existente', content='...')
+        category = Category.objects.create(name='Trabalho')
+
+        response = client.post('/api/notes/bulk/', [
+            {'title': 'Nova 1', 'content': 'a', 'category_ids': [category.pk], 'tags': ['x', 'y']},
+            {'title': 'Existente', 'content': 'b'},
+            {'title': 'Nova 1', 'content': 'c'},
+            {'title': '', 'content': 'd'},
+            {'title': 'Nova 2', 'content': 'e', 'category_ids': [999]},
+        ], format='json')
+
+        assert response.status_code == 200
+        statuses = [item['status'] for item in response.data['results']]
+        assert statuses == ['created', 'conflict', 'conflict', 'invalid', 'invalid']
+        note = Note.objects.get(user=user, title='Nova 1')
+        assert list(note.categories.all()) == [category]
+        assert sorted(note.tags.values_list('tag', flat=True)) == ['x', 'y']
+
+    def test_bulk_create_notes_upsert(self):
+        user, client = self.setup_client()
+        note = Note.objects.create(user=user, title='Existente', content='antigo')
+
+        response = client.post('/api/notes/bulk/?on_conflict=update', [
+            {'title': 'Existente', 'content': 'novo'},
+        ], format='json')
+
+        assert response.data['results'][0] == {'index': 0, 'status': 'updated', 'id': note.pk}
+        note.refresh_from_db()
+        assert note.content == 'novo'
+        # A sobrescrita pelo upsert entra no histórico
+        entry = NoteHistory.objects.get(note=note)
+        assert entry.edited_by == user
+        assert (entry.previous_content, entry.updated_content) == ('antigo', 'novo')
+
+    def test_bulk_create_query_count_does_not_grow(self):
+        _, client = self.setup_client()
+
+        def run(start, count):
+            items = [{'title': f'Nota {i}', 'content': '...', 'tags': ['t']} for i in range(start, start + count)]
+            with CaptureQueriesContext(connection) as ctx:
+                client.post('/api/notes/bulk/', items, format='json')
+            return len(ctx.captured_queries)
+
+        assert run(0, 5) == run(5, 50)
+
+    def test_bulk_update_and_delete_notes(self):
+        user, client = self.setup_client()
+        other = make_user('other')
+        mine = Note.objects.create(user=user, title='Minha', content='...')
+        theirs = Note.objects.create(user=other, title='Deles', content='...')
+
+        response = client.patch('/api/notes/bulk/', [
+            {'id': mine.pk, 'completed': True},
+            {'id': theirs.pk, 'completed': True},
+        ], format='json')
+        assert [item['status'] for item in response.data['results']] == ['updated', 'not_found']
+        mine.refresh_from_db()
+        assert mine.completed
+
+        response = client.delete('/api/notes/bulk/', {'ids': [mine.pk, theirs.pk]}, format='json')
+        assert [item['status'] for item in response.data['results']] == ['deleted', 'not_found']
+        assert Note.objects.filter(pk=theirs.pk).exists()
+
+    def test_bulk_update_swaps_and_reuses_titles(self):
+        user, client = self.setup_client()
+        a, b, c, d = (Note.objects.create(user=user, title=title, content='...') for title in 'ABCD')
+
+        response = client.patch('/api/notes/bulk/', [
+            {'id': a.pk, 'title': 'B'},
+            {'id': b.pk, 'title': 'A'},
+            {'id': c.pk, 'title': 'D'},
+            {'id': d.pk, 'completed': True},
+        ], format='json')
+        assert response.status_code == 200
+        assert [item['status'] for item in response.data['results']] == ['updated', 'updated', 'conflict', 'updated']
+        assert dict(Note.objects.values_list('pk', 'title')) == {a.pk: 'B', b.pk: 'A', c.pk: 'C', d.pk: 'D'}
+
+        # C -> B só passa porque B -> E também é aceita
+        response = client.patch('/api/notes/bulk/', [
+            {'id': c.pk, 'title': 'B'},
+            {'id': a.pk, 'title': 'E'},
+        ], format='json')
+        assert [item['status'] for item in response.data['results']] == ['updated', 'updated']
+        assert dict(Note.objects.values_list('pk', 'title')) == {a.pk: 'E', b.pk: 'A', c.pk: 'B', d.pk: 'D'}
+
+    def test_bulk_create_tags_and_entities(self):
+        user, client = self.setup_client()
+        note = Note.objects.create(user=user, title='Nota', content='...')
+        NoteTag.objects.create(note=note, tag='antiga')
+        foreign = Note.objects.create(user=make_user('other'), title='Alheia', content='...')
+
+        response = client.post('/api/note-tags/bulk/', [
+            {'note': note.pk, 'tag': 'nova'},
+            {'note': note.pk, 'tag': 'antiga'},
+            {'note': foreign.pk, 'tag': 'nova'},
+        ], format='json')
+        assert [item['status'] for item in response.data['results']] == ['created', 'conflict', 'invalid']
+
+        response = client.post('/api/note-entities/bulk/', [
+            {'note': note.pk, 'entity_type': 'pessoa', 'entity_value': 'Ana'},
+        ], format='json')
+        assert response.data['results'][0]['status'] == 'created'
+        assert note.entities.get().entity_value == 'Ana'
+
+
+@pytest.mark.django_db
+class TestDeltaSync:
+    def read_sync(self, client, since=None):
+        response = client.get('/api/sync/', {'since': since} if since else {})
+        assert response.status_code == 200
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_sync_returns_changes_and_tombstones(self):
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        kept = Note.objects.create(user=user, title='Mantida', content='...')
+        removed = Note.objects.create(user=user, title='Removida', content='...')
+
+        initial = self.read_sync(client)
+        assert {note['title'] for note in initial['notes']} == {'Mantida', 'Removida'}
+        assert initial['deleted_notes'] == []
+
+        kept.content = 'alterada'
+        kept.save()
+        removed_id = removed.pk
+        removed.delete()
+        Note.objects.create(user=user, title='Nova', content='...')
+
+        delta = self.read_sync(client, initial['watermark'])
+        assert {note['title'] for note in delta['notes']} == {'Mantida', 'Nova'}
+        assert delta['deleted_notes'] == [removed_id]
+        assert delta['sharings'] == [] and delta['notifications'] == []
+
+    def test_sync_overlaps_watermark_and_follows_sharing(self):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        owner, friend = make_user('dono'), make_user('amigo')
+        client = APIClient()
+        client.force_authenticate(user=friend)
+        note = Note.objects.create(user=owner, title='Compartilhada', content='...')
+        initial = self.read_sync(client)
+        assert initial['notes'] == []
+
+        # Commit atrasado: o carimbo é anterior à marca d'água já entregue
+        late = Note.objects.create(user=friend, title='Atrasada', content='...')
+        Note.objects.filter(pk=late.pk).update(updated_at=timezone.now() - timedelta(seconds=5))
+        sharing = Sharing.objects.create(note=note, shared_with=friend)
+        delta = self.read_sync(client, initial['watermark'])
+        assert {n['title'] for n in delta['notes']} == {'Atrasada', 'Compartilhada'}
+
+        sharing.delete()
+        delta = self.read_sync(client, delta['watermark'])
+        assert delta['deleted_notes'] == [note.pk]
+        assert 'Compartilhada' not in {n['title'] for n in delta['notes']}
+
+        # Compartilhada de novo: sai de deleted_notes
+        Sharing.objects.create(note=note, shared_with=friend)
+        assert self.read_sync(client, delta['watermark'])['deleted_notes'] == []
+
+    def test_sync_includes_old_note_shared_after_watermark(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from to_do.models import NoteAccess
+
+        owner, friend = make_user('dono'), make_user('amigo')
+        client = APIClient()
+        client.force_authenticate(user=friend)
+        old = timezone.now() - timedelta(days=30)
+        note = Note.objects.create(user=owner, title='Antiga', content='...')
+        Note.objects.filter(pk=note.pk).update(created_at=old, updated_at=old)
+        NoteAccess.objects.filter(note=note).update(created_at=old, granted_at=old)
+        initial = self.read_sync(client)
+
+        Sharing.objects.create(note=note, shared_with=friend)
+        delta = self.read_sync(client, initial['watermark'])
+        assert [n['title'] for n in delta['notes']] == ['Antiga']
+
+    def test_sync_rejects_invalid_watermark(self):
+        client = APIClient()
+        client.force_authenticate(user=make_user())
+        assert client.get('/api/sync/', {'since': 'ontem'}).status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAsyncReadPath:
+    def test_async_note_list_pages_with_cursor(self):
+        user = make_user()
+        make_notes(user, 3)
+        client = Client()
+        client.force_login(user)
+
+        first = client.get('/api/async/notes/', {'page_size': 2}).json()
+        assert [note['title'] for note in first['results']] == ['Nota 2', 'Nota 1']
+        second = client.get(first['next']).json()
+        assert [note['title'] for note in second['results']] == ['Nota 0']
+        assert second['next'] is None
+        assert second['results'][0]['categories'][0]['name'] == 'Categoria 0'
+
+    def test_async_retrieve_with_jwt(self):
+        user = make_user()
+        note = Note.objects.create(user=user, title='Nota', content='...')
+        other = Note.objects.create(user=make_user('other'), title='Alheia', content='...')
+        token = str(RefreshToken.for_user(user).access_token)
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        assert client.get(f'/api/async/notes/{note.pk}/').json()['title'] == 'Nota'
+        assert client.get(f'/api/async/notes/{other.pk}/').status_code == 404
+
+    def test_async_requires_authentication(self):
+        assert Client().get('/api/async/notifications/').status_code == 401
+
+
+@pytest.mark.django_db(transaction=True)
+class TestNotificationStream:
+    def test_stream_resumes_after_last_event_id(self):
+        user = make_user()
+        kind = NotificationType.objects.create(name='share', template='...')
+        first = Notification.objects.create(type=kind, user=user, message='primeira')
+        second = Notification.objects.create(type=kind, user=user, message='segunda')
+
+        async def read(count):
+            events = NotificationStreamView().events(None, user, first.pk)
+            chunks = [await events.__anext__() for _ in range(count)]
+            await events.aclose()
+            return chunks
+
+        retry, event = async_to_sync(read)(2)
+        assert retry.startswith('retry:')
+        assert event.startswith(f'id: {second.pk}\nevent: notification\n')
+        assert '"segunda"' in event
+
+    def test_broker_wakes_subscribers_of_the_user(self):
+        broker = InProcessBroker()
+
+        async def scenario():
+            mine, other = broker.subscribe(1), broker.subscribe(2)
+            broker.publish(1, 10)
+            await asyncio.wait_for(mine.queue.get(), 1)
+            assert other.queue.empty()
+            broker.unsubscribe(mine)
+            broker.unsubscribe(other)
+
+        async_to_sync(scenario)()
+
+
+@pytest.mark.django_db
+class TestUnreadCounter:
+    def test_counter_follows_create_read_and_mark_all(self):
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        kind = NotificationType.objects.create(name='share', template='...')
+        notifications = [
+            Notification.objects.create(type=kind, user=user, message=f'n{i}') for i in range(3)
+        ]
+        assert client.get('/api/notifications/unread-count/').data == {'unread': 3}
+
+        response = client.patch(f'/api/notifications/{notifications[0].pk}/', {'read': True}, format='json')
+        assert response.status_code == 200
+        assert client.get('/api/notifications/unread-count/').data == {'unread': 2}
+
+        notifications[1].delete()
+        assert client.get('/api/notifications/unread-count/').data == {'unread': 1}
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.post('/api/notifications/mark-all-read/')
+        assert response.data == {'updated': 1}
+        assert len([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "to_do_notification"')]) == 1
+        assert client.get('/api/notifications/unread-count/').data == {'unread': 0}
+        assert not Notification.objects.filter(user=user, read=False).exists()
+
+
+@pytest.mark.django_db
+class TestRecommendationEngine:
+    def test_scores_shared_notes_by_similarity(self):
+        pytest.importorskip('scipy')
+        from django.core.management import call_command
+
+        reader, author, other = make_user('reader'), make_user('author'), make_user('other')
+        python_notes = [
+            Note.objects.create(user=author, title=f'python {i}', content='...') for i in range(3)
+        ]
+        unrelated = Note.objects.create(user=author, title='receitas', content='...')
+        for note in python_notes:
+            NoteTag.objects.create(note=note, tag='python')
+        NoteTag.objects.create(note=unrelated, tag='culinaria')
+
+        # Outro leitor consome as notas de python juntas
+        for note in python_notes:
+            Sharing.objects.create(note=note, shared_with=other)
+            UserInteraction.objects.create(user=other, note=note, interaction_type='view')
+        UserInteraction.objects.create(user=reader, note=python_notes[0], interaction_type='edit')
+        Sharing.objects.create(note=python_notes[0], shared_with=reader)
+        Sharing.objects.create(note=python_notes[1], shared_with=reader)
+        Sharing.objects.create(note=unrelated, shared_with=reader)
+
+        call_command('recommend_notes', top_k=5, stdout=open('/dev/null', 'w'))
+        call_command('recommend_notes', top_k=5, stdout=open('/dev/null', 'w'))
+
+        scores = dict(
+            NoteRecommendation.objects.filter(user=reader).values_list('recommended_note_id', 'score')
+        )
+        # Só notas compartilhadas e ainda não vistas, sem duplicar entre execuções
+        assert set(scores) <= {python_notes[1].pk, unrelated.pk}
+        assert python_notes[1].pk in scores
+        assert scores[python_notes[1].pk] > scores.get(unrelated.pk, 0)
+        assert not NoteRecommendation.objects.filter(user=author).exists()
+
+
+@pytest.mark.django_db
+class TestAnalysisPipeline:
+    def test_analyzes_changed_notes_and_skips_unchanged(self):
+        from to_do.analysis import AnalysisPipeline
+
+        user = make_user()
+        note = Note.objects.create(
+            user=user, title='Reunião de projeto',
+            content='Projeto atrasado, problema no deploy. Contato: ana@example.com em 10/03/2025.'
+        )
+        NoteTag.objects.create(note=note, tag='manual')
+        pipeline = AnalysisPipeline(workers=1)
+
+        assert pipeline.run() == {'analyzed': 1, 'skipped': 0}
+        analysis = NoteAnalysis.objects.get(note=note)
+        assert analysis.sentiment == 'negative'
+        assert 'projeto' in analysis.keywords
+        assert set(NoteEntity.objects.filter(note=note).values_list('entity_type', 'entity_value')) == {
+            ('email', 'ana@example.com'), ('data', '10/03/2025')
+        }
+        assert {'manual', 'projeto'} <= set(note.tags.values_list('tag', flat=True))
+
+        # Nada pendente; depois, salvar sem mudar o texto não reanalisa
+        assert pipeline.run() == {'analyzed': 0, 'skipped': 0}
+        note.completed = True
+        note.save()
+        assert pipeline.run() == {'analyzed': 0, 'skipped': 1}
+
+        # Entidades criadas pelo usuário sobrevivem à reanálise
+        client = APIClient()
+        client.force_authenticate(user=user)
+        response = client.post('/api/note-entities/',
+                               {'note': note.pk, 'entity_type': 'pessoa', 'entity_value': 'Ana'}, format='json')
+        assert response.data['source'] == 'user'
+        note.content = 'Deploy resolvido, ótimo resultado. Link: https://example.com/deploy'
+        note.save()
+        assert pipeline.run() == {'analyzed': 1, 'skipped': 0}
+        analysis.refresh_from_db()
+        assert analysis.sentiment == 'positive'
+        assert set(NoteEntity.objects.filter(note=note).values_list('entity_type', 'source')) == {
+            ('url', 'analysis'), ('pessoa', 'user')
+        }
+        assert NoteAnalysis.objects.filter(note=note).count() == 1
+
+
+@pytest.mark.django_db
+class TestInteractionIngestion:
+    def test_events_are_buffered_and_flushed_in_batches(self, tmp_path, monkeypatch):
+        from to_do import ingest
+
+        user = make_user()
+        note = Note.objects.create(user=user, title='Nota', content='Conteúdo')
+        buffer = ingest.InteractionBuffer(tmp_path, flush_size=3, flush_interval=0)
+        monkeypatch.setattr(ingest, '_buffer', buffer)
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        response = client.post('/api/user-interactions/events/',
+                               [{'note': note.pk, 'interaction_type': 'view'}] * 2, format='json')
+        assert response.status_code == 202
+        assert response.data == {'accepted': 2}
+        assert not UserInteraction.objects.exists()
+        assert len(list(tmp_path.glob('*.jsonl'))) == 1
+
+        # O terceiro evento completa o lote; o evento de nota inexistente é descartado
+        client.post('/api/user-interactions/events/', {'note': note.pk, 'interaction_type': 'edit'}, format='json')
+        assert UserInteraction.objects.filter(user=user).count() == 3
+        assert not list(tmp_path.glob('*.jsonl'))
+
+        # Nota removida depois do evento: descartada no flush
+        client.post('/api/user-interactions/events/', {'note': note.pk, 'interaction_type': 'view'}, format='json')
+        Note.objects.filter(pk=note.pk).delete()
+        assert buffer.flush() == 0
+        note = Note.objects.create(user=user, title='Nota', content='Conteúdo')
+        assert client.post('/api/user-interactions/events/', {'note': note.pk, 'interaction_type': 'bad'},
+                           format='json').status_code == 400
+
+    def test_events_require_access_to_the_note(self, tmp_path, monkeypatch):
+        from to_do import ingest
+
+        user, owner = make_user(), make_user('dono')
+        mine = Note.objects.create(user=user, title='Minha', content='...')
+        foreign = Note.objects.create(user=owner, title='Alheia', content='...')
+        shared = Note.objects.create(user=owner, title='Compartilhada', content='...')
+        Sharing.objects.create(note=shared, shared_with=user)
+        monkeypatch.setattr(ingest, '_buffer', ingest.InteractionBuffer(tmp_path, flush_size=100, flush_interval=0))
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        response = client.post('/api/user-interactions/events/', [
+            {'note': mine.pk, 'interaction_type': 'view'},
+            {'note': foreign.pk, 'interaction_type': 'view'},
+        ], format='json')
+        assert response.status_code == 400
+        assert response.data[0] == {} and 'note' in response.data[1]
+        assert not list(tmp_path.glob('*.jsonl'))
+
+        response = client.post('/api/user-interactions/events/', [
+            {'note': mine.pk, 'interaction_type': 'view'},
+            {'note': shared.pk, 'interaction_type': 'view'},
+        ], format='json')
+        assert response.status_code == 202
+        assert ingest._buffer.flush() == 2
+
+    def test_recover_replays_spool_of_dead_process(self, tmp_path):
+        from to_do.ingest import InteractionBuffer
+
+        user = make_user()
+        note = Note.objects.create(user=user, title='Nota', content='Conteúdo')
+        event = {'user_id': user.pk, 'note_id': note.pk, 'interaction_type': 'share',
+                 'metadata': None, 'timestamp': '2025-01-02T03:04:05+00:00'}
+        (tmp_path / 'interactions-999999999-0.jsonl').write_text(json.dumps(event) + '\n{"user_id": 1, "no')
+
+        assert InteractionBuffer(tmp_path).recover() == 1
+        interaction = UserInteraction.objects.get(user=user)
+        assert interaction.interaction_type == 'share'
+        assert interaction.timestamp.year == 2025
+        assert not list(tmp_path.glob('*.jsonl'))
+
+    def test_failed_batch_stays_on_disk_and_live_owner_is_skipped(self, tmp_path, monkeypatch):
+        from to_do import ingest
+
+        user = make_user()
+        note = Note.objects.create(user=user, title='Nota', content='Conteúdo')
+        buffer = ingest.InteractionBuffer(tmp_path, flush_size=100, flush_interval=0)
+        buffer.append(user.pk, note.pk, 'view')
+        # O segmento é de um processo vivo (o lock está preso)
+        assert ingest.InteractionBuffer(tmp_path).recover() == 0
+
+        def fail(events):
+            raise RuntimeError('banco fora')
+        monkeypatch.setattr(ingest, 'write_events', fail)
+        with pytest.raises(RuntimeError):
+            buffer.flush()
+        assert buffer._pending[0][1] is None
+        assert len(list(tmp_path.glob('*.jsonl'))) == 1
+
+        monkeypatch.undo()
+        assert buffer.flush() == 1
+        assert UserInteraction.objects.filter(user=user).count() == 1
+        assert not list(tmp_path.glob('*.jsonl'))
+
+
+@pytest.mark.django_db
+class TestTimePartitions:
+    def test_month_arithmetic(self):
+        from datetime import date
+        from to_do.partitions import add_months, create_partition_sql
+
+        assert add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+        assert add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+        assert create_partition_sql('to_do_searchlog', date(2025, 12, 1)) == (
+            'CREATE TABLE IF NOT EXISTS to_do_searchlog_p202512 PARTITION OF to_do_searchlog '
+            "FOR VALUES FROM ('2025-12-01') TO ('2026-01-01')"
+        )
+
+    def test_late_partition_moves_rows_out_of_default(self):
+        from datetime import date
+        from to_do.partitions import move_default_rows_sql
+
+        create, copy, delete, attach = move_default_rows_sql('to_do_searchlog', date(2025, 12, 1))
+        bounds = "created_at >= '2025-12-01' AND created_at < '2026-01-01'"
+        assert create.startswith('CREATE TABLE to_do_searchlog_p202512 (LIKE to_do_searchlog ')
+        assert copy == f'INSERT INTO to_do_searchlog_p202512 SELECT * FROM to_do_searchlog_default WHERE {bounds}'
+        assert delete == f'DELETE FROM to_do_searchlog_default WHERE {bounds}'
+        assert attach.startswith('ALTER TABLE to_do_searchlog ATTACH PARTITION to_do_searchlog_p202512 ')
+
+    def test_log_lists_filter_by_time_range(self):
+        from datetime import datetime, timezone as dt_timezone
+
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        for day in (1, 15, 28):
+            entry = LoginHistory.objects.create(user=user, ip_address='127.0.0.1', user_agent='pytest')
+            LoginHistory.objects.filter(pk=entry.pk).update(
+                timestamp=datetime(2025, 2, day, 12, tzinfo=dt_timezone.utc)
+            )
+
+        response = client.get('/api/login-histories/', {'since': '2025-02-10', 'until': '2025-02-15'})
+        assert response.status_code == 200
+        assert [row['timestamp'][:10] for row in response.data['results']] == ['2025-02-15']
+        assert client.get('/api/login-histories/', {'since': 'ontem'}).status_code == 400
+
+
+@pytest.mark.django_db
+class TestSearchRollups:
+    def log(self, user, query, results, when):
+        entry = SearchLog.objects.create(user=user, query=query, results_count=results)
+        SearchLog.objects.filter(pk=entry.pk).update(created_at=when)
+
+    def test_incremental_rollup_and_analytics(self):
+        from datetime import datetime, timezone as dt_timezone
+        from to_do.models import SearchRollup
+        from to_do.rollups import rollup_search_logs
+
+        user = make_user()
+        day = datetime(2025, 3, 10, tzinfo=dt_timezone.utc)
+        self.log(user, 'Viagem', 4, day.replace(hour=9, minute=5))
+        self.log(user, 'viagem ', 2, day.replace(hour=9, minute=40))
+        self.log(user, 'xyz', 0, day.replace(hour=10, minute=1))
+
+        stats = rollup_search_logs(now=day.replace(hour=11, minute=30))
+        assert stats['hours'] == 2
+        hourly = SearchRollup.objects.get(period='hour', bucket=day.replace(hour=9), query='viagem')
+        assert (hourly.searches, hourly.total_results, hourly.zero_results) == (2, 6, 0)
+
+        # A hora 10 já foi agregada; a nova busca na hora 11 entra na próxima execução
+        self.log(user, 'viagem', 0, day.replace(hour=11, minute=10))
+        assert rollup_search_logs(now=day.replace(hour=11, minute=40))['hours'] == 0
+        assert rollup_search_logs(now=day.replace(hour=12, minute=30))['hours'] == 1
+        daily = SearchRollup.objects.get(period='day', bucket=day, query='viagem')
+        assert (daily.searches, daily.zero_results) == (3, 1)
+
+        admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='x')
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        params = {'since': '2025-03-10', 'until': '2025-03-10'}
+        with CaptureQueriesContext(connection) as ctx:
+            top = client.get('/api/search-analytics/top/', params).data
+        assert not [q for q in ctx.captured_queries if 'to_do_searchlog' in q['sql']]
+        assert top[0] == {'query': 'viagem', 'searches': 3, 'zero_results': 1, 'avg_results': 2.0}
+        zero = client.get('/api/search-analytics/zero-results/', params).data
+        assert [row['query'] for row in zero] == ['viagem', 'xyz']
+        volume = client.get('/api/search-analytics/volume/', {**params, 'period': 'hour'}).data
+        assert [row['searches'] for row in volume] == [2, 1, 1]
+
+        client.force_authenticate(user=user)
+        assert client.get('/api/search-analytics/top/').status_code == 403
+
+
+@pytest.mark.django_db
+class TestNoteHistoryStorage:
+    def make_history(self, user, versions):
+        from to_do.history import record_version
+
+        base = ''.join(f'texto fixo {i}\n' for i in range(40))
+        note = Note.objects.create(user=user, title='Histórico', content=base)
+        contents = [base]
+        for i in range(1, versions + 1):
+            contents.append(contents[-1] + f'linha {i}\n')
+            record_version(note, contents[-1], previous_content=contents[-2], edited_by=user)
+        return note, contents
+
+    def test_versions_are_stored_as_deltas_and_reconstructed(self):
+        from to_do.history import SNAPSHOT_INTERVAL, version_content
+
+        user = make_user()
+        note, contents = self.make_history(user, 45)
+
+        entries = NoteHistory.objects.filter(note=note)
+        assert list(entries.filter(snapshot__isnull=False).order_by('version')
+                    .values_list('version', flat=True)) == [1, 1 + SNAPSHOT_INTERVAL, 1 + 2 * SNAPSHOT_INTERVAL]
+        for version in (0, 1, 19, 20, 21, 45):
+            assert version_content(note.pk, version) == contents[version]
+
+        # Reconstruir uma versão lê no máximo um ciclo de snapshot
+        with CaptureQueriesContext(connection) as ctx:
+            version_content(note.pk, 40)
+        assert len(ctx.captured_queries) == 2
+
+    def test_history_api(self):
+        user = make_user()
+        note, contents = self.make_history(user, 25)
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        response = client.get('/api/note-history/', {'note': note.pk})
+        assert response.status_code == 200
+        rows = {row['version']: row for row in response.data}
+        assert rows[22]['updated_content'] == contents[22]
+        assert rows[22]['previous_content'] == contents[21]
+
+        response = client.get('/api/note-history/version/', {'note': note.pk, 'version': 7})
+        assert response.data['content'] == contents[7]
+        response = client.get('/api/note-history/diff/', {'note': note.pk, 'from': 3, 'to': 5})
+        assert '+linha 4\n' in response.data['diff'] and '+linha 5\n' in response.data['diff']
+        assert client.get('/api/note-history/version/', {'note': note.pk, 'version': 99}).status_code == 404
+
+        response = client.post('/api/note-history/', {
+            'note': note.pk, 'updated_content': 'novo\n', 'change_reason': 'reescrita'
+        }, format='json')
+        assert response.status_code == 201
+        assert (response.data['version'], response.data['previous_content']) == (26, contents[25])
+
+        other = make_user('other')
+        client.force_authenticate(user=other)
+        assert client.get('/api/note-history/version/', {'note': note.pk, 'version': 7}).status_code == 404
+
+    def test_deleting_a_version_keeps_the_chain(self):
+        from to_do.history import version_content
+
+        user = make_user()
+        note, contents = self.make_history(user, 6)
+        NoteHistory.objects.get(note=note, version=3).delete()
+        assert version_content(note.pk, 4) == contents[4]
+        assert version_content(note.pk, 6) == contents[6]
+
+
+@pytest.mark.django_db
+class TestNoteHistoryCapture:
+    def test_edits_are_captured_and_coalesced(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from to_do.history import version_content
+
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        note = Note.objects.create(user=user, title='Rascunho', content='v0')
+        url = f'/api/notes/{note.pk}/'
+
+        # Mudar só o título não gera versão
+        assert client.patch(url, {'title': 'Rascunho 2'}, format='json').status_code == 200
+        assert not NoteHistory.objects.filter(note=note).exists()
+
+        # Autosave: várias edições seguidas viram uma só versão
+        for text in ('v1', 'v12', 'v123'):
+            client.patch(url, {'content': text}, format='json')
+        entry = NoteHistory.objects.get(note=note)
+        assert (entry.version, entry.previous_content, entry.updated_content) == (1, 'v0', 'v123')
+        assert entry.edited_by == user
+
+        # Fora da janela, uma nova versão
+        NoteHistory.objects.filter(pk=entry.pk).update(edited_at=timezone.now() - timedelta(minutes=10))
+        client.patch(url, {'content': 'v1234'}, format='json')
+        assert NoteHistory.objects.filter(note=note).count() == 2
+        assert version_content(note.pk, 2) == 'v1234'
+
+        # Voltar ao conteúdo do início da rajada descarta a versão
+        client.patch(url, {'content': 'v123'}, format='json')
+        assert NoteHistory.objects.filter(note=note).count() == 1
+
+    def test_bulk_update_captures_history(self):
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        notes = [Note.objects.create(user=user, title=f'Nota {i}', content='antes') for i in range(3)]
+
+        response = client.patch('/api/notes/bulk/', [
+            {'id': notes[0].pk, 'content': 'depois'},
+            {'id': notes[1].pk, 'completed': True},
+        ], format='json')
+        assert response.status_code == 200
+        assert list(NoteHistory.objects.values_list('note_id', flat=True)) == [notes[0].pk]
+        assert NoteHistory.objects.get().updated_content == 'depois'
+
+
+@pytest.mark.django_db
+class TestChunkedUpload:
+    @pytest.fixture(autouse=True)
+    def storage(self, settings, tmp_path):
+        settings.MEDIA_ROOT = str(tmp_path / 'media')
+        settings.FILE_UPLOAD_SESSION_DIR = tmp_path / 'parts'
+        settings.FILE_UPLOAD_CHUNK_MAX_SIZE = 1024
+        return tmp_path
+
+    def start(self, client, note, payload, **overrides):
+        import hashlib
+        data = {
+            'note': note.pk, 'filename': '../anexo.bin', 'size': len(payload),
+            'checksum': hashlib.sha256(payload).hexdigest(), **overrides
+        }
+        response = client.post('/api/file-uploads/', data, format='json')
+        assert response.status_code == 201, response.data
+        return f'/api/file-uploads/{response.data["id"]}/'
+
+    def send(self, client, url, offset, chunk):
+        return client.patch(url, chunk, content_type='application/offset+octet-stream',
+                            HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_chunks_resume_and_complete(self, storage, django_capture_on_commit_callbacks):
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        note = Note.objects.create(user=user, title='Com anexo', content='')
+        payload = bytes(range(256)) * 10
+        url = self.start(client, note, payload)
+
+        assert self.send(client, url, 0, payload[:1000]).data['offset'] == 1000
+        # Parte repetida (o cliente não viu a resposta): 409 com o offset atual
+        response = self.send(client, url, 0, payload[:1000])
+        assert response.status_code == 409
+        assert response['Upload-Offset'] == '1000'
+        assert client.head(url)['Upload-Offset'] == '1000'
+        assert self.send(client, url, 1000, payload[1000:3000]).status_code == 413
+
+        # Incompleto ainda não vira File
+        assert client.post(url + 'complete/').status_code == 400
+        self.send(client, url, 1000, payload[1000:2000])
+        self.send(client, url, 2000, payload[2000:])
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.post(url + 'complete/')
+        assert response.status_code == 201
+
+        stored = File.objects.get(note=note)
+        assert stored.filename == 'anexo.bin'
+        with stored.file.open('rb') as source:
+            assert source.read() == payload
+        assert not FileUpload.objects.exists()
+        assert not list((storage / 'parts').iterdir())
+
+    def test_slow_chunk_does_not_block_retry(self, storage):
+        from to_do.uploads import UploadOffsetMismatch, append_chunk
+
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        note = Note.objects.create(user=user, title='Com anexo', content='')
+        payload = b'abcdefgh'
+        upload_id = self.start(client, note, payload).rstrip('/').rsplit('/', 1)[-1]
+
+        class StalledStream:
+            # Enquanto a primeira requisição ainda lê o corpo, o cliente
+            # desiste e reenvia a mesma parte
+            def __init__(self):
+                self.retried = False
+
+            def read(self, size):
+                if not self.retried:
+                    self.retried = True
+                    append_chunk(upload_id, 0, io.BytesIO(payload[:4]), 4)
+                return b'xxxx'
+
+        with pytest.raises(UploadOffsetMismatch) as error:
+            append_chunk(upload_id, 0, StalledStream(), 4)
+        assert error.value.offset == 4
+        assert (storage / 'parts' / f'{upload_id}.part').read_bytes() == payload[:4]
+        assert not list((storage / 'parts').glob('*.chunk'))
+
+    def test_checksum_mismatch_restarts_upload(self):
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        note = Note.objects.create(user=user, title='Com anexo', content='')
+        url = self.start(client, note, b'conteudo', checksum='0' * 64)
+
+        self.send(client, url, 0, b'conteudo')
+        response = client.post(url + 'complete/')
+        assert response.status_code == 400
+        assert 'checksum' in response.data
+        assert client.get(url).data['offset'] == 0
+        assert not File.objects.exists()
+
+    def test_uploads_are_private(self):
+        owner, other = make_user('dono'), make_user('outro')
+        note = Note.objects.create(user=owner, title='Privada', content='')
+        client = APIClient()
+        client.force_authenticate(user=other)
+        response = client.post('/api/file-uploads/', {
+            'note': note.pk, 'filename': 'x.txt', 'size': 1, 'checksum': 'a' * 64
+        }, format='json')
+        assert response.status_code == 400
+
+        client.force_authenticate(user=owner)
+        url = self.start(client, note, b'x')
+        client.force_authenticate(user=other)
+        assert self.send(client, url, 0, b'x').status_code == 404
+
+
+@pytest.mark.django_db
+class TestContentAddressedFiles:
+    @pytest.fixture(autouse=True)
+    def storage(self, settings, tmp_path):
+        settings.MEDIA_ROOT = str(tmp_path / 'media')
+        settings.FILE_UPLOAD_SESSION_DIR = tmp_path / 'parts'
+        return tmp_path / 'media'
+
+    def upload(self, client, note, name, payload):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        response = client.post('/api/files/', {'note': note.pk, 'file': SimpleUploadedFile(name, payload)},
+                               format='multipart')
+        assert response.status_code == 201, response.data
+        return File.objects.get(pk=response.data['id'])
+
+    def test_duplicates_share_one_blob(self, storage, django_capture_on_commit_callbacks):
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        first = Note.objects.create(user=user, title='Um', content='')
+        second = Note.objects.create(user=user, title='Dois', content='')
+
+        a = self.upload(client, first, 'manual.pdf', b'%PDF mesmo conteudo')
+        b = self.upload(client, second, 'copia.pdf', b'%PDF mesmo conteudo')
+        c = self.upload(client, second, 'outro.pdf', b'%PDF outro conteudo')
+        assert a.blob_id == b.blob_id != c.blob_id
+        assert (a.filename, b.filename) == ('manual.pdf', 'copia.pdf')
+        assert a.file.name == b.file.name
+        assert Blob.objects.get(pk=a.blob_id).ref_count == 2
+        assert len([path for path in storage.rglob('*') if path.is_file()]) == 2
+
+        # A cascada da nota só remove o blob que ficou sem referências
+        with django_capture_on_commit_callbacks(execute=True):
+            second.delete()
+        assert list(Blob.objects.values_list('ref_count', flat=True)) == [1]
+        assert [path.name for path in storage.rglob('*') if path.is_file()] == [Blob.objects.get().digest]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            first.delete()
+        assert not Blob.objects.exists()
+        assert not [path for path in storage.rglob('*') if path.is_file()]
+
+    def test_blob_lives_and_dies_with_the_file_transaction(self, storage):
+        from django.core.files.base import ContentFile
+        from django.db import transaction
+        from to_do.blobs import lock_blob, store_blob
+
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        note = Note.objects.create(user=user, title='Um', content='')
+
+        # O File não foi gravado: o blob criado volta atrás junto
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                store_blob(ContentFile(b'sem dono', name='x.bin'))
+                raise RuntimeError
+        assert not Blob.objects.exists()
+
+        # Blob liberado com a exclusão do arquivo ainda pendente: o mesmo
+        # conteúdo volta como outro blob, sem depender do arquivo que vai sumir
+        first = self.upload(client, note, 'a.bin', b'conteudo')
+        released = first.blob
+        first.delete()
+        assert lock_blob(released) is None
+        second = self.upload(client, note, 'b.bin', b'conteudo')
+        assert second.blob.ref_count == 1
+        assert second.file.name != released.file.name
+        with second.file.open('rb') as content:
+            assert content.read() == b'conteudo'
+
+    def test_known_content_skips_chunked_upload(self):
+        import hashlib
+        user, other = make_user(), make_user('outro')
+        note = Note.objects.create(user=user, title='Um', content='')
+        other_note = Note.objects.create(user=other, title='Outra', content='')
+        payload = b'conteudo ja enviado'
+        client = APIClient()
+        client.force_authenticate(user=user)
+        self.upload(client, note, 'a.txt', payload)
+        data = {'note': note.pk, 'filename': 'b.txt', 'size': len(payload),
+                'checksum': hashlib.sha256(payload).hexdigest()}
+
+        response = client.post('/api/file-uploads/', data, format='json')
+        assert response.data['offset'] == len(payload)
+        assert client.post(f'/api/file-uploads/{response.data["id"]}/complete/').status_code == 201
+        assert Blob.objects.get().ref_count == 2
+
+        # Outro usuário precisa enviar os bytes mesmo que o conteúdo exista
+        client.force_authenticate(user=other)
+        response = client.post('/api/file-uploads/', {**data, 'note': other_note.pk}, format='json')
+        assert response.data['offset'] == 0
+
+
+@pytest.mark.django_db
+class TestFileDownload:
+    @pytest.fixture
+    def attachment(self, settings, tmp_path):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        settings.MEDIA_ROOT = str(tmp_path)
+        owner = make_user('dono')
+        note = Note.objects.create(user=owner, title='Com anexo', content='')
+        client = APIClient()
+        client.force_authenticate(user=owner)
+        payload = bytes(range(256)) * 4
+        response = client.post('/api/files/', {'note': note.pk, 'file': SimpleUploadedFile('dados.bin', payload)},
+                               format='multipart')
+        return client, File.objects.get(pk=response.data['id']), payload
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_and_ranged_downloads(self, attachment):
+        client, instance, payload = attachment
+        url = f'/api/files/{instance.pk}/download/'
+
+        response = client.get(url, HTTP_ACCEPT='application/octet-stream')
+        assert response.status_code == 200
+        assert self.body(response) == payload
+        assert response['Content-Length'] == str(len(payload))
+        assert response['ETag'] == f'"{instance.blob.digest}"'
+        assert 'dados.bin' in response['Content-Disposition']
+
+        response = client.get(url, HTTP_RANGE='bytes=10-19')
+        assert response.status_code == 206
+        assert response['Content-Range'] == f'bytes 10-19/{len(payload)}'
+        assert self.body(response) == payload[10:20]
+        assert self.body(client.get(url, HTTP_RANGE='bytes=-5')) == payload[-5:]
+        assert client.get(url, HTTP_RANGE='bytes=5000-').status_code == 416
+
+        # If-Range com outro ETag: o arquivo mudou, vai inteiro
+        response = client.get(url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"outro"')
+        assert response.status_code == 200
+        assert client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+
+    def test_download_authorization(self, attachment, settings):
+        client, instance, payload = attachment
+        url = f'/api/files/{instance.pk}/download/'
+        friend, stranger = make_user('amigo'), make_user('estranho')
+        Sharing.objects.create(note=instance.note, shared_with=friend)
+
+        client.force_authenticate(user=stranger)
+        response = client.get(url, HTTP_ACCEPT='application/octet-stream')
+        assert response.status_code == 404
+        assert response['Content-Type'] == 'application/json'
+        assert set(json.loads(response.content)) == {'detail'}
+        client.force_authenticate(user=None)
+        response = client.get(url)
+        assert response.status_code == 401
+        assert 'detail' in json.loads(response.content)
+        client.force_authenticate(user=friend)
+        assert self.body(client.get(url)) == payload
+
+        settings.FILE_DOWNLOAD_BACKEND = 'x-accel-redirect'
+        response = client.get(url)
+        assert response['X-Accel-Redirect'] == f'/protected-media/{instance.file.name}'
+        assert not response.content
+
+
+@pytest.mark.django_db
+class TestNoteAccessIndex:
+    def listing(self, client):
+        response = client.get('/api/notes/accessible/')
+        assert response.status_code == 200
+        return {item['title']: (item['is_owner'], item['can_edit']) for item in response.data['results']}
+
+    def test_owned_and_shared_notes_in_one_listing(self):
+        from to_do.access import rebuild_access
+        from to_do.models import NoteAccess
+
+        user, friend = make_user(), make_user('amigo')
+        client = APIClient()
+        client.force_authenticate(user=user)
+        Note.objects.create(user=user, title='Minha', content='')
+        first = Note.objects.create(user=friend, title='Leitura', content='')
+        second = Note.objects.create(user=friend, title='Edição', content='')
+        Note.objects.create(user=friend, title='Privada', content='')
+        Sharing.objects.create(note=first, shared_with=user)
+        sharing = Sharing.objects.create(note=second, shared_with=user, can_edit=True)
+        response = client.post('/api/notes/bulk/', [{'title': 'Em lote', 'content': 'x'}], format='json')
+        assert response.status_code == 200
+
+        assert self.listing(client) == {
+            'Minha': (True, True), 'Em lote': (True, True),
+            'Leitura': (False, False), 'Edição': (False, True),
+        }
+        titles = [item['title'] for item in client.get('/api/notes/accessible/').data['results']]
+        assert titles == ['Em lote', 'Edição', 'Leitura', 'Minha']
+
+        sharing.can_edit = False
+        sharing.save()
+        assert self.listing(client)['Edição'] == (False, False)
+        sharing.delete()
+        assert 'Edição' not in self.listing(client)
+
+        entries = set(NoteAccess.objects.values_list('user_id', 'note_id', 'is_owner', 'can_edit'))
+        assert rebuild_access() == len(entries)
+        assert set(NoteAccess.objects.values_list('user_id', 'note_id', 'is_owner', 'can_edit')) == entries
+
+    def test_listing_query_count_is_constant(self):
+        user, friend = make_user(), make_user('amigo')
+        client = APIClient()
+        client.force_authenticate(user=user)
+        make_notes(user, 3)
+        make_notes(friend, 3, start=3)
+        for note in Note.objects.filter(user=friend):
+            Sharing.objects.create(note=note, shared_with=user)
+        with CaptureQueriesContext(connection) as small:
+            client.get('/api/notes/accessible/')
+
+        make_notes(user, 10, start=10)
+        with CaptureQueriesContext(connection) as large:
+            response = client.get('/api/notes/accessible/')
+        assert len(response.data['results']) == 16
+        assert len(large) == len(small)
+
+
+@pytest.mark.django_db
+class TestNotificationDispatch:
+    @pytest.fixture(autouse=True)
+    def inline(self, monkeypatch):
+        from to_do import notifications
+        monkeypatch.setattr(notifications, '_dispatcher', notifications.InlineDispatcher())
+
+    def test_bulk_share_fans_out_in_one_insert(self, django_capture_on_commit_callbacks):
+        from to_do.counters import unread_count
+        from to_do.models import NoteAccess
+
+        owner = make_user('dono')
+        members = User.objects.bulk_create([
+            User(username=f'membro{i}', email=f'membro{i}@example.com') for i in range(30)
+        ])
+        note = Note.objects.create(user=owner, title='Plano', content='')
+        Sharing.objects.create(note=note, shared_with=members[0])
+        unread_count(members[1].pk)  # contador já existente também é ajustado
+        client = APIClient()
+        client.force_authenticate(user=owner)
+
+        with CaptureQueriesContext(connection) as queries, django_capture_on_commit_callbacks(execute=True):
+            response = client.post('/api/sharings/share/', {
+                'note': note.pk, 'user_ids': [member.pk for member in members] + [owner.pk, 999999]
+            }, format='json')
+        assert response.status_code == 201
+        assert response.data == {'shared': 29, 'already_shared': 1, 'unknown': [999999]}
+        inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "to_do_notification"')]
+        assert len(inserts) == 1
+
+        messages = set(Notification.objects.filter(note=note).values_list('message', flat=True))
+        assert messages == {'dono compartilhou a nota "Plano" com você.'}
+        assert Notification.objects.filter(note=note).count() == 29
+        assert unread_count(members[1].pk) == 1
+        assert NoteAccess.objects.filter(note=note, is_owner=False).count() == 30
+
+    def test_review_notifies_owner_with_rendered_template(self, django_capture_on_commit_callbacks):
+        from to_do.notifications import compile_template
+
+        owner, reviewer = make_user('dono'), make_user('revisor')
+        note = Note.objects.create(user=owner, title='Artigo', content='')
+        NotificationType.objects.create(name='note_reviewed', template='{{ actor }} deu {{ rating }} para {{ note.title }}')
+        compile_template.cache_clear()
+        with django_capture_on_commit_callbacks(execute=True):
+            Review.objects.create(note=note, reviewer=reviewer, rating=4)
+            Review.objects.create(note=note, reviewer=owner, rating=5)
+        assert list(Notification.objects.values_list('user__username', 'message')) == [
+            ('dono', 'revisor deu 4 para Artigo')
+        ]
+        assert compile_template.cache_info().misses == 1
+
+    def test_templates_only_see_whitelisted_fields(self, django_capture_on_commit_callbacks):
+        from to_do.notifications import compile_template
+
+        owner, reviewer = make_user('dono'), make_user('revisor')
+        note = Note.objects.create(user=owner, title='Artigo', content='')
+        NotificationType.objects.create(
+            name='note_reviewed', template='{{ actor }}|{{ actor.email }}|{{ note.user.password }}|{{ note.title }}'
+        )
+        compile_template.cache_clear()
+        with django_capture_on_commit_callbacks(execute=True):
+            Review.objects.create(note=note, reviewer=reviewer, rating=4)
+        assert Notification.objects.get().message == 'revisor|||Artigo'
+
+    def test_only_staff_writes_notification_types(self):
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        payload = {'name': 'note_shared', 'template': '{{ actor }}'}
+        assert client.get('/api/notification-types/').status_code == 200
+        assert client.post('/api/notification-types/', payload, format='json').status_code == 403
+
+        user.is_staff = True
+        user.save()
+        client.force_authenticate(user=user)
+        assert client.post('/api/notification-types/', payload, format='json').status_code == 201
+
+    def test_thread_dispatcher_delivers_off_the_caller_thread(self, monkeypatch):
+        import threading
+        from to_do import notifications
+
+        threads = []
+        monkeypatch.setattr(notifications, 'deliver', lambda event: threads.append(threading.current_thread()))
+        monkeypatch.setattr(notifications.connection, 'close', lambda: None)
+        dispatcher = notifications.ThreadDispatcher()
+        for _ in range(3):
+            dispatcher.submit({'type': 'note_shared'})
+        dispatcher.join()
+        assert len(threads) == 3
+        assert threading.current_thread() not in threads
+
+
+@pytest.mark.django_db
+class TestNotePermissions:
+    @pytest.fixture(autouse=True)
+    def media(self, settings, tmp_path):
+        settings.MEDIA_ROOT = str(tmp_path)
+
+    def attach(self, client, note):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        return client.post('/api/files/', {'note': note.pk, 'file': SimpleUploadedFile('a.txt', b'abc')},
+                           format='multipart')
+
+    def test_creates_require_access_to_the_note(self):
+        owner, friend, stranger = make_user('dono'), make_user('amigo'), make_user('estranho')
+        note = Note.objects.create(user=owner, title='Compartilhada', content='')
+        Sharing.objects.create(note=note, shared_with=friend)
+        client = APIClient()
+
+        client.force_authenticate(user=stranger)
+        assert client.post('/api/note-tags/', {'note': note.pk, 'tag': 'x'}, format='json').status_code == 400
+        assert client.post('/api/sharings/', {'note': note.pk, 'shared_with': stranger.pk},
+                           format='json').status_code == 400
+        assert client.post('/api/reviews/', {'note': note.pk, 'rating': 5}, format='json').status_code == 400
+        assert self.attach(client, note).status_code == 400
+
+        client.force_authenticate(user=friend)
+        response = client.post('/api/reviews/', {'note': note.pk, 'rating': 4}, format='json')
+        assert response.status_code == 201
+        assert Review.objects.get().reviewer == friend
+        # Sem can_edit não anexa; o bulk de tags também respeita o mapa
+        assert self.attach(client, note).status_code == 400
+        response = client.post('/api/note-tags/bulk/', [{'note': note.pk, 'tag': 'x'}], format='json')
+        assert response.data['results'][0]['status'] == 'invalid'
+
+    def test_object_access_uses_cached_map(self):
+        owner, friend, stranger = make_user('dono'), make_user('amigo'), make_user('estranho')
+        note = Note.objects.create(user=owner, title='Compartilhada', content='')
+        client = APIClient()
+        client.force_authenticate(user=owner)
+        url = f'/api/files/{self.attach(client, note).data["id"]}/'
+        sharing = Sharing.objects.create(note=note, shared_with=friend)
+
+        client.force_authenticate(user=stranger)
+        assert client.get(url).status_code == 404
+        client.force_authenticate(user=friend)
+        assert client.get(url).status_code == 200
+        assert client.delete(url).status_code == 403
+
+        with CaptureQueriesContext(connection) as queries:
+            assert client.get(f'{url}download/').status_code == 200
+        assert not [q for q in queries if 'to_do_noteaccess' in q['sql']]
+
+        # A mudança no compartilhamento troca a versão do usuário e o mapa
+        sharing.can_edit = True
+        sharing.save()
+        assert client.delete(url).status_code == 204
+
+
+@pytest.mark.django_db
+class TestStatelessJWT:
+    @pytest.fixture(autouse=True)
+    def login_buffer(self, tmp_path, monkeypatch):
+        from to_do import logins
+
+        monkeypatch.setattr(logins, '_buffer', logins.LoginBuffer(tmp_path, flush_interval=0))
+
+    def obtain(self, username='testuser'):
+        response = APIClient().post('/api/auth/token/', {'username': username, 'password': 'password123'},
+                                    format='json')
+        assert response.status_code == 200
+        return response.data['access']
+
+    def test_claims_authenticate_without_user_query(self):
+        user = make_user()
+        Note.objects.create(user=user, title='Nota', content='...')
+        token = self.obtain()
+        assert AccessToken(token)['username'] == 'testuser'
+        assert 'is_staff' not in AccessToken(token)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        assert client.get('/api/notes/').status_code == 200
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/notes/')
+        assert response.status_code == 200
+        assert response.data[0]['title'] == 'Nota'
+        assert not [q for q in queries if 'FROM "to_do_user"' in q['sql']]
+
+    def test_deactivated_user_is_rejected(self):
+        user = make_user()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.obtain()}')
+        assert client.get('/api/notes/').status_code == 200
+
+        # O post_save do User apaga o estado em cache
+        user.is_active = False
+        user.save()
+        assert client.get('/api/notes/').status_code == 401
+
+    def test_demoted_staff_loses_access_on_refresh(self):
+        user = make_user()
+        user.is_staff = True
+        user.save()
+        other = make_user('outro')
+        LoginHistory.objects.create(user=other, ip_address='127.0.0.1', user_agent='pytest')
+        response = APIClient().post('/api/auth/token/', {'username': 'testuser', 'password': 'password123'},
+                                    format='json')
+        refresh = response.data['refresh']
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+        assert len(client.get('/api/login-histories/').data['results']) == 1
+
+        user.is_staff = False
+        user.save()
+        access = APIClient().post('/api/auth/token/refresh/', {'refresh': refresh}, format='json').data['access']
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        assert client.get('/api/login-histories/').data['results'] == []
+
+    def test_token_without_claims_still_works(self):
+        user = make_user()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        assert client.get('/api/notes/').status_code == 200
+
+
+@pytest.mark.django_db
+class TestLoginHistory:
+    @pytest.fixture
+    def buffer(self, tmp_path, monkeypatch):
+        from to_do import logins
+
+        buffer = logins.LoginBuffer(tmp_path, flush_size=2, flush_interval=0)
+        monkeypatch.setattr(logins, '_buffer', buffer)
+        return buffer
+
+    def login(self, client, password='password123'):
+        return client.post('/api/auth/token/', {'username': 'testuser', 'password': password},
+                           format='json', HTTP_USER_AGENT='pytest/1.0', REMOTE_ADDR='10.0.0.7')
+
+    def test_token_issue_is_recorded_in_batches(self, buffer, tmp_path):
+        user = make_user()
+        client = APIClient()
+
+        with CaptureQueriesContext(connection) as queries:
+            assert self.login(client).status_code == 200
+        assert not [q for q in queries if 'to_do_loginhistory' in q['sql']]
+        assert not LoginHistory.objects.exists()
+        assert len(list(tmp_path.glob('logins-*.jsonl'))) == 1
+
+        # Senha errada não gera registro; o segundo login completa o lote
+        assert self.login(client, 'errada').status_code == 401
+        assert self.login(client).status_code == 200
+        assert LoginHistory.objects.filter(user=user).count() == 2
+        login = LoginHistory.objects.first()
+        assert (login.ip_address, login.user_agent) == ('10.0.0.7', 'pytest/1.0')
+        assert not list(tmp_path.glob('logins-*.jsonl'))
+
+    def test_recent_returns_last_logins(self, buffer):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        user = make_user()
+        other = make_user('outro')
+        now = timezone.now()
+        for i in range(5):
+            buffer.append(user.pk, '127.0.0.1', f'agente {i}', timestamp=now - timedelta(minutes=i))
+        buffer.append(other.pk, '127.0.0.1', 'outro')
+        buffer.flush()
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        response = client.get('/api/login-histories/recent/', {'limit': 3})
+        assert response.status_code == 200
+        assert [login['user_agent'] for login in response.data] == ['agente 0', 'agente 1', 'agente 2']
+        assert set(response.data[0]) == {'timestamp', 'ip_address', 'user_agent'}
+        assert client.get('/api/login-histories/recent/', {'limit': 'x'}).status_code == 400
+
+    def test_recover_replays_spool_of_dead_process(self, tmp_path):
+        from to_do.logins import LoginBuffer
+
+        user = make_user()
+        event = {'user_id': user.pk, 'ip_address': '::1', 'user_agent': 'curl',
+                 'timestamp': '2025-01-02T03:04:05+00:00'}
+        (tmp_path / 'logins-999999999-0.jsonl').write_text(json.dumps(event) + '\n')
+
+        assert LoginBuffer(tmp_path).recover() == 1
+        assert LoginHistory.objects.get(user=user).timestamp.year == 2025
+
+    def test_orphan_with_current_pid_is_not_lost(self, tmp_path):
+        import os
+        from to_do.logins import LoginBuffer
+
+        user = make_user()
+        event = {'user_id': user.pk, 'ip_address': '::1', 'user_agent': 'antes da queda',
+                 'timestamp': '2025-01-02T03:04:05+00:00'}
+        # Segmento deixado por um processo anterior que tinha o mesmo PID
+        orphan = tmp_path / f'logins-{os.getpid()}-0.jsonl'
+        orphan.write_text(json.dumps(event) + '\n')
+
+        buffer = LoginBuffer(tmp_path, flush_interval=0)
+        buffer.append(user.pk, '127.0.0.1', 'depois do restart')
+        assert buffer.flush() == 1
+        assert orphan.exists()
+
+        assert buffer.recover() == 1
+        assert set(LoginHistory.objects.values_list('user_agent', flat=True)) == {
+            'antes da queda', 'depois do restart'
+        }
+        assert not list(tmp_path.glob('*.jsonl'))
@@ -0,0 +1,177 @@
+import hashlib
+import os
+import shutil
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File as DjangoFile
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .blobs import attach_blob, lock_blob, owned_blob, store_blob
+from .models import File, FileUpload
+
+# ---------------- Chunked Uploads ----------------
+# O cliente abre um envio (tamanho e SHA-256 do arquivo inteiro) e manda os
+# bytes em partes, cada uma com o offset em que começa. Cada parte é lida
+# para um arquivo temporário, em blocos de READ_SIZE e sem transação aberta,
+# e depois acrescentada ao arquivo parcial sob uma trava curta na linha do
+# envio. Se a conexão cair, o cliente consulta o offset
+# salvo e continua dali. Na conclusão o checksum é conferido lendo o arquivo
+# parcial, que então vira um blob (blobs.py) e um File. Conteúdo que o
+# usuário já anexou antes não precisa ser enviado de novo.
+READ_SIZE = 64 * 1024
+
+
+class UploadOffsetMismatch(Exception):
+    def __init__(self, offset):
+        super().__init__(f'Offset esperado: {offset}')
+        self.offset = offset
+
+
+def upload_dir():
+    return Path(getattr(settings, 'FILE_UPLOAD_SESSION_DIR', settings.BASE_DIR / 'var' / 'uploads'))
+
+
+def part_path(upload):
+    return upload_dir() / f'{upload.pk}.part'
+
+
+def open_part(upload):
+    path = part_path(upload)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return open(path, 'a+b')
+
+
+def known_content(upload):
+    blob = owned_blob(upload.user_id, upload.checksum)
+    return blob if blob is not None and blob.size == upload.size else None
+
+
+def skip_known_content(upload):
+    # Conteúdo que o usuário já anexou antes: não há bytes a enviar, o
+    # envio já nasce completo
+    if known_content(upload) is not None:
+        upload.offset = upload.size
+        upload.save(update_fields=['offset', 'updated_at'])
+    return upload
+
+
+def chunk_path(upload):
+    # Cada requisição recebe a parte num arquivo próprio
+    return upload_dir() / f'{upload.pk}-{uuid.uuid4().hex}.chunk'
+
+
+def receive_chunk(path, stream, length):
+    # Lê o corpo da requisição para o arquivo temporário; devolve quantos
+    # bytes chegaram (menos que length se a conexão cair)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    received = 0
+    with open(path, 'xb') as chunk:
+        while received < length:
+            data = stream.read(min(READ_SIZE, length - received))
+            if not data:
+                break
+            chunk.write(data)
+            received += len(data)
+        chunk.flush()
+        os.fsync(chunk.fileno())
+    return received
+
+
+def append_chunk(upload_id, offset, stream, length):
+    upload = FileUpload.objects.get(pk=upload_id)
+    if offset != upload.offset:
+        raise UploadOffsetMismatch(upload.offset)
+    if upload.offset + length > upload.size:
+        raise ValidationError({'error': 'A parte ultrapassa o tamanho declarado do arquivo.'})
+
+    # O corpo chega do cliente fora da transação: num link lento ou parado a
+    # trava da linha não fica presa, e a nova tentativa do cliente recebe o
+    # 409 com o offset em vez de esperar
+    path = chunk_path(upload)
+    try:
+        received = receive_chunk(path, stream, length)
+        with transaction.atomic():
+            # A trava só cobre a cópia local para o arquivo parcial
+            upload = FileUpload.objects.select_for_update().get(pk=upload_id)
+            if offset != upload.offset:
+                raise UploadOffsetMismatch(upload.offset)
+            with open_part(upload) as part, open(path, 'rb') as chunk:
+                # Descarta bytes de uma escrita anterior que não chegou a ser confirmada
+                part.truncate(upload.offset)
+                shutil.copyfileobj(chunk, part, READ_SIZE)
+                part.flush()
+                os.fsync(part.fileno())
+            # Conexão interrompida: o que chegou fica valendo e o cliente retoma
+            upload.offset += received
+            upload.save(update_fields=['offset', 'updated_at'])
+    finally:
+        remove_part(path)
+    return upload
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(READ_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def complete_upload(upload_id):
+    with transaction.atomic():
+        upload = FileUpload.objects.select_for_update().get(pk=upload_id)
+        if upload.offset != upload.size:
+            raise ValidationError({'error': f'Envio incompleto: {upload.offset} de {upload.size} bytes.'})
+
+        # Travado até o File ser gravado, para um release_blob não removê-lo antes
+        blob = lock_blob(known_content(upload))
+        if blob is None:
+            # Arquivo vazio: nenhuma parte chegou a criar o arquivo parcial
+            open_part(upload).close()
+            path = part_path(upload)
+            if file_checksum(path) == upload.checksum:
+                with open(path, 'rb') as source:
+                    # O storage copia o arquivo em blocos (File.chunks)
+                    blob = store_blob(DjangoFile(source), digest=upload.checksum)
+            else:
+                # O conteúdo não confere; o envio recomeça do zero
+                os.truncate(path, 0)
+                upload.offset = 0
+                upload.save(update_fields=['offset', 'updated_at'])
+
+        instance = None
+        if blob is not None:
+            instance = attach_blob(File(note=upload.note), blob, upload.filename)
+            instance.save()
+            upload.delete()
+    # Fora da transação, para que o offset zerado seja gravado
+    if instance is None:
+        raise ValidationError({'checksum': 'O SHA-256 do arquivo recebido não confere.'})
+    return instance
+
+
+def remove_part(path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def expire_uploads(max_age=timedelta(days=1)):
+    # Envios parados há mais de max_age; o arquivo parcial sai no post_delete
+    cutoff = timezone.now() - max_age
+    stale = FileUpload.objects.filter(updated_at__lt=cutoff)
+    count = 0
+    for upload in stale.iterator():
+        upload.delete()
+        count += 1
+    # Partes de requisições interrompidas por uma queda do processo
+    for path in upload_dir().glob('*.chunk'):
+        if path.stat().st_mtime < cutoff.timestamp():
+            remove_part(path)
+    return count
@@ -10,7 +10,11 @@ from .views import (
     CategoryViewSet, SubjectViewSet, FileViewSet, SharingViewSet, NotificationViewSet,
     NotificationTypeViewSet, ReviewViewSet, NoteAnalysisViewSet, NoteSuggestionsViewSet,
     ChatInteractionViewSet, NoteRecommendationViewSet, SearchLogViewSet, NoteTagsViewSet,
-    NoteEntitiesViewSet, UserInteractionViewSet, NoteHistoryViewSet
+    NoteEntitiesViewSet, UserInteractionViewSet, NoteHistoryViewSet, SyncViewSet,
+    SearchAnalyticsViewSet, FileUploadViewSet
+)
+from .async_views import (
+    AsyncNoteView, AsyncNotificationView, AsyncNoteRecommendationView, NotificationStreamView
 )
 
 # Configuração do roteador padrão
@@ -23,6 +27,7 @@ router.register(r'notes', NoteViewSet)
 router.register(r'categories', CategoryViewSet)
 router.register(r'subjects', SubjectViewSet)
 router.register(r'files', FileViewSet)
+router.register(r'file-uploads', FileUploadViewSet)
 router.register(r'sharings', SharingViewSet)
 router.register(r'notifications', NotificationViewSet)
 router.register(r'notification-types', NotificationTypeViewSet)
@@ -34,16 +39,30 @@ router.register(r'note-suggestions', NoteSuggestionsViewSet)
 router.register(r'chat-interactions', ChatInteractionViewSet)
 router.register(r'note-recommendations', NoteRecommendationViewSet)
 router.register(r'search-logs', SearchLogViewSet)
+router.register(r'search-analytics', SearchAnalyticsViewSet, basename='search-analytics')
 router.register(r'note-tags', NoteTagsViewSet)
 router.register(r'note-entities', NoteEntitiesViewSet)
 router.register(r'user-interactions', UserInteractionViewSet)
 router.register(r'note-history', NoteHistoryViewSet)
+router.register(r'sync', SyncViewSet, basename='sync')
 
 # Configuração de URLs
 urlpatterns = [
+    # Stream SSE de notificações (antes do roteador, que trataria "stream" como id)
+    path('notifications/stream/', NotificationStreamView.as_view(), name='notification-stream'),
+
     # Endpoints da API REST registrados no roteador
     path('', include(router.urls)),
 
+    # Leitura assíncrona (ASGI) dos endpoints mais acessados
+    path('async/notes/', AsyncNoteView.as_view(), name='async-note-list'),
+    path('async/notes/<int:pk>/', AsyncNoteView.as_view(), name='async-note-detail'),
+    path('async/notifications/', AsyncNotificationView.as_view(), name='async-notification-list'),
+    path('async/notifications/<int:pk>/', AsyncNotificationView.as_view(), name='async-notification-detail'),
+    path('async/note-recommendations/', AsyncNoteRecommendationView.as_view(), name='async-recommendation-list'),
+    path('async/note-recommendations/<int:pk>/', AsyncNoteRecommendationView.as_view(),
+         name='async-recommendation-detail'),
+
     # Endpoints de autenticação com JWT
     path('auth/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
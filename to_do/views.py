@@ -1,14 +1,21 @@
+import uuid
+from datetime import timedelta
 from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from rest_framework.exceptions import ValidationError
-from django.db import IntegrityError
-from django.db.models import ProtectedError
+from rest_framework.exceptions import APIException, ValidationError
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.db.models import ProtectedError, Q, Sum
 from .models import (
     User, LoginHistory, Address, Contact, Note, Category, Subject, File,
     Sharing, Notification, NotificationType, Review,
     NoteAnalysis, NoteSuggestion, ChatInteraction, NoteRecommendation, SearchLog,
-    NoteTag, NoteEntity, UserInteraction, NoteHistory
+    NoteTag, NoteEntity, UserInteraction, NoteHistory, SearchRollup, FileUpload
 )
 from .serializers import (
     UserSerializer, LoginHistorySerializer, AddressSerializer, ContactSerializer,
@@ -16,7 +23,28 @@ from .serializers import (
     SharingSerializer, NotificationSerializer, NotificationTypeSerializer, ReviewSerializer,
     NoteAnalysisSerializer, NoteSuggestionSerializer, ChatInteractionSerializer,
     NoteRecommendationSerializer, SearchLogSerializer, NoteTagSerializer,
-    NoteEntitySerializer, UserInteractionSerializer, NoteHistorySerializer
+    NoteEntitySerializer, UserInteractionSerializer, NoteHistorySerializer,
+    NoteSearchResultSerializer, BulkNoteSerializer, BulkNoteTagSerializer, BulkNoteEntitySerializer,
+    InteractionEventSerializer, FileUploadSerializer, AccessibleNoteSerializer, BulkShareSerializer
+)
+from .query_planner import optimize_queryset
+from .search import FullTextSearchFilter, search_notes
+from .autocomplete import autocomplete
+from .sync import stream_changes
+from .cache import cached_data, etag_matches, invalidate_users, response_etag, store_data
+from .counters import mark_all_read, unread_count
+from .ingest import get_buffer
+from .logins import RECENT_LOGINS_DEFAULT, recent_logins
+from .notifications import notify
+from .partitions import TimeRangeFilter
+from .permissions import EDIT, READ, IsAdminOrReadOnly, NotePermissionMixin, note_access
+from .downloads import PassthroughRenderer, serve_file
+from .uploads import UploadOffsetMismatch, append_chunk, complete_upload, skip_known_content
+from .access import accessible_notes, grant_owner_access, grant_shared_access
+from .history import capture_edit, materialize, version_content, version_diff
+from .pagination import (
+    NoteKeysetPagination, AccessibleNoteKeysetPagination, NotificationKeysetPagination, InteractionKeysetPagination,
+    LoginHistoryKeysetPagination, SearchLogKeysetPagination
 )
 
 # ---------------- Exception Handling ----------------
@@ -28,6 +56,11 @@ def handle_exception(exception):
     if isinstance(exception, ProtectedError):
         return Response({'error': 'Não é possível excluir o objeto pois possui referências em outras entidades'},
                         status=status.HTTP_400_BAD_REQUEST)
+    # Permissões por objeto (permissions.py) e objetos inexistentes
+    if isinstance(exception, Http404):
+        return Response({'detail': 'Não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+    if isinstance(exception, APIException):
+        return Response({'detail': exception.detail}, status=exception.status_code)
     return Response({'error': 'Erro interno do servidor'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # ---------------- Base ViewSet ----------------
@@ -35,21 +68,52 @@ class BaseViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.OrderingFilter, filters.SearchFilter]
 
+    def filter_queryset(self, queryset):
+        # Carrega de uma vez as relações que o serializer vai renderizar
+        queryset = super().filter_queryset(queryset)
+        return optimize_queryset(queryset, self.get_serializer_class())
+
     def create(self, request, *args, **kwargs):
         try:
             return super().create(request, *args, **kwargs)
         except Exception as e:
             return handle_exception(e)
 
+    def use_response_cache(self, request):
+        # Desligado onde a resposta depende de dados que as versões do
+        # usuário e a global não cobrem
+        return True
+
+    def cached_response(self, request, build):
+        # GET condicional: o ETag sai das versões em cache, sem consultar o banco
+        if not self.use_response_cache(request):
+            return build()
+        etag = response_etag(request)
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        data = cached_data(etag)
+        if data is None:
+            response = build()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            store_data(etag, response.data)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        return response
+
     def list(self, request, *args, **kwargs):
         try:
-            return super().list(request, *args, **kwargs)
+            build = super().list
+            return self.cached_response(request, lambda: build(request, *args, **kwargs))
         except Exception as e:
             return handle_exception(e)
 
     def retrieve(self, request, *args, **kwargs):
         try:
-            return super().retrieve(request, *args, **kwargs)
+            build = super().retrieve
+            return self.cached_response(request, lambda: build(request, *args, **kwargs))
         except Exception as e:
             return handle_exception(e)
 
@@ -71,6 +135,95 @@ class BaseViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return handle_exception(e)
 
+# ---------------- Bulk Operations ----------------
+def bulk_result(index, result_status, pk=None, errors=None):
+    result = {'index': index, 'status': result_status}
+    if pk is not None:
+        result['id'] = pk
+    if errors:
+        result['errors'] = errors
+    return result
+
+class BulkMixin:
+    # POST cria, PATCH atualiza (cada item com "id") e DELETE remove
+    # ({"ids": [...]}). A resposta traz um resultado por item, na ordem enviada.
+    # As subclasses implementam bulk_create_items e bulk_update_items.
+    bulk_serializer_class = None
+    bulk_max_items = 10000
+    bulk_batch_size = 1000
+
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def bulk(self, request):
+        try:
+            if request.method == 'DELETE':
+                results = self.bulk_destroy(self.get_bulk_ids(request))
+            else:
+                partial = request.method == 'PATCH'
+                items, results = self.validate_bulk(self.get_bulk_items(request), partial)
+                with transaction.atomic():
+                    if partial:
+                        self.bulk_update_items(items, results)
+                    else:
+                        self.bulk_create_items(items, results)
+            # bulk_create/bulk_update não disparam sinais
+            invalidate_users([request.user.pk])
+            return Response({'results': results})
+        except Exception as e:
+            return handle_exception(e)
+
+    def get_bulk_items(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'error': 'Envie uma lista de itens.'})
+        if len(items) > self.bulk_max_items:
+            raise ValidationError({'error': f'Máximo de {self.bulk_max_items} itens por requisição.'})
+        return items
+
+    def get_bulk_ids(self, request):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not ids:
+            raise ValidationError({'ids': 'Envie a lista de ids a remover.'})
+        if len(ids) > self.bulk_max_items:
+            raise ValidationError({'error': f'Máximo de {self.bulk_max_items} itens por requisição.'})
+        if not all(isinstance(pk, int) for pk in ids):
+            raise ValidationError({'ids': 'Os ids devem ser números inteiros.'})
+        return ids
+
+    def validate_bulk(self, items, partial):
+        # Uma única instância do serializer: os campos são montados uma vez só
+        serializer = self.bulk_serializer_class(partial=partial)
+        valid, results = [], [None] * len(items)
+        for index, item in enumerate(items):
+            try:
+                data = serializer.run_validation(item)
+            except ValidationError as e:
+                results[index] = bulk_result(index, 'invalid', errors=e.detail)
+                continue
+            if partial and 'id' not in data:
+                results[index] = bulk_result(index, 'invalid', errors={'id': ['Campo obrigatório.']})
+            else:
+                valid.append((index, data))
+        return valid, results
+
+    def owned_in_bulk(self, items):
+        ids = [data['id'] for _, data in items]
+        return self.get_queryset().in_bulk(ids)
+
+    def owned_note_ids(self, items):
+        note_ids = {data['note'] for _, data in items if 'note' in data}
+        return set(
+            Note.objects.filter(user=self.request.user, pk__in=note_ids).values_list('pk', flat=True)
+        )
+
+    def bulk_destroy(self, ids):
+        queryset = self.get_queryset().filter(pk__in=ids)
+        owned = set(queryset.values_list('pk', flat=True))
+        queryset.delete()
+        return [
+            bulk_result(index, 'deleted' if pk in owned else 'not_found', pk=pk)
+            for index, pk in enumerate(ids)
+        ]
+
 # ---------------- ViewSets ----------------
 class UserViewSet(BaseViewSet):
     queryset = User.objects.all()
@@ -80,12 +233,30 @@ class UserViewSet(BaseViewSet):
 class LoginHistoryViewSet(BaseViewSet):
     queryset = LoginHistory.objects.all()
     serializer_class = LoginHistorySerializer
+    pagination_class = LoginHistoryKeysetPagination
+    filter_backends = BaseViewSet.filter_backends + [TimeRangeFilter]
+    time_field = 'timestamp'
 
     def get_queryset(self):
         if not self.request.user.is_staff:
             return self.queryset.filter(user=self.request.user)
         return self.queryset
 
+    def use_response_cache(self, request):
+        # A equipe vê os logins de todos, que a versão dela não acompanha
+        return not request.user.is_staff
+
+    @action(detail=False, methods=['get'])
+    def recent(self, request):
+        # GET /api/login-histories/recent/?limit=<n>: últimos logins do usuário
+        try:
+            limit = request.query_params.get('limit', str(RECENT_LOGINS_DEFAULT))
+            if not limit.isdigit():
+                raise ValidationError({'limit': 'Informe um número inteiro.'})
+            return Response(recent_logins(request.user.pk, int(limit)))
+        except Exception as e:
+            return handle_exception(e)
+
 class AddressViewSet(BaseViewSet):
     queryset = Address.objects.all()
     serializer_class = AddressSerializer
@@ -100,14 +271,205 @@ class ContactViewSet(BaseViewSet):
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user)
 
-class NoteViewSet(BaseViewSet):
+class NoteViewSet(BulkMixin, BaseViewSet):
     queryset = Note.objects.all()
     serializer_class = NoteSerializer
-    search_fields = ['title', 'content']
+    pagination_class = NoteKeysetPagination
+    bulk_serializer_class = BulkNoteSerializer
+    filter_backends = [filters.OrderingFilter, FullTextSearchFilter]
+    search_max_limit = 100
 
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user)
 
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def bulk_create_items(self, items, results):
+        # ?on_conflict=update faz upsert pelo título (unique_user_note_title)
+        upsert = self.request.query_params.get('on_conflict') == 'update'
+        user = self.request.user
+
+        category_ids = {pk for _, data in items for pk in data.get('category_ids', [])}
+        subject_ids = {pk for _, data in items for pk in data.get('subject_ids', [])}
+        known_categories = set(Category.objects.filter(pk__in=category_ids).values_list('pk', flat=True))
+        known_subjects = set(Subject.objects.filter(pk__in=subject_ids).values_list('pk', flat=True))
+        existing = dict(
+            Note.objects.filter(user=user, title__in=[data['title'] for _, data in items])
+            .values_list('title', 'pk')
+        )
+        # Conteúdo atual das notas que o upsert vai sobrescrever, para o histórico
+        previous = dict(
+            Note.objects.filter(pk__in=existing.values()).values_list('pk', 'content')
+        ) if upsert and existing else {}
+
+        accepted, seen = [], set()
+        for index, data in items:
+            title = data['title']
+            unknown = {
+                'category_ids': sorted(set(data.get('category_ids', [])) - known_categories),
+                'subject_ids': sorted(set(data.get('subject_ids', [])) - known_subjects),
+            }
+            unknown = {field: [f'Ids inexistentes: {ids}'] for field, ids in unknown.items() if ids}
+            if unknown:
+                results[index] = bulk_result(index, 'invalid', errors=unknown)
+            elif title in seen or (title in existing and not upsert):
+                results[index] = bulk_result(index, 'conflict', pk=existing.get(title))
+            else:
+                seen.add(title)
+                accepted.append((index, data))
+
+        notes = [
+            Note(user=user, title=data['title'], content=data['content'],
+                 completed=data.get('completed', False))
+            for _, data in accepted
+        ]
+        if upsert:
+            Note.objects.bulk_create(
+                notes, batch_size=self.bulk_batch_size, update_conflicts=True,
+                unique_fields=['user', 'title'], update_fields=['content', 'completed', 'updated_at']
+            )
+        else:
+            Note.objects.bulk_create(notes, batch_size=self.bulk_batch_size)
+        grant_owner_access(notes, self.bulk_batch_size)
+
+        category_links, subject_links, tags = [], [], []
+        for (index, data), note in zip(accepted, notes):
+            results[index] = bulk_result(index, 'updated' if data['title'] in existing else 'created', pk=note.pk)
+            category_links += [Note.categories.through(note_id=note.pk, category_id=pk)
+                               for pk in set(data.get('category_ids', []))]
+            subject_links += [Note.subjects.through(note_id=note.pk, subject_id=pk)
+                              for pk in set(data.get('subject_ids', []))]
+            tags += [NoteTag(note_id=note.pk, tag=tag) for tag in set(data.get('tags', []))]
+
+        Note.categories.through.objects.bulk_create(category_links, batch_size=self.bulk_batch_size, ignore_conflicts=True)
+        Note.subjects.through.objects.bulk_create(subject_links, batch_size=self.bulk_batch_size, ignore_conflicts=True)
+        NoteTag.objects.bulk_create(tags, batch_size=self.bulk_batch_size, ignore_conflicts=True)
+
+        # O upsert também é edição: registra o histórico como bulk_update_items
+        for _, data in accepted:
+            pk = existing.get(data['title'])
+            if pk in previous:
+                capture_edit(Note(pk=pk), previous[pk], data['content'], edited_by=user)
+
+    def bulk_update_items(self, items, results):
+        notes = self.owned_in_bulk(items)
+        renames = {
+            index: data['title'] for index, data in items
+            if data['id'] in notes and data.get('title', notes[data['id']].title) != notes[data['id']].title
+        }
+        holders = dict(
+            self.get_queryset().filter(title__in=renames.values()).values_list('title', 'pk')
+        )
+        ids = dict(items)
+        # Um título só fica livre se a nota que o usa também for renomeada; a
+        # rejeição de uma renomeação pode prender o título de outra, então
+        # repete até estabilizar (troca A <-> B e cadeias A -> B -> C passam)
+        rejected = set()
+        while True:
+            moving = {ids[index]['id'] for index in renames if index not in rejected}
+            claimed, conflicts = set(), set()
+            for index, title in renames.items():
+                if index in rejected:
+                    continue
+                holder = holders.get(title)
+                if title in claimed or (holder is not None and holder not in moving):
+                    conflicts.add(index)
+                else:
+                    claimed.add(title)
+            if not conflicts:
+                break
+            rejected |= conflicts
+
+        changed, fields = [], set()
+        now = timezone.now()
+        for index, data in items:
+            note = notes.get(data['id'])
+            if note is None:
+                results[index] = bulk_result(index, 'not_found', pk=data['id'])
+                continue
+            if index in rejected:
+                results[index] = bulk_result(index, 'conflict', pk=note.pk)
+                continue
+            for field in ('title', 'content', 'completed'):
+                if field in data:
+                    setattr(note, field, data[field])
+                    fields.add(field)
+            note.updated_at = now
+            changed.append(note)
+            results[index] = bulk_result(index, 'updated', pk=note.pk)
+
+        # A unicidade (user, title) é verificada linha a linha: quem cede o
+        # título para outra nota do lote passa antes por um título provisório
+        vacating = [
+            Note(pk=holders[title], title=uuid.uuid4().hex)
+            for title in claimed if holders.get(title) in moving
+        ]
+        Note.objects.bulk_update(vacating, ['title'], batch_size=self.bulk_batch_size)
+        if changed:
+            Note.objects.bulk_update(changed, sorted(fields | {'updated_at'}), batch_size=self.bulk_batch_size)
+            # bulk_update não dispara post_save; o histórico é registrado aqui
+            for note in changed:
+                previous, note._loaded_content = note._loaded_content, note.content
+                capture_edit(note, previous, note.content, edited_by=self.request.user)
+
+    def get_search_window(self, request):
+        try:
+            limit = int(request.query_params.get('limit', 20))
+            offset = int(request.query_params.get('offset', 0))
+        except ValueError:
+            raise ValidationError({'error': 'limit e offset devem ser números inteiros.'})
+        if limit < 1 or offset < 0:
+            raise ValidationError({'error': 'limit deve ser positivo e offset não pode ser negativo.'})
+        return min(limit, self.search_max_limit), offset
+
+    @action(detail=False, methods=['get'], serializer_class=NoteSearchResultSerializer)
+    def search(self, request):
+        try:
+            text = request.query_params.get('q', '').strip()
+            if not text:
+                raise ValidationError({'q': 'Informe o termo de busca.'})
+            limit, offset = self.get_search_window(request)
+
+            queryset = optimize_queryset(search_notes(self.get_queryset(), text), self.get_serializer_class())
+            results = list(queryset[offset:offset + limit])
+            # O total vem da window function da própria página
+            if results:
+                total = results[0].total
+            else:
+                total = queryset.count() if offset else 0
+
+            if offset == 0:
+                SearchLog.objects.create(user=request.user, query=text[:255], results_count=total)
+
+            serializer = self.get_serializer(results, many=True)
+            return Response({'count': total, 'results': serializer.data})
+        except Exception as e:
+            return handle_exception(e)
+
+    @action(detail=False, methods=['get'], serializer_class=AccessibleNoteSerializer,
+            pagination_class=AccessibleNoteKeysetPagination)
+    def accessible(self, request):
+        # Próprias e compartilhadas, do índice NoteAccess. Sem cache de
+        # resposta: a edição do dono não invalida a versão de quem recebeu.
+        try:
+            queryset = optimize_queryset(accessible_notes(request.user), self.get_serializer_class())
+            page = self.paginate_queryset(queryset)
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        except Exception as e:
+            return handle_exception(e)
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        try:
+            text = request.query_params.get('q', '').strip()
+            if not text:
+                raise ValidationError({'q': 'Informe o termo de busca.'})
+            limit, _ = self.get_search_window(request)
+            return Response(autocomplete(request.user, text, min(limit, 20)))
+        except Exception as e:
+            return handle_exception(e)
+
 class CategoryViewSet(BaseViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -116,23 +478,136 @@ class SubjectViewSet(BaseViewSet):
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
 
-class FileViewSet(BaseViewSet):
+class FileViewSet(NotePermissionMixin, BaseViewSet):
     queryset = File.objects.all()
     serializer_class = FileSerializer
+    # Quem recebeu a nota com edição também anexa e remove arquivos
+    note_write_level = EDIT
 
     def get_queryset(self):
+        if self.detail:
+            # Autorização pela nota do objeto (NotePermission); quem recebeu
+            # a nota compartilhada também lê e baixa os anexos
+            return self.queryset.select_related('blob')
         return self.queryset.filter(note__user=self.request.user)
 
-class SharingViewSet(BaseViewSet):
+    @action(detail=True, methods=['get'], renderer_classes=[PassthroughRenderer])
+    def download(self, request, pk=None):
+        # Range, ETag e sendfile/X-Accel-Redirect ficam em downloads.py
+        return serve_file(request, self.get_object())
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.action == 'download' and isinstance(response, Response):
+            # O arquivo sai como HttpResponse; um Response aqui é erro (401,
+            # 403, 404) e vai em JSON, como no resto da API
+            response.accepted_renderer = JSONRenderer()
+            response.accepted_media_type = JSONRenderer.media_type
+        return response
+
+class FileUploadViewSet(BaseViewSet):
+    # Envio em partes (uploads.py): POST abre o envio, PATCH com o corpo
+    # binário e o cabeçalho Upload-Offset grava uma parte, GET/HEAD devolve
+    # o offset para retomar e POST complete/ confere o checksum e cria o File
+    queryset = FileUpload.objects.all()
+    serializer_class = FileUploadSerializer
+    http_method_names = ['get', 'post', 'patch', 'delete', 'head', 'options']
+
+    def get_queryset(self):
+        return self.queryset.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        skip_known_content(serializer.save(user=self.request.user))
+
+    def offset_response(self, upload, response_status=status.HTTP_200_OK):
+        return Response(
+            self.get_serializer(upload).data, status=response_status,
+            headers={'Upload-Offset': str(upload.offset)}
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        # Sem cache: o offset muda a cada parte recebida
+        return self.offset_response(self.get_object())
+
+    def partial_update(self, request, *args, **kwargs):
+        upload = self.get_object()
+        try:
+            offset = request.headers.get('Upload-Offset', '')
+            length = request.META.get('CONTENT_LENGTH') or ''
+            if not offset.isdigit():
+                raise ValidationError({'Upload-Offset': 'Informe em que byte a parte começa.'})
+            if not length.isdigit():
+                raise ValidationError({'Content-Length': 'Informe o tamanho da parte.'})
+            limit = getattr(settings, 'FILE_UPLOAD_CHUNK_MAX_SIZE', 8 * 1024 * 1024)
+            if int(length) > limit:
+                return Response({'error': f'Cada parte pode ter no máximo {limit} bytes.'},
+                                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            # O corpo é lido direto do stream da requisição, sem passar pelos parsers
+            upload = append_chunk(upload.pk, int(offset), request.stream, int(length))
+            return self.offset_response(upload)
+        except UploadOffsetMismatch as e:
+            return Response({'error': 'Offset diferente do esperado.', 'offset': e.offset},
+                            status=status.HTTP_409_CONFLICT, headers={'Upload-Offset': str(e.offset)})
+        except Exception as e:
+            return handle_exception(e)
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        upload = self.get_object()
+        try:
+            instance = complete_upload(upload.pk)
+            return Response(FileSerializer(instance, context=self.get_serializer_context()).data,
+                            status=status.HTTP_201_CREATED)
+        except Exception as e:
+            return handle_exception(e)
+
+class SharingViewSet(NotePermissionMixin, BaseViewSet):
     queryset = Sharing.objects.all()
     serializer_class = SharingSerializer
 
     def get_queryset(self):
+        if self.detail:
+            # Quem recebeu vê o compartilhamento; só o dono da nota altera
+            return self.queryset.filter(Q(shared_with=self.request.user) | Q(note__user=self.request.user))
         return self.queryset.filter(shared_with=self.request.user)
 
+    @action(detail=False, methods=['post'])
+    def share(self, request):
+        # Compartilha uma nota com muitos usuários de uma vez. Os
+        # compartilhamentos são gravados aqui; as notificações saem depois do
+        # commit, pelo dispatcher (notifications.py). Quem já tinha acesso
+        # mantém o can_edit atual.
+        try:
+            serializer = BulkShareSerializer(data=request.data, context=self.get_serializer_context())
+            serializer.is_valid(raise_exception=True)
+            note = serializer.validated_data['note']
+            can_edit = serializer.validated_data['can_edit']
+            requested = set(serializer.validated_data['user_ids']) - {note.user_id}
+            known = set(User.objects.filter(pk__in=requested).values_list('pk', flat=True))
+            with transaction.atomic():
+                existing = set(
+                    Sharing.objects.filter(note=note, shared_with_id__in=known)
+                    .values_list('shared_with_id', flat=True)
+                )
+                new = sorted(known - existing)
+                Sharing.objects.bulk_create(
+                    [Sharing(note=note, shared_with_id=user_id, can_edit=can_edit) for user_id in new],
+                    batch_size=1000, ignore_conflicts=True
+                )
+                # bulk_create não dispara os sinais do índice de acesso nem das notificações
+                grant_shared_access(note, new, can_edit)
+                notify('note_shared', note.pk, note.user_id, new)
+            invalidate_users(new + [note.user_id])
+            return Response({
+                'shared': len(new), 'already_shared': len(existing), 'unknown': sorted(requested - known)
+            }, status=status.HTTP_201_CREATED)
+        except Exception as e:
+            return handle_exception(e)
+
 class NotificationViewSet(BaseViewSet):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
+    pagination_class = NotificationKeysetPagination
 
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user)
@@ -140,23 +615,84 @@ class NotificationViewSet(BaseViewSet):
     @action(detail=False, methods=['get'])
     def unread(self, request):
         try:
-            unread_notifications = self.get_queryset().filter(read=False)
-            serializer = self.get_serializer(unread_notifications, many=True)
-            return Response(serializer.data)
+            return self.cached_response(request, self.list_unread)
         except Exception as e:
             return handle_exception(e)
 
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        try:
+            return Response({'unread': unread_count(request.user.pk)})
+        except Exception as e:
+            return handle_exception(e)
+
+    @action(detail=False, methods=['post'], url_path='mark-all-read')
+    def mark_all_read(self, request):
+        try:
+            updated = mark_all_read(request.user.pk)
+            invalidate_users([request.user.pk])
+            return Response({'updated': updated})
+        except Exception as e:
+            return handle_exception(e)
+
+    def list_unread(self):
+        unread_notifications = self.filter_queryset(self.get_queryset()).filter(read=False)
+        page = self.paginate_queryset(unread_notifications)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(unread_notifications, many=True)
+        return Response(serializer.data)
+
 class NotificationTypeViewSet(BaseViewSet):
     queryset = NotificationType.objects.all()
     serializer_class = NotificationTypeSerializer
+    # Os templates são renderizados para todos os usuários
+    permission_classes = [IsAdminOrReadOnly]
 
-class ReviewViewSet(BaseViewSet):
+class ReviewViewSet(NotePermissionMixin, BaseViewSet):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
+    # Avalia quem consegue ler a nota
+    note_write_level = READ
 
     def get_queryset(self):
+        if self.detail:
+            return self.queryset.filter(Q(note__user=self.request.user) | Q(reviewer=self.request.user))
         return self.queryset.filter(note__user=self.request.user)
 
+    def perform_create(self, serializer):
+        self.check_note(serializer.validated_data['note'].pk)
+        serializer.save(reviewer=self.request.user)
+
+class SyncViewSet(viewsets.ViewSet):
+    # GET /api/sync/?since=<watermark>: notas alteradas (próprias e
+    # compartilhadas), compartilhamentos e notificações novos e ids de notas
+    # excluídas ou que deixaram de ser compartilhadas desde a última
+    # sincronização. Itens dos últimos SYNC_OVERLAP_SECONDS antes de since
+    # são reenviados; o cliente descarta repetidos pelo id (sync.py)
+    permission_classes = [permissions.IsAuthenticated]
+
+    def list(self, request):
+        try:
+            since = request.query_params.get('since')
+            if since:
+                try:
+                    since = parse_datetime(since)
+                except ValueError:
+                    since = None
+                if since is None:
+                    raise ValidationError({'since': 'Use uma data/hora ISO 8601.'})
+                if timezone.is_naive(since):
+                    since = timezone.make_aware(since)
+            context = {'request': request, 'view': self}
+            return StreamingHttpResponse(
+                stream_changes(request.user, since or None, context),
+                content_type='application/json'
+            )
+        except Exception as e:
+            return handle_exception(e)
+
 # ---------------- AI and Advanced Features ----------------
 class NoteAnalysisViewSet(BaseViewSet):
     queryset = NoteAnalysis.objects.all()
@@ -189,34 +725,277 @@ class NoteRecommendationViewSet(BaseViewSet):
 class SearchLogViewSet(BaseViewSet):
     queryset = SearchLog.objects.all()
     serializer_class = SearchLogSerializer
+    pagination_class = SearchLogKeysetPagination
+    filter_backends = BaseViewSet.filter_backends + [TimeRangeFilter]
+    time_field = 'created_at'
 
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user)
 
-class NoteTagsViewSet(BaseViewSet):
+class SearchAnalyticsViewSet(viewsets.ViewSet):
+    # Leitura dos agregados de SearchRollup (nunca dos logs brutos).
+    # ?since=/?until= (padrão: últimos 30 dias), ?limit= e, em volume, ?period=hour|day
+    permission_classes = [permissions.IsAdminUser]
+    default_days = 30
+    max_limit = 100
+
+    def get_rollups(self, request, period='day'):
+        time_range = TimeRangeFilter()
+        since = time_range.parse(request, 'since') or timezone.now() - timedelta(days=self.default_days)
+        until = time_range.parse(request, 'until', end_of_day=True)
+        if period == 'day':
+            since = since.replace(hour=0, minute=0, second=0, microsecond=0)
+        rollups = SearchRollup.objects.filter(period=period, bucket__gte=since)
+        if until is not None:
+            rollups = rollups.filter(bucket__lte=until)
+        return rollups
+
+    def get_limit(self, request):
+        try:
+            return max(1, min(int(request.query_params.get('limit', 20)), self.max_limit))
+        except ValueError:
+            raise ValidationError({'limit': 'Informe um número inteiro.'})
+
+    def summarize(self, rows, key):
+        return [
+            {
+                key: row[key],
+                'searches': row['total_searches'],
+                'zero_results': row['zero'],
+                'avg_results': round(row['total'] / row['total_searches'], 2) if row['total_searches'] else 0,
+            }
+            for row in rows
+        ]
+
+    def totals(self, rollups, key):
+        return rollups.values(key).annotate(
+            total_searches=Sum('searches'), total=Sum('total_results'), zero=Sum('zero_results')
+        )
+
+    @action(detail=False, methods=['get'])
+    def top(self, request):
+        try:
+            rows = self.totals(self.get_rollups(request), 'query').order_by('-total_searches', 'query')
+            return Response(self.summarize(rows[:self.get_limit(request)], 'query'))
+        except Exception as e:
+            return handle_exception(e)
+
+    @action(detail=False, methods=['get'], url_path='zero-results')
+    def zero_results(self, request):
+        try:
+            rows = self.totals(self.get_rollups(request), 'query').filter(zero__gt=0) \
+                .order_by('-zero', 'query')
+            return Response(self.summarize(rows[:self.get_limit(request)], 'query'))
+        except Exception as e:
+            return handle_exception(e)
+
+    @action(detail=False, methods=['get'])
+    def volume(self, request):
+        try:
+            period = request.query_params.get('period', 'day')
+            if period not in ('hour', 'day'):
+                raise ValidationError({'period': 'Use hour ou day.'})
+            rows = self.totals(self.get_rollups(request, period), 'bucket').order_by('bucket')
+            return Response(self.summarize(rows, 'bucket'))
+        except Exception as e:
+            return handle_exception(e)
+
+class NoteTagsViewSet(NotePermissionMixin, BulkMixin, BaseViewSet):
     queryset = NoteTag.objects.all()
     serializer_class = NoteTagSerializer
+    bulk_serializer_class = BulkNoteTagSerializer
 
     def get_queryset(self):
         return self.queryset.filter(note__user=self.request.user)
 
-class NoteEntitiesViewSet(BaseViewSet):
+    def existing_tags(self, items):
+        return set(
+            NoteTag.objects.filter(
+                note_id__in={data['note'] for _, data in items},
+                tag__in={data['tag'] for _, data in items if 'tag' in data}
+            ).values_list('note_id', 'tag')
+        )
+
+    def bulk_create_items(self, items, results):
+        owned = self.owned_note_ids(items)
+        existing = self.existing_tags(items)
+
+        accepted = []
+        for index, data in items:
+            key = (data['note'], data['tag'])
+            if data['note'] not in owned:
+                results[index] = bulk_result(index, 'invalid', errors={'note': ['Nota não encontrada.']})
+            elif key in existing:
+                results[index] = bulk_result(index, 'conflict')
+            else:
+                existing.add(key)
+                accepted.append((index, NoteTag(note_id=data['note'], tag=data['tag'])))
+
+        NoteTag.objects.bulk_create([tag for _, tag in accepted], batch_size=self.bulk_batch_size)
+        for index, tag in accepted:
+            results[index] = bulk_result(index, 'created', pk=tag.pk)
+
+    def bulk_update_items(self, items, results):
+        tags = self.owned_in_bulk(items)
+        owned = self.owned_note_ids(items)
+        existing = set(
+            NoteTag.objects.filter(
+                note_id__in={tag.note_id for tag in tags.values()} | owned,
+                tag__in={data['tag'] for _, data in items if 'tag' in data}
+            ).values_list('note_id', 'tag')
+        )
+
+        changed = []
+        for index, data in items:
+            tag = tags.get(data['id'])
+            if tag is None:
+                results[index] = bulk_result(index, 'not_found', pk=data['id'])
+                continue
+            if 'note' in data and data['note'] not in owned:
+                results[index] = bulk_result(index, 'invalid', errors={'note': ['Nota não encontrada.']})
+                continue
+            key = (data.get('note', tag.note_id), data.get('tag', tag.tag))
+            if key != (tag.note_id, tag.tag) and key in existing:
+                results[index] = bulk_result(index, 'conflict', pk=tag.pk)
+                continue
+            existing.add(key)
+            tag.note_id, tag.tag = key
+            changed.append(tag)
+            results[index] = bulk_result(index, 'updated', pk=tag.pk)
+
+        NoteTag.objects.bulk_update(changed, ['note', 'tag'], batch_size=self.bulk_batch_size)
+
+class NoteEntitiesViewSet(NotePermissionMixin, BulkMixin, BaseViewSet):
     queryset = NoteEntity.objects.all()
     serializer_class = NoteEntitySerializer
+    bulk_serializer_class = BulkNoteEntitySerializer
 
     def get_queryset(self):
         return self.queryset.filter(note__user=self.request.user)
 
+    def bulk_create_items(self, items, results):
+        owned = self.owned_note_ids(items)
+
+        accepted = []
+        for index, data in items:
+            if data['note'] not in owned:
+                results[index] = bulk_result(index, 'invalid', errors={'note': ['Nota não encontrada.']})
+            else:
+                accepted.append((index, NoteEntity(
+                    note_id=data['note'], entity_type=data['entity_type'], entity_value=data['entity_value']
+                )))
+
+        NoteEntity.objects.bulk_create([entity for _, entity in accepted], batch_size=self.bulk_batch_size)
+        for index, entity in accepted:
+            results[index] = bulk_result(index, 'created', pk=entity.pk)
+
+    def bulk_update_items(self, items, results):
+        entities = self.owned_in_bulk(items)
+        owned = self.owned_note_ids(items)
+
+        changed = []
+        for index, data in items:
+            entity = entities.get(data['id'])
+            if entity is None:
+                results[index] = bulk_result(index, 'not_found', pk=data['id'])
+                continue
+            if 'note' in data and data['note'] not in owned:
+                results[index] = bulk_result(index, 'invalid', errors={'note': ['Nota não encontrada.']})
+                continue
+            entity.note_id = data.get('note', entity.note_id)
+            entity.entity_type = data.get('entity_type', entity.entity_type)
+            entity.entity_value = data.get('entity_value', entity.entity_value)
+            changed.append(entity)
+            results[index] = bulk_result(index, 'updated', pk=entity.pk)
+
+        NoteEntity.objects.bulk_update(
+            changed, ['note', 'entity_type', 'entity_value'], batch_size=self.bulk_batch_size
+        )
+
 class UserInteractionViewSet(BaseViewSet):
     queryset = UserInteraction.objects.all()
     serializer_class = UserInteractionSerializer
+    pagination_class = InteractionKeysetPagination
+    filter_backends = BaseViewSet.filter_backends + [TimeRangeFilter]
+    time_field = 'timestamp'
 
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user)
 
+    @action(detail=False, methods=['post'])
+    def events(self, request):
+        # Aceita um evento ou uma lista; a gravação acontece em lote (ingest.py)
+        try:
+            many = isinstance(request.data, list)
+            serializer = InteractionEventSerializer(data=request.data, many=many)
+            serializer.is_valid(raise_exception=True)
+            events = serializer.validated_data if many else [serializer.validated_data]
+            # Só notas que o usuário acessa, pelo mapa de NoteAccess da requisição
+            allowed = note_access(request).filter_ids({event['note'] for event in events}, READ)
+            errors = [{} if event['note'] in allowed else {'note': ['Nota não encontrada.']} for event in events]
+            if any(errors):
+                raise ValidationError(errors if many else errors[0])
+            buffer = get_buffer()
+            for event in events:
+                buffer.append(
+                    request.user.pk, event['note'], event['interaction_type'], event.get('metadata')
+                )
+            return Response({'accepted': len(events)}, status=status.HTTP_202_ACCEPTED)
+        except Exception as e:
+            return handle_exception(e)
+
 class NoteHistoryViewSet(BaseViewSet):
     queryset = NoteHistory.objects.all()
     serializer_class = NoteHistorySerializer
 
     def get_queryset(self):
-        return self.queryset.filter(note__user=self.request.user)
+        queryset = self.queryset.filter(note__user=self.request.user)
+        note = self.request.query_params.get('note')
+        if note is not None:
+            if not note.isdigit():
+                raise ValidationError({'note': 'Informe o id da nota.'})
+            queryset = queryset.filter(note_id=note)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        # Reconstrói o conteúdo de toda a página de uma vez, por nota
+        if kwargs.get('many') and args:
+            instances = list(args[0])
+            materialize(instances)
+            args = (instances,) + args[1:]
+        return super().get_serializer(*args, **kwargs)
+
+    def get_version_params(self, request, *names):
+        values = []
+        for name in ('note',) + names:
+            value = request.query_params.get(name, '')
+            if not value.isdigit():
+                raise ValidationError({name: 'Informe um número inteiro.'})
+            values.append(int(value))
+        if not Note.objects.filter(pk=values[0], user=request.user).exists():
+            return None
+        return values
+
+    @action(detail=False, methods=['get'])
+    def version(self, request):
+        # GET /api/note-history/version/?note=<id>&version=<n> (0 = conteúdo original)
+        try:
+            params = self.get_version_params(request, 'version')
+            content = params and version_content(*params)
+            if content is None:
+                return Response({'detail': 'Não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+            return Response({'note': params[0], 'version': params[1], 'content': content})
+        except Exception as e:
+            return handle_exception(e)
+
+    @action(detail=False, methods=['get'])
+    def diff(self, request):
+        # GET /api/note-history/diff/?note=<id>&from=<n>&to=<m> (diff unificado)
+        try:
+            params = self.get_version_params(request, 'from', 'to')
+            result = params and version_diff(*params)
+            if result is None:
+                return Response({'detail': 'Não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+            return Response({'note': params[0], 'from': params[1], 'to': params[2], 'diff': result})
+        except Exception as e:
+            return handle_exception(e)
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     'rest_framework',
     'rest_framework_simplejwt',
@@ -56,10 +57,11 @@ MIDDLEWARE = [
 ]
 
 REST_FRAMEWORK = {
+    # JWT primeiro: é o caminho da maioria das requisições e não consulta o banco
     'DEFAULT_AUTHENTICATION_CLASSES': (
+        'to_do.authentication.StatelessJWTAuthentication',
         'rest_framework.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -70,6 +72,82 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Os tokens de acesso levam as claims usadas pela autenticação sem estado
+# (to_do/authentication.py); a checagem de revogação fica em cache por
+# JWT_REVOCATION_CACHE_SECONDS
+SIMPLE_JWT = {
+    'TOKEN_OBTAIN_SERIALIZER': 'to_do.authentication.ClaimsTokenObtainPairSerializer',
+}
+JWT_REVOCATION_CACHE_SECONDS = 30
+
+# Cache de respostas por usuário (ETag / If-None-Match) em to_do/cache.py
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Mapa de acesso às notas por usuário (permissions.py); a versão do usuário
+# já invalida o mapa nas mudanças, o prazo só limita o que ficou sem versão
+NOTE_ACCESS_CACHE_TIMEOUT = 60
+
+# Pub/sub do stream de notificações; com vários processos/workers use
+# 'to_do.pubsub.PostgresBroker' (LISTEN/NOTIFY)
+NOTIFICATION_BROKER = 'to_do.pubsub.InProcessBroker'
+
+# /api/sync/ reenvia o que mudou nestes segundos antes de since, para cobrir
+# transações confirmadas depois da marca d'água com carimbo anterior a ela
+SYNC_OVERLAP_SECONDS = 30
+
+# Entrega das notificações de compartilhamento e avaliação: ThreadDispatcher
+# grava numa thread de fundo, fora da requisição; InlineDispatcher grava na hora
+NOTIFICATION_DISPATCHER = 'to_do.notifications.ThreadDispatcher'
+
+# Analisador usado por manage.py analyze_notes; precisa ser importável nos
+# processos do pool sem carregar os models
+NOTE_ANALYZER = 'to_do.analyzers.KeywordAnalyzer'
+
+# Ingestão de interações (POST /api/user-interactions/events/): o spool guarda
+# os eventos até o flush em lote; segmentos órfãos são regravados por
+# manage.py flush_interactions
+INTERACTION_SPOOL_DIR = BASE_DIR / 'var' / 'interactions'
+INTERACTION_FLUSH_SIZE = 500
+INTERACTION_FLUSH_INTERVAL = 2.0
+
+# Histórico de login (POST /api/auth/token/): mesmo spool em lote das
+# interações; segmentos órfãos são regravados por manage.py flush_logins
+LOGIN_SPOOL_DIR = BASE_DIR / 'var' / 'logins'
+LOGIN_FLUSH_SIZE = 500
+LOGIN_FLUSH_INTERVAL = 2.0
+
+# Envio de arquivos em partes (/api/file-uploads/): os arquivos parciais ficam
+# em FILE_UPLOAD_SESSION_DIR até a conclusão; envios parados são removidos
+# por manage.py expire_uploads
+FILE_UPLOAD_SESSION_DIR = BASE_DIR / 'var' / 'uploads'
+FILE_UPLOAD_CHUNK_MAX_SIZE = 8 * 1024 * 1024
+FILE_UPLOAD_MAX_SIZE = 2 * 1024 * 1024 * 1024
+
+# Download de anexos (/api/files/<id>/download/): com 'x-accel-redirect'
+# (nginx, location internal em FILE_DOWNLOAD_ACCEL_PREFIX apontando para
+# MEDIA_ROOT) ou 'x-sendfile' (Apache/lighttpd) o servidor web entrega o
+# arquivo; com None o Django responde com FileResponse
+FILE_DOWNLOAD_BACKEND = None
+FILE_DOWNLOAD_ACCEL_PREFIX = '/protected-media/'
+
+# Edições seguidas do mesmo usuário dentro desta janela viram uma só versão
+# no histórico da nota
+NOTE_HISTORY_COALESCE_SECONDS = 120
+
+# Meses mantidos nas tabelas de log particionadas (manage.py partitions);
+# tabelas fora deste dicionário não expiram
+PARTITION_RETENTION_MONTHS = {
+    'to_do_loginhistory': 12,
+    'to_do_searchlog': 6,
+    'to_do_userinteraction': 12,
+}
+
 ROOT_URLCONF = 'to_do_list.urls'
 
 TEMPLATES = [